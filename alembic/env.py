@@ -8,7 +8,7 @@ from alembic import context
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from models.models import SQLModel
-from database.database import DATABASE_URL
+from database.database import DATABASE_URL, apply_sqlite_profile
 
 config = context.config
 if config.config_file_name is not None:
@@ -16,6 +16,12 @@ if config.config_file_name is not None:
 
 target_metadata = SQLModel.metadata
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Tabelas FTS5 (e as tabelas internas *_fts_data, *_fts_idx...) não estão nos modelos
+    if type_ == "table" and reflected and compare_to is None and "_fts" in name:
+        return False
+    return True
+
 def get_url():
     return DATABASE_URL
 
@@ -33,9 +39,11 @@ def run_migrations_offline():
 def run_migrations_online():
     from sqlalchemy import create_engine
     connectable = create_engine(get_url(), poolclass=pool.NullPool)
+    apply_sqlite_profile(connectable)
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,48 @@
+"""add filter and join indexes
+
+Revision ID: a3c91e5d7f20
+Revises: 6eb2819f8a46
+Create Date: 2026-10-17 09:12:31.408113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c91e5d7f20'
+down_revision: Union[str, None] = '6eb2819f8a46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_movie_director_link_director_id', 'movie_director_link', ['director_id'], unique=False)
+    op.create_index('ix_session_date_time', 'session', ['date_time'], unique=False)
+    op.create_index('ix_session_status_session', 'session', ['status_session'], unique=False)
+    op.create_index('ix_session_movie_id_date_time', 'session', ['movie_id', 'date_time'], unique=False)
+    op.create_index('ix_session_room_id_date_time', 'session', ['room_id', 'date_time'], unique=False)
+    op.create_index('ix_ticket_session_id', 'ticket', ['session_id'], unique=False)
+    op.create_index('ix_ticket_purchase_date', 'ticket', ['purchase_date'], unique=False)
+    op.create_index('ix_ticket_payment_status', 'ticket', ['payment_status'], unique=False)
+    op.create_index('ix_paymentdetails_ticket_id', 'paymentdetails', ['ticket_id'], unique=False)
+    op.create_index('ix_paymentdetails_status_payment_method', 'paymentdetails', ['status', 'payment_method'], unique=False)
+    # Atualiza as estatísticas usadas pelo planner do SQLite
+    op.execute('ANALYZE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_paymentdetails_status_payment_method', table_name='paymentdetails')
+    op.drop_index('ix_paymentdetails_ticket_id', table_name='paymentdetails')
+    op.drop_index('ix_ticket_payment_status', table_name='ticket')
+    op.drop_index('ix_ticket_purchase_date', table_name='ticket')
+    op.drop_index('ix_ticket_session_id', table_name='ticket')
+    op.drop_index('ix_session_room_id_date_time', table_name='session')
+    op.drop_index('ix_session_movie_id_date_time', table_name='session')
+    op.drop_index('ix_session_status_session', table_name='session')
+    op.drop_index('ix_session_date_time', table_name='session')
+    op.drop_index('ix_movie_director_link_director_id', table_name='movie_director_link')
@@ -0,0 +1,38 @@
+"""unique ticket seat per session
+
+Revision ID: a9c3e7f21d48
+Revises: d4f1a6c83b0e
+Create Date: 2026-10-18 10:12:05.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c3e7f21d48'
+down_revision: Union[str, None] = 'd4f1a6c83b0e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Como em transaction_id: poltronas vendidas duas vezes precisam ser resolvidas à mão antes
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT session_id, chair_number, COUNT(*) FROM ticket
+        WHERE session_id IS NOT NULL
+        GROUP BY session_id, chair_number HAVING COUNT(*) > 1
+        LIMIT 10
+    """)).all()
+    if duplicates:
+        sample = ", ".join(f"session {session_id} chair {chair} ({count}x)" for session_id, chair, count in duplicates)
+        raise RuntimeError(f"Seats sold more than once in ticket, resolve them before upgrading: {sample}")
+    op.create_index('ix_ticket_session_id_chair_number', 'ticket', ['session_id', 'chair_number'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ticket_session_id_chair_number', table_name='ticket')
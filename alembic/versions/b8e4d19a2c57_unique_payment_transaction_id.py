@@ -0,0 +1,38 @@
+"""unique payment transaction_id
+
+Revision ID: b8e4d19a2c57
+Revises: f3b27c6d8e14
+Create Date: 2026-10-17 15:02:47.193604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4d19a2c57'
+down_revision: Union[str, None] = 'f3b27c6d8e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Retentativas do gateway podem ter gravado o mesmo transaction_id mais de uma vez;
+    # o índice único falharia sem dizer quais, então a migração para antes e lista alguns
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT transaction_id, COUNT(*) FROM paymentdetails
+        GROUP BY transaction_id HAVING COUNT(*) > 1
+        LIMIT 10
+    """)).all()
+    if duplicates:
+        sample = ", ".join(f"{transaction_id} ({count}x)" for transaction_id, count in duplicates)
+        raise RuntimeError(f"Duplicate transaction_id values in paymentdetails, resolve them before upgrading: {sample}")
+    op.create_index('ix_paymentdetails_transaction_id', 'paymentdetails', ['transaction_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_paymentdetails_transaction_id', table_name='paymentdetails')
@@ -0,0 +1,51 @@
+"""add entity_counters
+
+Revision ID: c7d24b9e1a63
+Revises: a3c91e5d7f20
+Create Date: 2026-10-17 10:03:57.120954
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d24b9e1a63'
+down_revision: Union[str, None] = 'a3c91e5d7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTED_TABLES = ("movie", "director", "room", "session", "ticket", "paymentdetails")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'entity_counters',
+        sa.Column('entity_name', sa.String(), primary_key=True),
+        sa.Column('total', sa.Integer(), nullable=False),
+    )
+    for table in COUNTED_TABLES:
+        op.execute(f"INSERT INTO entity_counters (entity_name, total) SELECT '{table}', COUNT(*) FROM {table}")
+        op.execute(f"""
+            CREATE TRIGGER trg_{table}_count_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE entity_counters SET total = total + 1 WHERE entity_name = '{table}';
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER trg_{table}_count_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE entity_counters SET total = total - 1 WHERE entity_name = '{table}';
+            END
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in COUNTED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_count_delete")
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_count_insert")
+    op.drop_table('entity_counters')
@@ -0,0 +1,544 @@
+"""add sales hourly rollup
+
+Revision ID: d4f1a6c83b0e
+Revises: b8e4d19a2c57
+Create Date: 2026-10-17 18:21:36.402918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1a6c83b0e'
+down_revision: Union[str, None] = 'b8e4d19a2c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = [
+    '''CREATE TRIGGER trg_ticket_sales_insert AFTER INSERT ON ticket
+    BEGIN
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.purchase_date), coalesce((SELECT movie_id FROM session WHERE session_id = NEW.session_id), 0), coalesce((SELECT room_id FROM session WHERE session_id = NEW.session_id), 0), 1, NEW.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.purchase_date), coalesce((SELECT movie_id FROM session WHERE session_id = NEW.session_id), 0), -1, 1, NEW.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.purchase_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = NEW.session_id), 0), 1, NEW.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.purchase_date), -1, -1, 1, NEW.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+    END''',
+    '''CREATE TRIGGER trg_ticket_sales_delete AFTER DELETE ON ticket
+    BEGIN
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.purchase_date), coalesce((SELECT movie_id FROM session WHERE session_id = OLD.session_id), 0), coalesce((SELECT room_id FROM session WHERE session_id = OLD.session_id), 0), -1, -OLD.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.purchase_date), coalesce((SELECT movie_id FROM session WHERE session_id = OLD.session_id), 0), -1, -1, -OLD.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.purchase_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = OLD.session_id), 0), -1, -OLD.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.purchase_date), -1, -1, -1, -OLD.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+    END''',
+    '''CREATE TRIGGER trg_ticket_sales_update AFTER UPDATE OF session_id, ticket_price, purchase_date ON ticket
+    BEGIN
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.purchase_date), coalesce((SELECT movie_id FROM session WHERE session_id = OLD.session_id), 0), coalesce((SELECT room_id FROM session WHERE session_id = OLD.session_id), 0), -1, -OLD.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.purchase_date), coalesce((SELECT movie_id FROM session WHERE session_id = OLD.session_id), 0), -1, -1, -OLD.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.purchase_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = OLD.session_id), 0), -1, -OLD.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.purchase_date), -1, -1, -1, -OLD.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.purchase_date), coalesce((SELECT movie_id FROM session WHERE session_id = NEW.session_id), 0), coalesce((SELECT room_id FROM session WHERE session_id = NEW.session_id), 0), 1, NEW.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.purchase_date), coalesce((SELECT movie_id FROM session WHERE session_id = NEW.session_id), 0), -1, 1, NEW.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.purchase_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = NEW.session_id), 0), 1, NEW.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.purchase_date), -1, -1, 1, NEW.ticket_price, 0, 0
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = OLD.session_id), 0), coalesce((SELECT room_id FROM session WHERE session_id = OLD.session_id), 0), 0, 0, -1, -p.final_price
+        FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = 'Aprovado' AND OLD.session_id IS NOT NEW.session_id
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = OLD.session_id), 0), -1, 0, 0, -1, -p.final_price
+        FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = 'Aprovado' AND OLD.session_id IS NOT NEW.session_id
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = OLD.session_id), 0), 0, 0, -1, -p.final_price
+        FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = 'Aprovado' AND OLD.session_id IS NOT NEW.session_id
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), -1, -1, 0, 0, -1, -p.final_price
+        FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = 'Aprovado' AND OLD.session_id IS NOT NEW.session_id
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = NEW.session_id), 0), coalesce((SELECT room_id FROM session WHERE session_id = NEW.session_id), 0), 0, 0, 1, p.final_price
+        FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = 'Aprovado' AND OLD.session_id IS NOT NEW.session_id
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = NEW.session_id), 0), -1, 0, 0, 1, p.final_price
+        FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = 'Aprovado' AND OLD.session_id IS NOT NEW.session_id
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = NEW.session_id), 0), 0, 0, 1, p.final_price
+        FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = 'Aprovado' AND OLD.session_id IS NOT NEW.session_id
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), -1, -1, 0, 0, 1, p.final_price
+        FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = 'Aprovado' AND OLD.session_id IS NOT NEW.session_id
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+    END''',
+    '''CREATE TRIGGER trg_payment_sales_insert AFTER INSERT ON paymentdetails
+    WHEN NEW.status = 'Aprovado'
+    BEGIN
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = NEW.ticket_id)), 0), coalesce((SELECT room_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = NEW.ticket_id)), 0), 0, 0, 1, NEW.final_price
+        WHERE NEW.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = NEW.ticket_id)), 0), -1, 0, 0, 1, NEW.final_price
+        WHERE NEW.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.payment_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = NEW.ticket_id)), 0), 0, 0, 1, NEW.final_price
+        WHERE NEW.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.payment_date), -1, -1, 0, 0, 1, NEW.final_price
+        WHERE NEW.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+    END''',
+    '''CREATE TRIGGER trg_payment_sales_delete AFTER DELETE ON paymentdetails
+    WHEN OLD.status = 'Aprovado'
+    BEGIN
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = OLD.ticket_id)), 0), coalesce((SELECT room_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = OLD.ticket_id)), 0), 0, 0, -1, -OLD.final_price
+        WHERE OLD.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = OLD.ticket_id)), 0), -1, 0, 0, -1, -OLD.final_price
+        WHERE OLD.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.payment_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = OLD.ticket_id)), 0), 0, 0, -1, -OLD.final_price
+        WHERE OLD.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.payment_date), -1, -1, 0, 0, -1, -OLD.final_price
+        WHERE OLD.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+    END''',
+    '''CREATE TRIGGER trg_payment_sales_update AFTER UPDATE OF status, final_price, payment_date, ticket_id ON paymentdetails
+    WHEN OLD.status = 'Aprovado' OR NEW.status = 'Aprovado'
+    BEGIN
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = OLD.ticket_id)), 0), coalesce((SELECT room_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = OLD.ticket_id)), 0), 0, 0, -1, -OLD.final_price
+        WHERE OLD.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = OLD.ticket_id)), 0), -1, 0, 0, -1, -OLD.final_price
+        WHERE OLD.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.payment_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = OLD.ticket_id)), 0), 0, 0, -1, -OLD.final_price
+        WHERE OLD.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', OLD.payment_date), -1, -1, 0, 0, -1, -OLD.final_price
+        WHERE OLD.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = NEW.ticket_id)), 0), coalesce((SELECT room_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = NEW.ticket_id)), 0), 0, 0, 1, NEW.final_price
+        WHERE NEW.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.payment_date), coalesce((SELECT movie_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = NEW.ticket_id)), 0), -1, 0, 0, 1, NEW.final_price
+        WHERE NEW.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.payment_date), -1, coalesce((SELECT room_id FROM session WHERE session_id = (SELECT session_id FROM ticket WHERE ticket_id = NEW.ticket_id)), 0), 0, 0, 1, NEW.final_price
+        WHERE NEW.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', NEW.payment_date), -1, -1, 0, 0, 1, NEW.final_price
+        WHERE NEW.status = 'Aprovado'
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+    END''',
+    '''CREATE TRIGGER trg_session_sales_move AFTER UPDATE OF movie_id, room_id ON session
+    WHEN OLD.movie_id IS NOT NEW.movie_id OR OLD.room_id IS NOT NEW.room_id
+    BEGIN
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date), coalesce(OLD.movie_id, 0), coalesce(OLD.room_id, 0), -count(*), -sum(t.ticket_price), 0, 0
+        FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date), coalesce(OLD.movie_id, 0), -1, -count(*), -sum(t.ticket_price), 0, 0
+        FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date), -1, coalesce(OLD.room_id, 0), -count(*), -sum(t.ticket_price), 0, 0
+        FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date), -1, -1, -count(*), -sum(t.ticket_price), 0, 0
+        FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce(OLD.movie_id, 0), coalesce(OLD.room_id, 0), 0, 0, -count(*), -sum(p.final_price)
+        FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id WHERE t.session_id = NEW.session_id AND p.status = 'Aprovado' GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce(OLD.movie_id, 0), -1, 0, 0, -count(*), -sum(p.final_price)
+        FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id WHERE t.session_id = NEW.session_id AND p.status = 'Aprovado' GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), -1, coalesce(OLD.room_id, 0), 0, 0, -count(*), -sum(p.final_price)
+        FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id WHERE t.session_id = NEW.session_id AND p.status = 'Aprovado' GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), -1, -1, 0, 0, -count(*), -sum(p.final_price)
+        FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id WHERE t.session_id = NEW.session_id AND p.status = 'Aprovado' GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date), coalesce(NEW.movie_id, 0), coalesce(NEW.room_id, 0), count(*), sum(t.ticket_price), 0, 0
+        FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date), coalesce(NEW.movie_id, 0), -1, count(*), sum(t.ticket_price), 0, 0
+        FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date), -1, coalesce(NEW.room_id, 0), count(*), sum(t.ticket_price), 0, 0
+        FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date), -1, -1, count(*), sum(t.ticket_price), 0, 0
+        FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce(NEW.movie_id, 0), coalesce(NEW.room_id, 0), 0, 0, count(*), sum(p.final_price)
+        FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id WHERE t.session_id = NEW.session_id AND p.status = 'Aprovado' GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce(NEW.movie_id, 0), -1, 0, 0, count(*), sum(p.final_price)
+        FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id WHERE t.session_id = NEW.session_id AND p.status = 'Aprovado' GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), -1, coalesce(NEW.room_id, 0), 0, 0, count(*), sum(p.final_price)
+        FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id WHERE t.session_id = NEW.session_id AND p.status = 'Aprovado' GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+        INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), -1, -1, 0, 0, count(*), sum(p.final_price)
+        FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id WHERE t.session_id = NEW.session_id AND p.status = 'Aprovado' GROUP BY 1
+        ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            revenue = revenue + excluded.revenue,
+            payments = payments + excluded.payments,
+            paid_revenue = paid_revenue + excluded.paid_revenue;
+    END''',
+]
+
+BACKFILL = '''INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+    SELECT bucket_start, movie_id, room_id, SUM(tickets_sold), SUM(revenue), SUM(payments), SUM(paid_revenue)
+    FROM (
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', t.purchase_date) AS bucket_start, coalesce(s.movie_id, 0) AS movie_id,
+               coalesce(s.room_id, 0) AS room_id, 1 AS tickets_sold, t.ticket_price AS revenue,
+               0 AS payments, 0.0 AS paid_revenue
+        FROM ticket t LEFT JOIN session s ON s.session_id = t.session_id
+        UNION ALL
+        SELECT strftime('%Y-%m-%d %H:00:00.000000', p.payment_date), coalesce(s.movie_id, 0), coalesce(s.room_id, 0),
+               0, 0.0, 1, p.final_price
+        FROM paymentdetails p
+        LEFT JOIN ticket t ON t.ticket_id = p.ticket_id
+        LEFT JOIN session s ON s.session_id = t.session_id
+        WHERE p.status = 'Aprovado'
+    )
+    GROUP BY bucket_start, movie_id, room_id'''
+
+TOTALS = [
+    '''INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+    SELECT bucket_start, movie_id, -1, SUM(tickets_sold), SUM(revenue), SUM(payments), SUM(paid_revenue)
+    FROM sales_hourly_rollup WHERE movie_id != -1 AND room_id != -1
+    GROUP BY bucket_start, movie_id''',
+    '''INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+    SELECT bucket_start, -1, room_id, SUM(tickets_sold), SUM(revenue), SUM(payments), SUM(paid_revenue)
+    FROM sales_hourly_rollup WHERE movie_id != -1 AND room_id != -1
+    GROUP BY bucket_start, room_id''',
+    '''INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+    SELECT bucket_start, -1, -1, SUM(tickets_sold), SUM(revenue), SUM(payments), SUM(paid_revenue)
+    FROM sales_hourly_rollup WHERE movie_id != -1 AND room_id != -1
+    GROUP BY bucket_start''',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sales_hourly_rollup',
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('movie_id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.Column('tickets_sold', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.Column('payments', sa.Integer(), nullable=False),
+        sa.Column('paid_revenue', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket_start', 'movie_id', 'room_id'),
+    )
+    op.create_index('ix_sales_hourly_rollup_movie_id_room_id_bucket_start', 'sales_hourly_rollup', ['movie_id', 'room_id', 'bucket_start'], unique=False)
+    op.execute(BACKFILL)
+    for sql in TOTALS:
+        op.execute(sql)
+    for sql in TRIGGERS:
+        op.execute(sql)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS trg_ticket_sales_insert')
+    op.execute('DROP TRIGGER IF EXISTS trg_ticket_sales_delete')
+    op.execute('DROP TRIGGER IF EXISTS trg_ticket_sales_update')
+    op.execute('DROP TRIGGER IF EXISTS trg_payment_sales_insert')
+    op.execute('DROP TRIGGER IF EXISTS trg_payment_sales_delete')
+    op.execute('DROP TRIGGER IF EXISTS trg_payment_sales_update')
+    op.execute('DROP TRIGGER IF EXISTS trg_session_sales_move')
+    op.drop_index('ix_sales_hourly_rollup_movie_id_room_id_bucket_start', table_name='sales_hourly_rollup')
+    op.drop_table('sales_hourly_rollup')
@@ -0,0 +1,131 @@
+"""add revenue rollups
+
+Revision ID: e51f0a8c3d92
+Revises: c7d24b9e1a63
+Create Date: 2026-10-17 11:26:08.734415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e51f0a8c3d92'
+down_revision: Union[str, None] = 'c7d24b9e1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = [
+    '''CREATE TRIGGER trg_ticket_revenue_insert AFTER INSERT ON ticket
+    BEGIN
+        INSERT INTO session_revenue_rollup (session_id, tickets_sold, revenue)
+        SELECT NEW.session_id, 1, NEW.ticket_price WHERE NEW.session_id IS NOT NULL
+        ON CONFLICT(session_id) DO UPDATE SET
+            tickets_sold = tickets_sold + 1,
+            revenue = revenue + excluded.revenue;
+        INSERT INTO movie_revenue_rollup (movie_id, tickets_sold, total_revenue)
+        SELECT movie_id, 1, NEW.ticket_price FROM session
+        WHERE session_id = NEW.session_id AND movie_id IS NOT NULL
+        ON CONFLICT(movie_id) DO UPDATE SET
+            tickets_sold = tickets_sold + 1,
+            total_revenue = total_revenue + excluded.total_revenue;
+    END''',
+    '''CREATE TRIGGER trg_ticket_revenue_delete AFTER DELETE ON ticket
+    BEGIN
+        UPDATE session_revenue_rollup
+        SET tickets_sold = tickets_sold - 1, revenue = revenue - OLD.ticket_price
+        WHERE session_id = OLD.session_id;
+        UPDATE movie_revenue_rollup
+        SET tickets_sold = tickets_sold - 1, total_revenue = total_revenue - OLD.ticket_price
+        WHERE movie_id = (SELECT movie_id FROM session WHERE session_id = OLD.session_id);
+    END''',
+    '''CREATE TRIGGER trg_ticket_revenue_update AFTER UPDATE OF session_id, ticket_price ON ticket
+    BEGIN
+        UPDATE session_revenue_rollup
+        SET tickets_sold = tickets_sold - 1, revenue = revenue - OLD.ticket_price
+        WHERE session_id = OLD.session_id;
+        UPDATE movie_revenue_rollup
+        SET tickets_sold = tickets_sold - 1, total_revenue = total_revenue - OLD.ticket_price
+        WHERE movie_id = (SELECT movie_id FROM session WHERE session_id = OLD.session_id);
+        INSERT INTO session_revenue_rollup (session_id, tickets_sold, revenue)
+        SELECT NEW.session_id, 1, NEW.ticket_price WHERE NEW.session_id IS NOT NULL
+        ON CONFLICT(session_id) DO UPDATE SET
+            tickets_sold = tickets_sold + 1,
+            revenue = revenue + excluded.revenue;
+        INSERT INTO movie_revenue_rollup (movie_id, tickets_sold, total_revenue)
+        SELECT movie_id, 1, NEW.ticket_price FROM session
+        WHERE session_id = NEW.session_id AND movie_id IS NOT NULL
+        ON CONFLICT(movie_id) DO UPDATE SET
+            tickets_sold = tickets_sold + 1,
+            total_revenue = total_revenue + excluded.total_revenue;
+    END''',
+    '''CREATE TRIGGER trg_session_revenue_movie_update AFTER UPDATE OF movie_id ON session
+    WHEN OLD.movie_id IS NOT NEW.movie_id
+    BEGIN
+        UPDATE movie_revenue_rollup
+        SET tickets_sold = tickets_sold - (SELECT tickets_sold FROM session_revenue_rollup WHERE session_id = NEW.session_id),
+            total_revenue = total_revenue - (SELECT revenue FROM session_revenue_rollup WHERE session_id = NEW.session_id)
+        WHERE movie_id = OLD.movie_id
+          AND EXISTS (SELECT 1 FROM session_revenue_rollup WHERE session_id = NEW.session_id);
+        INSERT INTO movie_revenue_rollup (movie_id, tickets_sold, total_revenue)
+        SELECT NEW.movie_id, tickets_sold, revenue FROM session_revenue_rollup
+        WHERE session_id = NEW.session_id AND NEW.movie_id IS NOT NULL
+        ON CONFLICT(movie_id) DO UPDATE SET
+            tickets_sold = tickets_sold + excluded.tickets_sold,
+            total_revenue = total_revenue + excluded.total_revenue;
+    END''',
+    '''CREATE TRIGGER trg_session_revenue_delete AFTER DELETE ON session
+    BEGIN
+        DELETE FROM session_revenue_rollup WHERE session_id = OLD.session_id;
+    END''',
+    '''CREATE TRIGGER trg_movie_revenue_delete AFTER DELETE ON movie
+    BEGIN
+        DELETE FROM movie_revenue_rollup WHERE movie_id = OLD.movie_id;
+    END''',
+]
+
+BACKFILL = [
+    '''DELETE FROM session_revenue_rollup''',
+    '''DELETE FROM movie_revenue_rollup''',
+    '''INSERT INTO session_revenue_rollup (session_id, tickets_sold, revenue)
+           SELECT session_id, COUNT(*), SUM(ticket_price) FROM ticket
+           WHERE session_id IS NOT NULL GROUP BY session_id''',
+    '''INSERT INTO movie_revenue_rollup (movie_id, tickets_sold, total_revenue)
+           SELECT s.movie_id, SUM(r.tickets_sold), SUM(r.revenue)
+           FROM session_revenue_rollup r JOIN session s ON s.session_id = r.session_id
+           WHERE s.movie_id IS NOT NULL GROUP BY s.movie_id''',
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'movie_revenue_rollup',
+        sa.Column('movie_id', sa.Integer(), primary_key=True),
+        sa.Column('tickets_sold', sa.Integer(), nullable=False),
+        sa.Column('total_revenue', sa.Float(), nullable=False),
+    )
+    op.create_table(
+        'session_revenue_rollup',
+        sa.Column('session_id', sa.Integer(), primary_key=True),
+        sa.Column('tickets_sold', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+    )
+    for sql in BACKFILL:
+        op.execute(sql)
+    for sql in TRIGGERS:
+        op.execute(sql)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS trg_ticket_revenue_insert')
+    op.execute('DROP TRIGGER IF EXISTS trg_ticket_revenue_delete')
+    op.execute('DROP TRIGGER IF EXISTS trg_ticket_revenue_update')
+    op.execute('DROP TRIGGER IF EXISTS trg_session_revenue_movie_update')
+    op.execute('DROP TRIGGER IF EXISTS trg_session_revenue_delete')
+    op.execute('DROP TRIGGER IF EXISTS trg_movie_revenue_delete')
+    op.drop_table('session_revenue_rollup')
+    op.drop_table('movie_revenue_rollup')
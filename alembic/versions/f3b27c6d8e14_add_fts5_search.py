@@ -0,0 +1,65 @@
+"""add fts5 search
+
+Revision ID: f3b27c6d8e14
+Revises: e51f0a8c3d92
+Create Date: 2026-10-17 12:40:21.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b27c6d8e14'
+down_revision: Union[str, None] = 'e51f0a8c3d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FTS_TABLES = {
+    "movie_fts": ("movie", "movie_id", ("movie_title", "synopsis", "genre")),
+    "director_fts": ("director", "director_id", ("director_name", "biography", "nationality")),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, (table, rowid, columns) in FTS_TABLES.items():
+        cols = ", ".join(columns)
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+        op.execute(f"""
+            CREATE VIRTUAL TABLE {name} USING fts5(
+                {cols}, content = '{table}', content_rowid = '{rowid}',
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        """)
+        op.execute(f"""
+            CREATE TRIGGER trg_{name}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {name} (rowid, {cols}) VALUES (new.{rowid}, {new_values});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER trg_{name}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {name} ({name}, rowid, {cols}) VALUES ('delete', old.{rowid}, {old_values});
+            END
+        """)
+        op.execute(f"""
+            CREATE TRIGGER trg_{name}_update AFTER UPDATE OF {cols} ON {table}
+            BEGIN
+                INSERT INTO {name} ({name}, rowid, {cols}) VALUES ('delete', old.{rowid}, {old_values});
+                INSERT INTO {name} (rowid, {cols}) VALUES (new.{rowid}, {new_values});
+            END
+        """)
+        op.execute(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in FTS_TABLES:
+        for suffix in ("update", "delete", "insert"):
+            op.execute(f"DROP TRIGGER IF EXISTS trg_{name}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {name}")
@@ -0,0 +1,169 @@
+"""Compara a busca por ILIKE '%termo%' (rotas /filter) com o índice FTS5
+(rotas /search) numa base sintética de filmes. As matches do ILIKE incluem
+substrings no meio de outras palavras; as do FTS5 só palavras (ou prefixos) inteiros.
+
+    python -m benchmarks.fts_search --rows 1000000
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+from sqlalchemy import create_engine
+from sqlmodel import SQLModel
+
+import models.models  # noqa: F401  (registra as tabelas no metadata)
+from database import fts
+
+SYLLABLES = ("ba", "ca", "da", "fe", "go", "la", "ma", "ne", "pi", "ro", "sa", "ta", "vi", "lu", "mo", "ri")
+VOCABULARY_SIZE = 20_000
+GENRES = ("Drama", "Ação", "Comédia", "Ficção", "Terror", "Romance", "Documentário")
+
+
+def build_vocabulary(rng: random.Random) -> tuple[list[str], list[float]]:
+    """Palavras sintéticas com frequência de Zipf (poucas muito comuns, muitas raras)."""
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(words) + 1):
+        total += 1 / rank
+        cum_weights.append(total)
+    return words, cum_weights
+
+
+def build_queries(words: list[str]) -> list[tuple[str, str, tuple, str, tuple]]:
+    """(descrição, SQL do caminho ILIKE, parâmetros, SQL do FTS5, parâmetros).
+    O caminho ILIKE reproduz o que /movies/filter?title_contains= executa
+    (COUNT para o total + primeira página); o FTS5, o equivalente em /movies/search
+    restrito à mesma coluna."""
+    common, medium, rare = words[10], words[500], words[10_000]
+    ilike_route = (
+        "SELECT (SELECT count(*) FROM movie WHERE lower(movie_title) LIKE lower(:p)),"
+        " (SELECT group_concat(movie_id) FROM (SELECT movie_id FROM movie WHERE lower(movie_title) LIKE lower(:p) LIMIT 20))"
+    )
+    ilike_synopsis = (
+        "SELECT (SELECT count(*) FROM movie WHERE lower(synopsis) LIKE lower(:p) AND lower(synopsis) LIKE lower(:q)),"
+        " (SELECT group_concat(movie_id) FROM (SELECT movie_id FROM movie"
+        " WHERE lower(synopsis) LIKE lower(:p) AND lower(synopsis) LIKE lower(:q) LIMIT 20))"
+    )
+    fts_route = (
+        "SELECT (SELECT count(*) FROM movie_fts WHERE movie_fts MATCH :m),"
+        " (SELECT group_concat(rowid) FROM (SELECT rowid FROM movie_fts WHERE movie_fts MATCH :m"
+        " ORDER BY bm25(movie_fts, 10.0, 1.0, 2.0) LIMIT 20))"
+    )
+    return [
+        (f"common word '{common}'", ilike_route, {"p": f"%{common}%"}, fts_route, {"m": f'movie_title : "{common}"'}),
+        (f"medium word '{medium}'", ilike_route, {"p": f"%{medium}%"}, fts_route, {"m": f'movie_title : "{medium}"'}),
+        (f"rare word '{rare}'", ilike_route, {"p": f"%{rare}%"}, fts_route, {"m": f'movie_title : "{rare}"'}),
+        (f"prefix '{medium[:4]}'", ilike_route, {"p": f"%{medium[:4]}%"}, fts_route, {"m": f'movie_title : "{medium[:4]}"*'}),
+        (f"synopsis '{medium}' + '{rare}'", ilike_synopsis, {"p": f"%{medium}%", "q": f"%{rare}%"},
+         fts_route, {"m": f'synopsis : ("{medium}" "{rare}")'}),
+    ]
+
+
+def sentence(rng: random.Random, words: list[str], cum_weights: list[float], size: int) -> str:
+    return " ".join(rng.choices(words, cum_weights=cum_weights, k=size))
+
+
+def seed(path: str, rows: int, words: list[str], cum_weights: list[float], rng: random.Random) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    # Tabelas sem FTS: a carga é feita antes e o índice é montado com 'rebuild'
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    for name in fts.FTS_TABLES:
+        for suffix in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{name}_{suffix}")
+
+    start = time.perf_counter()
+    batch = 50_000
+    for first in range(1, rows + 1, batch):
+        conn.executemany(
+            "INSERT INTO movie (movie_id, movie_title, genre, duration, rating, synopsis, release_year) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (movie_id, sentence(rng, words, cum_weights, 3).title(), rng.choice(GENRES), rng.randint(80, 180),
+                 rng.choice(("L", "10", "12", "14", "16", "18")), sentence(rng, words, cum_weights, 25),
+                 rng.randint(1950, 2025))
+                for movie_id in range(first, min(first + batch, rows + 1))
+            ),
+        )
+    conn.commit()
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with conn:
+        for name in fts.FTS_TABLES:
+            for ddl in fts.fts_ddl(name):
+                conn.execute(ddl)
+            conn.execute(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+    index_seconds = time.perf_counter() - start
+    conn.close()
+    return {"load_seconds": round(load_seconds, 2), "fts_rebuild_seconds": round(index_seconds, 2)}
+
+
+def _time(conn, sql: str, params: dict, repeat: int) -> tuple[float, int]:
+    conn.execute(sql, params).fetchall()  # aquece o cache de páginas
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total, _ids = conn.execute(sql, params).fetchone()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3), total
+
+
+def run(path: str, queries: list, repeat: int) -> list[dict]:
+    conn = sqlite3.connect(path)
+    results = []
+    for label, ilike_sql, ilike_params, fts_sql, fts_params in queries:
+        ilike_ms, ilike_total = _time(conn, ilike_sql, ilike_params, repeat)
+        fts_ms, fts_total = _time(conn, fts_sql, fts_params, repeat)
+        results.append({
+            "query": label,
+            "ilike_median_ms": ilike_ms,
+            "ilike_matches": ilike_total,
+            "fts_median_ms": fts_ms,
+            "fts_matches": fts_total,
+            "speedup": round(ilike_ms / fts_ms, 1) if fts_ms else None,
+        })
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ILIKE x FTS5 na tabela movie")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="arquivo SQLite a usar (padrão: temporário, apagado no fim)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="fts_bench_"), "bench.sqlite3")
+    rng = random.Random(args.seed)
+    words, cum_weights = build_vocabulary(rng)
+    try:
+        report = {
+            "rows": args.rows,
+            **seed(path, args.rows, words, cum_weights, rng),
+            "queries": run(path, build_queries(words), args.repeat),
+        }
+    finally:
+        if not args.db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Micro-benchmark da serialização das listagens: cada rota de routers/ que devolve
+listas é chamada em sequência (concorrência 1, sem cache) com FAST_JSON desligado e
+ligado, cada modo num subprocesso próprio sobre o mesmo banco. O relatório traz a
+mediana e o p90 por rota, o ganho e se os dois corpos são o mesmo JSON.
+
+    python -m benchmarks.json_serialization --scale 1 --repeat 10
+
+O caminho rápido usa orjson quando instalado (o relatório diz se estava).
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import hashlib
+import tempfile
+import statistics
+import subprocess
+
+from benchmarks.load import seed
+
+# (nome, rota); {movie_id} é trocado por um filme com sessões
+ROUTES = (
+    ("tickets", "/tickets"),
+    ("tickets_filter", "/tickets/filter?per_page=100&include_total=false"),
+    ("payments", "/payments"),
+    ("payments_filter", "/payments/filter?per_page=100&include_total=false"),
+    ("sessions", "/sessions"),
+    ("sessions_filter", "/sessions/filter?per_page=100&include_total=false"),
+    ("rooms", "/rooms"),
+    ("rooms_filter", "/rooms/filter?per_page=100&include_total=false"),
+    ("directors", "/directors"),
+    ("directors_filter", "/directors/filter?per_page=100&include_total=false"),
+    ("movies_filter", "/movies/filter?per_page=100&include_total=false"),
+    ("movie_revenue", "/reports/movie-revenue?order=true"),
+    ("movie_sessions", "/reports/movie/{movie_id}/sessions?per_page=100"),
+)
+
+
+def _digest(body: bytes) -> str:
+    # Mesmo conteúdo JSON, independente da ordem das chaves e dos espaços
+    canonical = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def measure(routes, repeat: int, warmup: int) -> dict:
+    import httpx
+    from main import app
+    from routers.common import FAST_JSON, orjson
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, path in routes:
+                for _ in range(warmup):
+                    await client.get(path)
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    response = await client.get(path)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+                timings.sort()
+                results[name] = {
+                    "p50_ms": round(statistics.median(timings), 2),
+                    "p90_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.9))], 2),
+                    "bytes": len(response.content),
+                    "digest": _digest(response.content),
+                }
+    return {"fast_json": FAST_JSON, "orjson": orjson is not None, "routes": results}
+
+
+def worker(args):
+    routes = [(name, path.format(movie_id=args.movie_id)) for name, path in ROUTES if name in args.routes]
+    print(json.dumps(asyncio.run(measure(routes, args.repeat, args.warmup))))
+
+
+def run_mode(args, path: str, fast: bool, log_file: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", FAST_JSON="true" if fast else "false",
+               CACHE_BACKEND="none", LOG_LEVEL="WARNING", LOG_FILE=log_file)
+    command = [sys.executable, "-m", "benchmarks.json_serialization", "--worker", "--repeat", str(args.repeat),
+               "--warmup", str(args.warmup), "--movie-id", str(args.movie_id), "--routes", *args.routes]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a serialização das listagens com e sem FAST_JSON")
+    parser.add_argument("--scale", type=float, default=1.0, help="mesma escala de benchmarks.load (1 = 50k tickets)")
+    parser.add_argument("--repeat", type=int, default=10, help="requisições medidas por rota")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--routes", nargs="+", choices=[name for name, _ in ROUTES], default=[name for name, _ in ROUTES])
+    parser.add_argument("--db", help="arquivo SQLite já populado (padrão: temporário, apagado no fim)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--movie-id", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="json_bench_")
+    path = args.db or os.path.join(workdir, "bench.sqlite3")
+    log_file = os.path.join(workdir, "bench.log")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_FILE", log_file)
+
+    try:
+        if not args.db:
+            seed(path, args.scale, random.Random(args.seed))
+        import sqlite3
+        with sqlite3.connect(path) as conn:
+            args.movie_id = conn.execute(
+                "SELECT movie_id FROM session GROUP BY movie_id ORDER BY count(*) DESC LIMIT 1"
+            ).fetchone()[0]
+        stock = run_mode(args, path, False, log_file)
+        fast = run_mode(args, path, True, log_file)
+    finally:
+        if not args.db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    routes = {}
+    for name in args.routes:
+        before, after = stock["routes"][name], fast["routes"][name]
+        routes[name] = {
+            "bytes": before["bytes"],
+            "stock_p50_ms": before["p50_ms"],
+            "fast_p50_ms": after["p50_ms"],
+            "stock_p90_ms": before["p90_ms"],
+            "fast_p90_ms": after["p90_ms"],
+            "speedup": round(before["p50_ms"] / after["p50_ms"], 2) if after["p50_ms"] else None,
+            "same_json": before["digest"] == after["digest"],
+        }
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("worker", "db")},
+        "orjson": fast["orjson"],
+        "routes": routes,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if all(route["same_json"] for route in routes.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
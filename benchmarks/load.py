@@ -0,0 +1,347 @@
+"""Carga sobre a API inteira (app de main.py, em processo via ASGI) com um banco
+SQLite temporário populado na escala pedida. Cada cenário roda com concorrência
+fixa e um mix ponderado de rotas; o relatório traz p50/p95/p99 e vazão por
+cenário e por rota, em JSON.
+
+    python -m benchmarks.load --scale 1 --concurrency 16 --requests 2000
+    python -m benchmarks.load --save-baseline bench_baseline.json
+    python -m benchmarks.load --baseline bench_baseline.json --threshold 15
+
+Sem rede nem uvicorn: mede rota + serialização + banco. O cache de leitura
+participa como em produção (use CACHE_BACKEND=none para medir só o banco).
+Com --baseline, sai com código 1 se algum p95 piorar mais que --threshold %.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+SYLLABLES = ("ba", "ca", "da", "fe", "go", "la", "ma", "ne", "pi", "ro", "sa", "ta", "vi", "lu", "mo", "ri")
+GENRES = ("Drama", "Ação", "Comédia", "Ficção", "Terror", "Romance", "Documentário")
+RATINGS = ("L", "10", "12", "14", "16", "18")
+NATIONALITIES = ("Brasil", "EUA", "França", "Japão", "Coreia do Sul", "Argentina")
+PAYMENT_METHODS = ("PIX", "Cartão de Crédito", "Cartão de Débito", "Dinheiro")
+SHOWTIMES = (12, 15, 18, 21)  # filmes têm até 180 min: sessões da mesma sala não se sobrepõem
+FIRST_DAY = datetime(2026, 1, 1)
+
+# Quantidades para --scale 1
+BASE_SIZES = {"directors": 200, "movies": 1000, "rooms": 20, "days": 60, "tickets": 50_000}
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def phrase(rng: random.Random, size: int) -> str:
+    return " ".join(word(rng) for _ in range(size))
+
+
+def seed(path: str, scale: float, rng: random.Random) -> dict:
+    """Cria o schema pelo metadata (com triggers de contadores/rollups/FTS) e
+    insere os dados com executemany; os triggers mantêm as tabelas derivadas."""
+    from sqlmodel import SQLModel
+    import models.models  # noqa: F401  (registra as tabelas no metadata)
+    from database.database import engine
+    from database import counters, rollups, fts  # noqa: F401  (listeners de after_create)
+
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    sizes = {name: max(1, int(value * scale)) for name, value in BASE_SIZES.items()}
+    sizes["days"] = BASE_SIZES["days"]
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    start = time.perf_counter()
+    with conn:
+        conn.executemany(
+            "INSERT INTO director (director_id, director_name, nationality, birth_date, biography, website) VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, phrase(rng, 2).title(), rng.choice(NATIONALITIES), f"{rng.randint(1940, 1995)}-01-01",
+              phrase(rng, 20), f"https://example.com/{i}") for i in range(1, sizes["directors"] + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO movie (movie_id, movie_title, genre, duration, rating, synopsis, release_year) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((i, phrase(rng, rng.randint(1, 4)).title(), rng.choice(GENRES), rng.randint(80, 180),
+              rng.choice(RATINGS), phrase(rng, 25), rng.randint(1950, 2025)) for i in range(1, sizes["movies"] + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO movie_director_link (movie_id, director_id) VALUES (?, ?)",
+            ((i, rng.randint(1, sizes["directors"])) for i in range(1, sizes["movies"] + 1)),
+        )
+        capacities = {i: rng.choice((80, 120, 200, 300)) for i in range(1, sizes["rooms"] + 1)}
+        conn.executemany(
+            "INSERT INTO room (room_id, room_name, capacity, screen_type, audio_system, acessibility) VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, f"Sala {i}", capacity, rng.choice(("2K Digital", "RealD 3D", "IMAX")), "Dolby Digital 5.1", True) for i, capacity in capacities.items()),
+        )
+        sessions = [
+            (room_id, FIRST_DAY + timedelta(days=day, hours=hour))
+            for day in range(sizes["days"]) for room_id in capacities for hour in SHOWTIMES
+        ]
+        conn.executemany(
+            "INSERT INTO session (session_id, date_time, exibition_type, language_audio, language_subtitles, status_session, room_id, movie_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((i, date_time.isoformat(" ", timespec="microseconds"), "2D", "Inglês", "Português", "Agendada", room_id, rng.randint(1, sizes["movies"]))
+             for i, (room_id, date_time) in enumerate(sessions, 1)),
+        )
+        # Poltronas distintas por sessão, só nos dois primeiros terços da sala
+        tickets, payments, taken = [], [], set()
+        while len(tickets) < sizes["tickets"]:
+            session_id = rng.randint(1, len(sessions))
+            chair = rng.randint(1, capacities[sessions[session_id - 1][0]] * 2 // 3)
+            if (session_id, chair) in taken:
+                continue
+            taken.add((session_id, chair))
+            ticket_id = len(tickets) + 1
+            price = rng.choice((15.0, 20.0, 30.0, 40.0))
+            purchased = sessions[session_id - 1][1] - timedelta(days=rng.randint(0, 10), minutes=rng.randint(0, 600))
+            tickets.append((ticket_id, chair, rng.choice(("Inteira", "Meia-entrada")), price, purchased.isoformat(" ", timespec="microseconds"),
+                            rng.choice(("Confirmado", "Pendente")), session_id))
+            if ticket_id % 2:
+                payments.append((ticket_id, f"TX{ticket_id:09d}", rng.choice(PAYMENT_METHODS), price,
+                                 rng.choice(("Aprovado", "Pendente", "Recusado")), purchased.isoformat(" ", timespec="microseconds"), ticket_id))
+        conn.executemany(
+            "INSERT INTO ticket (ticket_id, chair_number, ticket_type, ticket_price, purchase_date, payment_status, session_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            tickets,
+        )
+        conn.executemany(
+            "INSERT INTO paymentdetails (payment_id, transaction_id, payment_method, final_price, status, payment_date, ticket_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            payments,
+        )
+    conn.execute("ANALYZE")
+    conn.close()
+    return {**sizes, "sessions": len(sessions), "seed_seconds": round(time.perf_counter() - start, 2)}
+
+
+class Mix:
+    """Rotas de um cenário com pesos; cada fábrica recebe o rng e devolve
+    (rótulo, método, url, corpo json)."""
+
+    def __init__(self, sizes: dict, routes):
+        self.sizes = sizes
+        self.factories = [factory for _, factory in routes]
+        self.cum_weights = []
+        total = 0
+        for weight, _ in routes:
+            total += weight
+            self.cum_weights.append(total)
+
+    def pick(self, rng: random.Random):
+        return rng.choices(self.factories, cum_weights=self.cum_weights)[0](rng, self.sizes)
+
+
+def _day(rng, sizes) -> str:
+    return (FIRST_DAY + timedelta(days=rng.randrange(sizes["days"]))).date().isoformat()
+
+
+def _session_id(rng, sizes) -> int:
+    return rng.randint(1, sizes["sessions"])
+
+
+def _ticket_body(rng, sizes) -> dict:
+    return {
+        "ticket_id": None, "chair_number": rng.randint(1, 80), "ticket_type": "Inteira", "ticket_price": 20.0,
+        "purchase_date": datetime.now().isoformat(), "payment_status": "Pendente", "session_id": _session_id(rng, sizes),
+    }
+
+
+def _payment_body(rng, sizes) -> dict:
+    return {
+        "payment_id": None, "transaction_id": f"BENCH{rng.getrandbits(48):x}", "payment_method": rng.choice(PAYMENT_METHODS),
+        "final_price": 20.0, "status": "Aprovado", "payment_date": datetime.now().isoformat(),
+    }
+
+
+SCENARIOS = {
+    # Navegação no catálogo: leituras por id, filtros, busca e programação do dia
+    "catalog": [
+        (20, lambda rng, s: ("GET /movies/{movie_id}", "GET", f"/movies/{rng.randint(1, s['movies'])}", None)),
+        (10, lambda rng, s: ("GET /movies/filter", "GET", f"/movies/filter?genre={rng.choice(GENRES)}&page={rng.randint(1, 5)}", None)),
+        (10, lambda rng, s: ("GET /movies/search", "GET", f"/movies/search?q={rng.choice(SYLLABLES)}{rng.choice(SYLLABLES)}", None)),
+        (15, lambda rng, s: ("GET /movies/autocomplete", "GET", f"/movies/autocomplete?q={rng.choice(SYLLABLES)}", None)),
+        (10, lambda rng, s: ("GET /directors/{director_id}", "GET", f"/directors/{rng.randint(1, s['directors'])}", None)),
+        (5, lambda rng, s: ("GET /rooms/{room_id}", "GET", f"/rooms/{rng.randint(1, s['rooms'])}", None)),
+        (15, lambda rng, s: ("GET /sessions/schedule", "GET", f"/sessions/schedule?date={_day(rng, s)}", None)),
+        (10, lambda rng, s: ("GET /sessions/{session_id}/seats", "GET", f"/sessions/{_session_id(rng, s)}/seats", None)),
+        (5, lambda rng, s: ("GET /movies/count", "GET", "/movies/count", None)),
+    ],
+    # Rajada de compras: mapa de poltronas, ticket (409 quando a poltrona já foi vendida) e pagamento
+    "purchase": [
+        (30, lambda rng, s: ("GET /sessions/{session_id}/seats", "GET", f"/sessions/{_session_id(rng, s)}/seats", None)),
+        (40, lambda rng, s: ("POST /tickets", "POST", "/tickets", _ticket_body(rng, s))),
+        (20, lambda rng, s: ("POST /payments", "POST", "/payments", _payment_body(rng, s))),
+        (10, lambda rng, s: ("GET /sessions/schedule", "GET", f"/sessions/schedule?date={_day(rng, s)}", None)),
+    ],
+    # Painéis consultando relatórios e listagens filtradas
+    "reports": [
+        (20, lambda rng, s: ("GET /reports/movie-revenue", "GET", f"/reports/movie-revenue?order={rng.choice(('true', 'false'))}", None)),
+        (20, lambda rng, s: ("GET /reports/movie/{movie_id}/sessions", "GET", f"/reports/movie/{rng.randint(1, s['movies'])}/sessions", None)),
+        (20, lambda rng, s: ("GET /tickets/filter", "GET", f"/tickets/filter?payment_status={rng.choice(('Confirmado', 'Pendente'))}&page={rng.randint(1, 20)}", None)),
+        (15, lambda rng, s: ("GET /payments/filter", "GET", f"/payments/filter?status=Aprovado&payment_method={quote(rng.choice(PAYMENT_METHODS))}", None)),
+        (15, lambda rng, s: ("GET /sessions/filter", "GET", f"/sessions/filter?room_id={rng.randint(1, s['rooms'])}&after={_day(rng, s)}T00:00:00", None)),
+        (10, lambda rng, s: ("GET /tickets/count", "GET", "/tickets/count", None)),
+    ],
+}
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def run_scenario(client, mix: Mix, concurrency: int, requests: int, seed_value: int) -> dict:
+    per_route: dict[str, list[float]] = {}
+    statuses: dict[str, dict[str, int]] = {}
+    remaining = requests
+
+    async def worker(worker_id: int):
+        nonlocal remaining
+        rng = random.Random(seed_value * 1000 + worker_id)
+        while remaining > 0:
+            remaining -= 1
+            label, method, url, body = mix.pick(rng)
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            per_route.setdefault(label, []).append(time.perf_counter() - start)
+            route_statuses = statuses.setdefault(label, {})
+            route_statuses[str(response.status_code)] = route_statuses.get(str(response.status_code), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    # 5xx conta como erro; 4xx (ex.: poltrona ocupada) é resposta esperada do mix
+    def errors(label):
+        return sum(count for status, count in statuses[label].items() if status.startswith("5"))
+
+    all_latencies = [latency for latencies in per_route.values() for latency in latencies]
+    return {
+        **summarize(all_latencies, sum(errors(label) for label in per_route), elapsed),
+        "duration_seconds": round(elapsed, 3),
+        "routes": {
+            label: {**summarize(latencies, errors(label), elapsed), "status": statuses[label]}
+            for label, latencies in sorted(per_route.items())
+        },
+    }
+
+
+# Rotas com menos amostras que isso aparecem na comparação mas não acusam regressão
+MIN_ROUTE_SAMPLES = 50
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> tuple[dict, list[str]]:
+    """Variação percentual (atual vs. baseline) de p50/p95/p99 e vazão; regressões
+    são p95 mais alto ou vazão mais baixa além do limite."""
+    def delta(current, previous):
+        return round((current - previous) / previous * 100, 1) if previous else None
+
+    comparison, regressions = {}, []
+    for name, scenario in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        entries = {"overall": (scenario, previous)}
+        entries.update({
+            label: (route, previous["routes"][label])
+            for label, route in scenario["routes"].items() if label in previous.get("routes", {})
+        })
+        comparison[name] = {}
+        for label, (current, old) in entries.items():
+            changes = {f"{field}_change_pct": delta(current[field], old[field])
+                       for field in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")}
+            comparison[name][label] = changes
+            p95_change, rps_change = changes["p95_ms_change_pct"], changes["throughput_rps_change_pct"]
+            if min(current["requests"], old["requests"]) < MIN_ROUTE_SAMPLES:
+                continue
+            if (p95_change or 0) > threshold or (label == "overall" and (rps_change or 0) < -threshold):
+                regressions.append(f"{name} / {label}: p95 {p95_change:+}%, throughput {rps_change:+}%")
+    return comparison, regressions
+
+
+async def run(args, sizes: dict) -> dict:
+    import httpx
+    from main import app
+
+    scenarios = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios:
+                mix = Mix(sizes, SCENARIOS[name])
+                if args.warmup:
+                    await run_scenario(client, mix, args.concurrency, args.warmup, args.seed + 1)
+                scenarios[name] = await run_scenario(client, mix, args.concurrency, args.requests, args.seed)
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga das rotas da API")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica as quantidades base (1 = 1000 filmes, 50k tickets)")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="requisições medidas por cenário")
+    parser.add_argument("--warmup", type=int, default=200, help="requisições descartadas antes de medir")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="arquivo SQLite a usar (padrão: temporário, apagado no fim)")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=10.0, help="piora tolerada em %% antes de acusar regressão")
+    parser.add_argument("--save-baseline", help="grava o relatório neste arquivo")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load_bench_")
+    path = args.db or os.path.join(workdir, "bench.sqlite3")
+    # Precisa estar no ambiente antes do primeiro import de database.database
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_FILE", os.path.join(workdir, "bench.log"))
+
+    try:
+        rng = random.Random(args.seed)
+        sizes = seed(path, args.scale, rng)
+        report = {
+            "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "save_baseline", "db")},
+            "dataset": sizes,
+            "scenarios": asyncio.run(run(args, sizes)),
+        }
+    finally:
+        if not args.db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            report["comparison"], regressions = compare(report, json.load(baseline_file), args.threshold)
+        report["regressions"] = regressions
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from core.logging import logger
+from database.database import engine
+
+# Intervalo (segundos) entre snapshots; 0 desativa o refresh periódico e o
+# snapshot só é montado na primeira consulta ou em POST /reports/analytics/refresh
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "300"))
+FETCH_SIZE = 200_000
+UNKNOWN = "(none)"
+
+# Tudo numa transação de leitura: no WAL ela não bloqueia os writers e as
+# consultas enxergam o mesmo estado do banco. Sem JOIN: filme, sala e horário
+# da sessão são copiados para os tickets por session_id já nos arrays.
+# Datas viram epoch no próprio SQLite; ids ausentes viram 0.
+MOVIES_SQL = "SELECT movie_id, genre FROM movie"
+ROOMS_SQL = "SELECT room_id, screen_type FROM room"
+SESSIONS_SQL = """
+    SELECT session_id, coalesce(movie_id, 0), coalesce(room_id, 0),
+           coalesce(CAST(strftime('%s', date_time) AS INTEGER), -1)
+    FROM session
+"""
+TICKETS_SQL = """
+    SELECT ticket_price, coalesce(session_id, 0),
+           coalesce(CAST(strftime('%s', purchase_date) AS INTEGER), 0),
+           ticket_type, payment_status
+    FROM ticket
+"""
+TICKET_COLUMNS = {
+    "price": np.float64,
+    "session_id": np.int32,
+    "purchased_at": np.int64,
+    "ticket_type": np.int32,
+    "payment_status": np.int32,
+}
+
+
+class Categories:
+    """Rótulos de uma coluna de texto; cada ticket guarda só o código (posição em labels)."""
+
+    def __init__(self):
+        self.labels = [UNKNOWN]
+        self.codes = {None: 0}
+
+    def encode(self, values) -> list[int]:
+        for value in set(values).difference(self.codes):
+            self.codes[value] = len(self.labels)
+            self.labels.append(value)
+        return list(map(self.codes.__getitem__, values))
+
+
+class Snapshot:
+    """Colunas dos tickets em arrays NumPy, uma posição por ticket. Gênero e tipo de
+    tela já vêm resolvidos a partir do filme/sala da sessão no momento do snapshot."""
+
+    def __init__(self, columns: dict, categories: dict, built_at: datetime, build_ms: float):
+        self.columns = columns
+        self.categories = categories
+        self.built_at = built_at
+        self.build_ms = build_ms
+        self.tickets = len(columns["price"])
+
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.columns.values())
+
+    def mask(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             movie_id: Optional[int] = None, room_id: Optional[int] = None,
+             payment_status: Optional[str] = None) -> Optional[np.ndarray]:
+        """Filtro booleano sobre os tickets; None quando nada foi filtrado."""
+        columns = self.columns
+        conditions = []
+        if start is not None:
+            conditions.append(columns["purchased_at"] >= _epoch(start))
+        if end is not None:
+            conditions.append(columns["purchased_at"] <= _epoch(end))
+        if movie_id is not None:
+            conditions.append(columns["movie_id"] == movie_id)
+        if room_id is not None:
+            conditions.append(columns["room_id"] == room_id)
+        if payment_status is not None:
+            code = self.categories["payment_status"].codes.get(payment_status, -1)
+            conditions.append(columns["payment_status"] == code)
+        if not conditions:
+            return None
+        return np.logical_and.reduce(conditions) if len(conditions) > 1 else conditions[0]
+
+    def group_by(self, column: str, mask: Optional[np.ndarray], labels: list) -> list[tuple[str, int, float]]:
+        """(rótulo, tickets, receita) por código da coluna, com bincount ponderado pelo preço."""
+        codes = self.columns[column]
+        prices = self.columns["price"]
+        if mask is not None:
+            codes, prices = codes[mask], prices[mask]
+        counts = np.bincount(codes, minlength=len(labels))
+        revenue = np.bincount(codes, weights=prices, minlength=len(labels))
+        return [(label, int(counts[code]), float(revenue[code])) for code, label in enumerate(labels)]
+
+
+def _epoch(value: datetime) -> int:
+    # As datas são gravadas sem fuso; o epoch do SQLite as trata como UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _unzip(rows: list, width: int) -> tuple:
+    # Colunas de um fetchall; tabela vazia vira tuplas vazias
+    return tuple(zip(*rows)) or ((),) * width
+
+
+def _by_id(ids, values, default, dtype) -> np.ndarray:
+    """Array indexado pelo id (filme, sala, sessão); ids que não existem ficam com default."""
+    ids = np.array(ids, dtype=np.int64)
+    table = np.full(int(ids.max(initial=0)) + 1, default, dtype=dtype)
+    table[ids] = values
+    return table
+
+
+def _gather(table: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    # Posição 0 é sempre o default; id fora da tabela (não deveria acontecer com as FKs ativas) também
+    return table[np.where(ids < len(table), ids, 0)]
+
+
+def build_snapshot() -> Snapshot:
+    """Lê as colunas em lotes (fetchmany) e monta os arrays. Roda numa thread."""
+    started = time.perf_counter()
+    categories = {name: Categories() for name in ("genre", "screen_type", "ticket_type", "payment_status")}
+    chunks = {name: [] for name in TICKET_COLUMNS}
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("BEGIN")
+        movie_ids, genres = _unzip(cursor.execute(MOVIES_SQL).fetchall(), 2)
+        genre_by_movie = _by_id(movie_ids, categories["genre"].encode(genres), 0, np.int32)
+        room_ids, screens = _unzip(cursor.execute(ROOMS_SQL).fetchall(), 2)
+        screen_by_room = _by_id(room_ids, categories["screen_type"].encode(screens), 0, np.int32)
+        session_ids, session_movies, session_rooms, starts = _unzip(cursor.execute(SESSIONS_SQL).fetchall(), 4)
+        movie_by_session = _by_id(session_ids, session_movies, 0, np.int32)
+        room_by_session = _by_id(session_ids, session_rooms, 0, np.int32)
+        start_by_session = _by_id(session_ids, starts, -1, np.int64)
+
+        cursor.execute(TICKETS_SQL)
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            values = dict(zip(TICKET_COLUMNS, zip(*rows)))
+            values["ticket_type"] = categories["ticket_type"].encode(values["ticket_type"])
+            values["payment_status"] = categories["payment_status"].encode(values["payment_status"])
+            for name, dtype in TICKET_COLUMNS.items():
+                chunks[name].append(np.array(values[name], dtype=dtype))
+        cursor.execute("COMMIT")
+        cursor.close()
+    finally:
+        connection.close()
+
+    columns = {
+        name: np.concatenate(chunks[name]) if chunks[name] else np.empty(0, dtype=dtype)
+        for name, dtype in TICKET_COLUMNS.items()
+    }
+    session_id = columns.pop("session_id")
+    columns["movie_id"] = _gather(movie_by_session, session_id)
+    columns["room_id"] = _gather(room_by_session, session_id)
+    columns["genre"] = _gather(genre_by_movie, columns["movie_id"])
+    columns["screen_type"] = _gather(screen_by_room, columns["room_id"])
+    columns["purchase_hour"] = (columns["purchased_at"] // 3600 % 24).astype(np.int32)
+    # Ticket sem sessão vai para a posição 24, descartada no relatório
+    starts_at = _gather(start_by_session, session_id)
+    columns["showtime_hour"] = np.where(starts_at >= 0, starts_at // 3600 % 24, 24).astype(np.int32)
+
+    return Snapshot(columns, categories, datetime.now(timezone.utc), (time.perf_counter() - started) * 1000)
+
+
+_snapshot: Optional[Snapshot] = None
+_refresh_lock: Optional[asyncio.Lock] = None
+
+
+async def refresh() -> Snapshot:
+    """Monta um snapshot novo numa thread do pool e troca o atual de uma vez;
+    as consultas em andamento continuam no anterior."""
+    global _snapshot, _refresh_lock
+    if _refresh_lock is None:
+        _refresh_lock = asyncio.Lock()
+    async with _refresh_lock:
+        snapshot = await asyncio.to_thread(build_snapshot)
+        _snapshot = snapshot
+    logger.info('[analytics] Snapshot with %s tickets (%.1f MB) built in %.0f ms.',
+                snapshot.tickets, snapshot.nbytes() / 2**20, snapshot.build_ms)
+    return snapshot
+
+
+def current_snapshot() -> Optional[Snapshot]:
+    return _snapshot
+
+
+async def get_snapshot() -> Snapshot:
+    if _snapshot is not None:
+        return _snapshot
+    if _refresh_lock is not None and _refresh_lock.locked():
+        # Outro pedido já está montando o primeiro snapshot: espera por ele
+        async with _refresh_lock:
+            pass
+        if _snapshot is not None:
+            return _snapshot
+    return await refresh()
+
+
+async def refresh_loop():
+    if ANALYTICS_REFRESH_SECONDS <= 0:
+        return
+    while True:
+        try:
+            await refresh()
+        except Exception as e:
+            logger.error('[analytics] Snapshot failed: %s', e)
+        await asyncio.sleep(ANALYTICS_REFRESH_SECONDS)
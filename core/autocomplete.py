@@ -0,0 +1,157 @@
+import re
+import sys
+import time
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.logging import logger
+from models.models import Movie, Director
+
+# Só inícios de palavra dentro dos primeiros MAX_OFFSET caracteres são indexados
+MAX_OFFSET = 255
+# Quantas entradas (em ordem alfabética) entram no ranking do top-k
+SCAN_FACTOR = 5
+
+
+def normalize(text: str) -> str:
+    """minúsculas, sem acentos e com pontuação virando espaço: "Ação!" -> "acao"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    without_marks = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", without_marks.lower()))
+
+
+class AutocompleteIndex:
+    """Array ordenado de sufixos que começam em palavra ("the matrix" e "matrix").
+    Cada entrada é um int de 8 bytes (slot * 256 + offset) ordenado pelo texto a
+    partir do offset, então o texto normalizado é guardado uma vez só por título."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.entries = array("q")
+        self.normalized: list = []   # slot -> texto normalizado (None = removido até o próximo build)
+        self.labels: list = []       # slot -> texto original
+        self.ids: list = []          # slot -> id da entidade
+        self.slots: dict[int, int] = {}  # id -> slot
+        self.lock = threading.Lock()
+        self._stats = None  # recalculado só depois de alguma alteração
+
+    def _key(self, entry: int) -> str:
+        return self.normalized[entry >> 8][entry & 0xFF:]
+
+    def _entries_for(self, slot: int) -> list[int]:
+        text = self.normalized[slot]
+        offsets = [0] + [match.end() for match in re.finditer(" ", text)]
+        return [slot << 8 | offset for offset in offsets if offset <= MAX_OFFSET]
+
+    def _new_slot(self, entity_id: int, label: str) -> int:
+        slot = len(self.normalized)
+        self.normalized.append(normalize(label))
+        self.labels.append(label)
+        self.ids.append(entity_id)
+        self.slots[entity_id] = slot
+        return slot
+
+    def build(self, rows):
+        with self.lock:
+            self.normalized, self.labels, self.ids, self.slots = [], [], [], {}
+            entries = []
+            for entity_id, label in rows:
+                if label:
+                    slot = self._new_slot(entity_id, label)
+                    entries.extend(self._entries_for(slot))
+            entries.sort(key=self._key)
+            self.entries = array("q", entries)
+            self._stats = None
+
+    def _remove_locked(self, entity_id: int):
+        slot = self.slots.pop(entity_id, None)
+        if slot is None:
+            return
+        for entry in self._entries_for(slot):
+            position = bisect_left(self.entries, self._key(entry), key=self._key)
+            # Entradas com o mesmo texto ficam lado a lado; procura a deste slot
+            while self.entries[position] != entry:
+                position += 1
+            del self.entries[position]
+        self.normalized[slot] = self.labels[slot] = self.ids[slot] = None
+        self._stats = None
+
+    def upsert(self, entity_id: int, label: str):
+        with self.lock:
+            self._remove_locked(entity_id)
+            if label:
+                slot = self._new_slot(entity_id, label)
+                for entry in self._entries_for(slot):
+                    insort(self.entries, entry, key=self._key)
+                self._stats = None
+
+    def remove(self, entity_id: int):
+        with self.lock:
+            self._remove_locked(entity_id)
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[int, str]]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        with self.lock:
+            start = bisect_left(self.entries, prefix, key=self._key)
+            # Todo texto que começa com o prefixo fica antes de prefix + U+FFFF
+            end = bisect_left(self.entries, prefix + "\uffff", lo=start, key=self._key)
+            candidates = {}
+            for entry in self.entries[start:min(end, start + limit * SCAN_FACTOR)]:
+                slot, offset = entry >> 8, entry & 0xFF
+                # Mantém a melhor ocorrência do título (início do título > meio)
+                candidates[slot] = min(offset, candidates.get(slot, offset))
+            ranked = sorted(
+                candidates.items(),
+                key=lambda item: (item[1] > 0, len(self.labels[item[0]]), self.labels[item[0]]),
+            )
+            return [(self.ids[slot], self.labels[slot]) for slot, _ in ranked[:limit]]
+
+    def stats(self) -> dict:
+        with self.lock:
+            if self._stats is not None:
+                return self._stats
+            strings = [text for text in self.normalized if text is not None]
+            labels = [label for label in self.labels if label is not None]
+            size = (
+                sys.getsizeof(self.entries)
+                + sys.getsizeof(self.normalized) + sum(sys.getsizeof(text) for text in strings)
+                + sys.getsizeof(self.labels) + sum(sys.getsizeof(label) for label in labels)
+                + sys.getsizeof(self.ids) + sys.getsizeof(self.slots)
+            )
+            self._stats = {"name": self.name, "items": len(self.slots), "entries": len(self.entries), "bytes": size}
+            return self._stats
+
+
+movies = AutocompleteIndex("movies")
+directors = AutocompleteIndex("directors")
+indexes = (movies, directors)
+
+
+async def load_indexes(session: AsyncSession):
+    for index, query in zip(indexes, (
+        select(Movie.movie_id, Movie.movie_title),
+        select(Director.director_id, Director.director_name),
+    )):
+        start = time.perf_counter()
+        index.build((await session.exec(query)).all())
+        stats = index.stats()
+        logger.info('[autocomplete] %s: %s items, %s entries, %.1f MB, built in %.0f ms',
+                    index.name, stats["items"], stats["entries"], stats["bytes"] / 1_048_576,
+                    (time.perf_counter() - start) * 1000)
+
+
+def render_prometheus() -> list[str]:
+    lines = []
+    for field in ("items", "entries", "bytes"):
+        name = f"cine_api_autocomplete_{field}"
+        lines.append(f"# TYPE {name} gauge")
+        for index in indexes:
+            lines.append(f'{name}{{index="{index.name}"}} {index.stats()[field]}')
+    return lines
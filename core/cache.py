@@ -0,0 +1,210 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from core.logging import logger
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # backend compartilhado é opcional
+    redis = None
+
+# memory | redis | none
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_KEY_PREFIX = "cine_api:"
+
+# Chaves usadas pelas rotas de catálogo; os valores são o JSON da resposta
+MOVIES_ALL = "movies:all"
+
+
+def movie_key(movie_id: int) -> str:
+    return f"movie:{movie_id}"
+
+
+def director_key(director_id: int) -> str:
+    return f"director:{director_id}"
+
+
+def room_key(room_id: int) -> str:
+    return f"room:{room_id}"
+
+
+def schedule_key(day) -> str:
+    return f"schedule:{day.isoformat()}"
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class MemoryCache:
+    """LRU em processo com TTL; ao passar de max_entries descarta o item menos usado."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()  # chave -> (valor, expira_em)
+        self.lock = threading.Lock()
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.stats.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[0]
+
+    async def set(self, key: str, value: bytes):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            self.stats.sets += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    async def delete(self, *keys: str):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+            self.stats.invalidations += len(keys)
+
+    async def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def size(self) -> int:
+        return len(self.entries)
+
+
+class RedisCache:
+    """Backend compartilhado entre processos/instâncias da API."""
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl: float):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self.client.get(CACHE_KEY_PREFIX + key)
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes):
+        await self.client.set(CACHE_KEY_PREFIX + key, value, px=int(self.ttl * 1000))
+        self.stats.sets += 1
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*(CACHE_KEY_PREFIX + key for key in keys))
+        self.stats.invalidations += len(keys)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=CACHE_KEY_PREFIX + "*"):
+            await self.client.delete(key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class NullCache:
+    name = "none"
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self.stats.misses += 1
+        return None
+
+    async def set(self, key: str, value: bytes):
+        pass
+
+    async def delete(self, *keys: str):
+        pass
+
+    async def clear(self):
+        pass
+
+    def size(self) -> int:
+        return 0
+
+
+def _create_backend():
+    if CACHE_BACKEND == "redis":
+        return RedisCache(CACHE_REDIS_URL, CACHE_TTL_SECONDS)
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    if CACHE_BACKEND != "memory":
+        raise ValueError(f"Unknown CACHE_BACKEND '{CACHE_BACKEND}', expected memory, redis or none")
+    return MemoryCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+backend = _create_backend()
+
+
+async def get(key: str) -> Optional[bytes]:
+    try:
+        return await backend.get(key)
+    except Exception as e:
+        # Cache indisponível não pode derrubar a leitura: segue para o banco
+        logger.error('[cache] get %s failed: %s', key, e)
+        return None
+
+
+async def put(key: str, value: bytes):
+    try:
+        await backend.set(key, value)
+    except Exception as e:
+        logger.error('[cache] set %s failed: %s', key, e)
+
+
+async def invalidate(*keys: str):
+    # Chamado depois do commit. Uma leitura concorrente que já tinha lido o
+    # valor antigo pode regravá-lo; nesse caso ele vive no máximo CACHE_TTL_SECONDS.
+    try:
+        await backend.delete(*keys)
+    except Exception as e:
+        logger.error('[cache] invalidate %s failed: %s', keys, e)
+
+
+def cache_stats() -> dict:
+    return {"backend": backend.name, "size": backend.size(), **backend.stats.as_dict()}
+
+
+def render_prometheus() -> list[str]:
+    stats = cache_stats()
+    lines = []
+    for field in ("hits", "misses", "sets", "invalidations", "evictions"):
+        name = f"cine_api_cache_{field}_total"
+        lines += [f"# TYPE {name} counter", f'{name}{{backend="{stats["backend"]}"}} {stats[field]}']
+    if stats["size"] is not None:
+        lines += ["# TYPE cine_api_cache_entries gauge", f'cine_api_cache_entries{{backend="{stats["backend"]}"}} {stats["size"]}']
+    return lines
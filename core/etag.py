@@ -0,0 +1,29 @@
+import os
+import threading
+
+# Versão por tabela, incrementada pelos routers depois de cada commit.
+# O epoch distingue processos/reinícios: a mesma versão em outro processo não
+# representa o mesmo conteúdo.
+_epoch = os.urandom(4).hex()
+_versions: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def bump(*tables: str):
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def current_etag(*tables: str) -> str:
+    versions = "-".join(str(_versions.get(table, 0)) for table in tables)
+    return f'W/"{_epoch}-{versions}"'
+
+
+def matches(if_none_match: str, etag: str) -> bool:
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    # "*" não é tratado: sem a consulta não dá para saber se o recurso existe
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+
+class KeyReused(Exception):
+    """A mesma Idempotency-Key chegou com um corpo diferente do original."""
+
+
+class Entry:
+    __slots__ = ("fingerprint", "resource_id", "body", "expires_at")
+
+    def __init__(self, fingerprint: str, resource_id: int, body: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.resource_id = resource_id
+        self.body = body  # JSON da resposta original, devolvido como está nas retentativas
+        self.expires_at = expires_at
+
+
+class RecentKeys:
+    """LRU com TTL das últimas chaves atendidas. É só um atalho para responder
+    retentativas sem tocar no banco: quem garante a unicidade é o índice único,
+    então perder uma entrada (evicção, restart, outro processo) é seguro."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[str, Entry] = OrderedDict()
+        self.by_resource: dict[int, set[str]] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, fingerprint: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            if entry.fingerprint != fingerprint:
+                raise KeyReused(key)
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry.body
+
+    def put(self, key: str, fingerprint: str, resource_id: int, body: bytes):
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = Entry(fingerprint, resource_id, body, time.monotonic() + self.ttl)
+            self.by_resource.setdefault(resource_id, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+
+    def forget(self, resource_id: int):
+        # Depois de um update/delete a resposta guardada não vale mais
+        with self.lock:
+            for key in list(self.by_resource.get(resource_id, ())):
+                self._drop(key)
+
+    def _drop(self, key: str):
+        entry = self.entries.pop(key)
+        keys = self.by_resource.get(entry.resource_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_resource[entry.resource_id]
+
+    def stats(self) -> dict:
+        return {"size": len(self.entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+def fingerprint(payload: bytes) -> str:
+    return hashlib.sha256(payload).hexdigest()
+
+
+payments = RecentKeys(IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL_SECONDS)
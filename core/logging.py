@@ -1,16 +1,149 @@
 import os
+import json
+import time
+import queue
+import atexit
+import random
 import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
 
 LOG_FILE = os.getenv("LOG_FILE", "app.log")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# text | json
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Amostragem por logger, ex.: "cine_api=0.1,httpx=0"
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+# Máximo de registros por segundo por logger (0 = sem limite)
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "0"))
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes", "on")
 
-logging.basicConfig(
-    level=LOG_LEVEL,
-    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
 
-logger = logging.getLogger('cine_api')
\ No newline at end of file
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Descarta registros abaixo de WARNING conforme a taxa de amostragem e o
+    limite de registros por segundo de cada logger. Roda na thread que loga,
+    antes do registro entrar na fila."""
+
+    def __init__(self, sample_rates: dict[str, float], rate_limit: float):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limit = rate_limit
+        self.buckets: dict[str, list[float]] = {}  # logger -> [tokens, atualizado_em]
+        self.dropped: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def _sample_rate(self, name: str) -> float:
+        # Usa a configuração do logger mais específico (ex.: "sqlalchemy" vale para "sqlalchemy.engine")
+        while name:
+            if name in self.sample_rates:
+                return self.sample_rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def _take_token(self, name: str) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.setdefault(name, [self.rate_limit, now])
+            bucket[0] = min(self.rate_limit, bucket[0] + (now - bucket[1]) * self.rate_limit)
+            bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._sample_rate(record.name)
+        keep = rate >= 1 or random.random() < rate
+        if keep and self.rate_limit > 0:
+            keep = self._take_token(record.name)
+        if not keep:
+            with self.lock:
+                self.dropped[record.name] = self.dropped.get(record.name, 0) + 1
+        return keep
+
+
+class DroppingQueueHandler(QueueHandler):
+    # Com a fila cheia o registro é descartado em vez de bloquear a requisição
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.overflow = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.overflow += 1
+
+
+def _parse_sample_rates(spec: str) -> dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+file_handler = logging.FileHandler(LOG_FILE)
+stream_handler = logging.StreamHandler()
+for handler in (file_handler, stream_handler):
+    handler.setFormatter(formatter)
+
+# As escritas em arquivo/terminal ficam numa thread própria; a requisição só
+# enfileira o registro.
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+sampling_filter = SamplingFilter(_parse_sample_rates(LOG_SAMPLE), LOG_RATE_LIMIT)
+queue_handler = DroppingQueueHandler(log_queue)
+# Só junta msg % args; o formato final é aplicado pelos handlers na thread de escrita
+queue_handler.setFormatter(logging.Formatter("%(message)s"))
+queue_handler.addFilter(sampling_filter)
+listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+
+logging.basicConfig(level=LOG_LEVEL, handlers=[queue_handler])
+listener.start()
+atexit.register(listener.stop)
+
+logger = logging.getLogger('cine_api')
+
+# Canal de SQL (sqlalchemy.engine): substitui o echo=True das engines e pode
+# ser ligado/desligado em tempo de execução.
+sql_logger = logging.getLogger("sqlalchemy.engine")
+
+
+def set_sql_echo(enabled: bool):
+    global SQL_ECHO
+    SQL_ECHO = enabled
+    sql_logger.setLevel(logging.INFO if enabled else logging.WARNING)
+
+
+def logging_stats() -> dict:
+    with sampling_filter.lock:
+        dropped = dict(sampling_filter.dropped)
+    return {
+        "format": LOG_FORMAT,
+        "sql_echo": SQL_ECHO,
+        "queue_size": log_queue.qsize(),
+        "queue_overflow": queue_handler.overflow,
+        "dropped_by_filter": dropped,
+    }
+
+
+set_sql_echo(SQL_ECHO)
@@ -0,0 +1,260 @@
+import os
+import re
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from core.logging import logger
+
+# Limites (le) dos buckets; a contagem em cada bucket é acumulada só na exportação
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+METRICS_PREFIX = "cine_api"
+
+# Mesmo comando SQL (mesmo texto, parâmetros à parte) repetido N vezes numa
+# requisição é tratado como N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+# Adiciona cabeçalhos X-DB-* nas respostas (só para depuração)
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "false").lower() in ("1", "true", "yes", "on")
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteStats:
+    __slots__ = ("latency", "response_size", "db_time", "db_rows", "db_statements", "in_flight", "status",
+                 "n_plus_one", "slow_queries")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.db_rows = Histogram(ROWS_BUCKETS)
+        self.db_statements = 0
+        self.in_flight = 0
+        self.status: dict[str, int] = {}
+        self.n_plus_one = 0
+        self.slow_queries = 0
+
+
+class RequestDbStats:
+    """Acumulado de banco da requisição atual; preenchido pelos hooks de cursor em database.py."""
+    __slots__ = ("time", "rows", "statements", "shapes", "slow")
+
+    def __init__(self):
+        self.time = 0.0
+        self.rows = 0
+        self.statements = 0
+        self.shapes: dict[str, int] = {}  # texto do comando -> execuções
+        self.slow = 0
+
+    def repeated(self) -> list[tuple[str, int]]:
+        return sorted(
+            ((statement, count) for statement, count in self.shapes.items() if count >= N_PLUS_ONE_THRESHOLD),
+            key=lambda item: -item[1],
+        )
+
+
+# O objeto é mutável: o greenlet do SQLAlchemy herda o contexto da task
+# (gr_context), então as escritas feitas lá aparecem aqui.
+current_db_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("current_db_stats", default=None)
+
+_routes: dict[tuple[str, str], RouteStats] = {}
+# Só protege a criação de entradas; as atualizações acontecem na thread do event loop
+_routes_lock = threading.Lock()
+
+
+def _route_stats(method: str, route: str) -> RouteStats:
+    stats = _routes.get((method, route))
+    if stats is None:
+        with _routes_lock:
+            stats = _routes.setdefault((method, route), RouteStats())
+    return stats
+
+
+def record_db_statement(elapsed: float, rows: int, statement: str, slow: bool = False):
+    stats = current_db_stats.get()
+    if stats is not None:
+        stats.time += elapsed
+        stats.rows += rows
+        stats.statements += 1
+        stats.shapes[statement] = stats.shapes.get(statement, 0) + 1
+        stats.slow += slow
+
+
+def add_db_rows(rows: int):
+    # Para leituras em streaming, cujas linhas não são conhecidas no execute
+    stats = current_db_stats.get()
+    if stats is not None:
+        stats.rows += rows
+
+
+def _short_sql(statement: str, limit: int = 160) -> str:
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def _debug_headers(db_stats: RequestDbStats) -> list[tuple[bytes, bytes]]:
+    headers = [
+        (b"x-db-statements", str(db_stats.statements).encode()),
+        (b"x-db-time-ms", f"{db_stats.time * 1000:.2f}".encode()),
+        (b"x-db-slow-queries", str(db_stats.slow).encode()),
+    ]
+    repeated = db_stats.repeated()
+    if repeated:
+        summary = " | ".join(f"{count}x {_short_sql(statement)}" for statement, count in repeated)
+        headers.append((b"x-db-n-plus-one", summary.encode("latin-1", "replace")))
+    return headers
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: mede latência, tamanho da resposta, status e
+    tempo/linhas de banco por template de rota (ex.: /movies/{movie_id})."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        db_stats = RequestDbStats()
+        token = current_db_stats.set(db_stats)
+        status_code = 500
+        size = 0
+        # A rota só é conhecida depois do roteamento; até lá o in-flight fica
+        # em "pending" e é transferido quando a resposta começa
+        in_flight = _route_stats(scope["method"], "pending")
+        in_flight.in_flight += 1
+
+        async def send_wrapper(message):
+            nonlocal status_code, size, in_flight
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if SQL_DEBUG_HEADERS:
+                    # Em respostas em streaming reflete só o que rodou antes do primeiro byte
+                    message = {**message, "headers": [*message.get("headers", []), *_debug_headers(db_stats)]}
+                in_flight.in_flight -= 1
+                in_flight = _route_stats(scope["method"], _route_template(scope))
+                in_flight.in_flight += 1
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.in_flight -= 1
+            current_db_stats.reset(token)
+            stats = _route_stats(scope["method"], _route_template(scope))
+            stats.latency.observe(time.perf_counter() - start)
+            stats.response_size.observe(size)
+            stats.db_time.observe(db_stats.time)
+            stats.db_rows.observe(db_stats.rows)
+            stats.db_statements += db_stats.statements
+            stats.slow_queries += db_stats.slow
+            repeated = db_stats.repeated()
+            if repeated:
+                stats.n_plus_one += 1
+                for statement, count in repeated:
+                    logger.warning('[n+1] %s %s ran the same statement %s times: %s',
+                                   scope["method"], _route_template(scope), count, _short_sql(statement))
+            key = str(status_code)
+            stats.status[key] = stats.status.get(key, 0) + 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _render_histogram(lines: list[str], name: str, histogram: Histogram, **labels):
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+HISTOGRAMS = (
+    ("request_duration_seconds", "latency", "Tempo total da requisição"),
+    ("response_size_bytes", "response_size", "Tamanho do corpo da resposta"),
+    ("db_time_seconds", "db_time", "Tempo gasto em comandos SQL por requisição"),
+    ("db_rows", "db_rows", "Linhas lidas/alteradas no banco por requisição"),
+)
+
+
+def render_prometheus() -> str:
+    """Exporta as métricas no formato texto do Prometheus (version 0.0.4)."""
+    with _routes_lock:
+        routes = sorted(_routes.items())
+    lines = []
+
+    name = f"{METRICS_PREFIX}_requests_total"
+    lines += [f"# HELP {name} Requisições atendidas por rota e status", f"# TYPE {name} counter"]
+    for (method, route), stats in routes:
+        for status, count in sorted(stats.status.items()):
+            lines.append(f"{name}{_labels(method=method, route=route, status=status)} {count}")
+
+    name = f"{METRICS_PREFIX}_request_errors_total"
+    lines += [f"# HELP {name} Respostas 5xx por rota", f"# TYPE {name} counter"]
+    for (method, route), stats in routes:
+        if stats.status:
+            errors = sum(count for status, count in stats.status.items() if status.startswith("5"))
+            lines.append(f"{name}{_labels(method=method, route=route)} {errors}")
+
+    name = f"{METRICS_PREFIX}_requests_in_flight"
+    lines += [f"# HELP {name} Requisições em andamento", f"# TYPE {name} gauge"]
+    for (method, route), stats in routes:
+        lines.append(f"{name}{_labels(method=method, route=route)} {stats.in_flight}")
+
+    name = f"{METRICS_PREFIX}_db_statements_total"
+    lines += [f"# HELP {name} Comandos SQL executados por rota", f"# TYPE {name} counter"]
+    for (method, route), stats in routes:
+        lines.append(f"{name}{_labels(method=method, route=route)} {stats.db_statements}")
+
+    name = f"{METRICS_PREFIX}_slow_queries_total"
+    lines += [f"# HELP {name} Comandos SQL acima de SQL_SLOW_QUERY_MS por rota", f"# TYPE {name} counter"]
+    for (method, route), stats in routes:
+        lines.append(f"{name}{_labels(method=method, route=route)} {stats.slow_queries}")
+
+    name = f"{METRICS_PREFIX}_n_plus_one_total"
+    lines += [f"# HELP {name} Requisições com comando SQL repetido (N+1) por rota", f"# TYPE {name} counter"]
+    for (method, route), stats in routes:
+        lines.append(f"{name}{_labels(method=method, route=route)} {stats.n_plus_one}")
+
+    for suffix, attr, help_text in HISTOGRAMS:
+        name = f"{METRICS_PREFIX}_{suffix}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (method, route), stats in routes:
+            if stats.latency.count:
+                _render_histogram(lines, name, getattr(stats, attr), method=method, route=route)
+    return "\n".join(lines) + "\n"
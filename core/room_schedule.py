@@ -0,0 +1,149 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.models import Movie
+from models.models import Session as SessionModel
+
+
+class RoomOverlap(Exception):
+    def __init__(self, session_id: Optional[int]):
+        super().__init__(session_id)
+        self.session_id = session_id
+
+
+class Booking:
+    __slots__ = ("start", "end", "session_id")
+
+    def __init__(self, start: datetime, end: datetime, session_id: Optional[int]):
+        self.start = start
+        self.end = end
+        self.session_id = session_id  # None enquanto a sessão nova não foi commitada
+
+    def __lt__(self, other):
+        return self.start < other.start
+
+
+class RoomSchedule:
+    """Sessões de uma sala ordenadas pelo início. Como nenhuma sessão dura mais que
+    max_duration, só as que começam em [início - max_duration, fim) podem se
+    sobrepor a um intervalo: duas buscas binárias e poucas comparações."""
+
+    def __init__(self, bookings):
+        self.bookings: list[Booking] = sorted(bookings)
+        self.starts = [booking.start for booking in self.bookings]
+        self.max_duration = max((booking.end - booking.start for booking in self.bookings), default=timedelta(0))
+
+    def window(self, start: datetime, end: datetime) -> list[Booking]:
+        low = bisect_right(self.starts, start - self.max_duration)
+        high = bisect_left(self.starts, end)
+        return [booking for booking in self.bookings[low:high] if booking.end > start]
+
+    def add(self, booking: Booking):
+        position = bisect_right(self.starts, booking.start)
+        self.starts.insert(position, booking.start)
+        self.bookings.insert(position, booking)
+        self.max_duration = max(self.max_duration, booking.end - booking.start)
+
+    def remove(self, booking: Booking):
+        # A agenda pode ter sido recarregada (invalidate) sem a reserva: nada a remover
+        position = bisect_left(self.starts, booking.start)
+        while position < len(self.starts) and self.starts[position] == booking.start:
+            if self.bookings[position] is booking:
+                del self.starts[position]
+                del self.bookings[position]
+                return
+            position += 1
+
+    def find(self, session_id: int, start: datetime) -> Optional[Booking]:
+        position = bisect_left(self.starts, start)
+        while position < len(self.starts) and self.starts[position] == start:
+            if self.bookings[position].session_id == session_id:
+                return self.bookings[position]
+            position += 1
+        return None
+
+
+_schedules: dict[int, RoomSchedule] = {}
+_lock = threading.Lock()
+
+
+def session_end(start: datetime, duration: Optional[int]) -> datetime:
+    # Movie.duration em minutos; sessão sem filme ocupa só o instante de início
+    return start + timedelta(minutes=duration or 0)
+
+
+async def get_room_schedule(session: AsyncSession, room_id: int) -> RoomSchedule:
+    """Retorna a agenda da sala, montando-a a partir das sessões no primeiro acesso."""
+    schedule = _schedules.get(room_id)
+    if schedule is not None:
+        return schedule
+
+    rows = (await session.exec(
+        select(SessionModel.session_id, SessionModel.date_time, Movie.duration)
+        .outerjoin(Movie, SessionModel.movie_id == Movie.movie_id)
+        .where(SessionModel.room_id == room_id)
+    )).all()
+    bookings = [Booking(row.date_time, session_end(row.date_time, row.duration), row.session_id) for row in rows]
+
+    with _lock:
+        return _schedules.setdefault(room_id, RoomSchedule(bookings))
+
+
+async def reserve(session: AsyncSession, room_id: Optional[int], session_id: Optional[int],
+                  start: datetime, end: datetime) -> Optional[Booking]:
+    """Verifica sobreposição e ocupa o intervalo sob o mesmo lock; a própria sessão
+    (session_id) é ignorada na verificação. Deve ser chamado antes do commit e
+    desfeito com release se o commit falhar."""
+    if room_id is None:
+        return None
+    schedule = await get_room_schedule(session, room_id)
+    booking = Booking(start, end, session_id)
+    with _lock:
+        for other in schedule.window(start, end):
+            if session_id is None or other.session_id != session_id:
+                raise RoomOverlap(other.session_id)
+        schedule.add(booking)
+    return booking
+
+
+def find(room_id: Optional[int], session_id: int, start: datetime) -> Optional[Booking]:
+    schedule = _schedules.get(room_id)
+    if schedule is None:
+        return None
+    with _lock:
+        return schedule.find(session_id, start)
+
+
+def release(room_id: Optional[int], booking: Optional[Booking]):
+    schedule = _schedules.get(room_id)
+    if schedule is not None and booking is not None:
+        with _lock:
+            schedule.remove(booking)
+
+
+def free_slots(schedule: RoomSchedule, start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    """Intervalos livres da sala dentro de [start, end)."""
+    slots = []
+    cursor = start
+    with _lock:
+        bookings = schedule.window(start, end)
+    for booking in bookings:
+        if booking.start > cursor:
+            slots.append((cursor, booking.start))
+        cursor = max(cursor, booking.end)
+    if cursor < end:
+        slots.append((cursor, end))
+    return slots
+
+
+def invalidate(room_id: Optional[int] = None):
+    with _lock:
+        if room_id is None:
+            _schedules.clear()
+        else:
+            _schedules.pop(room_id, None)
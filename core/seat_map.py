@@ -0,0 +1,112 @@
+import threading
+from typing import Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.models import Room, Ticket
+from models.models import Session as SessionModel
+
+
+class SeatUnavailable(Exception):
+    pass
+
+
+class SeatOutOfRange(Exception):
+    pass
+
+
+class SeatMap:
+    """Ocupação das poltronas de uma sessão como um bitset (bit N = poltrona N).
+    Poltronas são numeradas a partir de 1; capacity é None quando a sessão não tem sala."""
+
+    def __init__(self, capacity: Optional[int], chairs):
+        self.capacity = capacity
+        self.bits = 0
+        for chair in chairs:
+            # Linha antiga com poltrona inválida (ex.: negativa) não entra no mapa;
+            # reserve_seat já recusa essas poltronas pelo check_range
+            if chair is not None and 1 <= chair and (capacity is None or chair <= capacity):
+                self.bits |= 1 << chair
+
+    def is_taken(self, chair: int) -> bool:
+        return bool(self.bits >> chair & 1)
+
+    def check_range(self, chair: int):
+        if chair < 1 or (self.capacity is not None and chair > self.capacity):
+            raise SeatOutOfRange(chair)
+
+    def occupied(self) -> list[int]:
+        bits, chairs, chair = self.bits, [], 0
+        while bits:
+            if bits & 1:
+                chairs.append(chair)
+            bits >>= 1
+            chair += 1
+        return chairs
+
+    def free(self) -> Optional[list[int]]:
+        if self.capacity is None:
+            return None
+        return [chair for chair in range(1, self.capacity + 1) if not self.bits >> chair & 1]
+
+    def available(self) -> Optional[int]:
+        if self.capacity is None:
+            return None
+        in_room = self.bits & ((1 << (self.capacity + 1)) - 2)
+        return self.capacity - in_room.bit_count()
+
+
+_maps: dict[int, SeatMap] = {}
+_lock = threading.Lock()
+
+
+async def get_seat_map(session: AsyncSession, session_id: int) -> Optional[SeatMap]:
+    """Retorna o mapa da sessão, montando-o a partir da tabela de tickets no primeiro acesso."""
+    seat_map = _maps.get(session_id)
+    if seat_map is not None:
+        return seat_map
+
+    row = (await session.exec(
+        select(SessionModel.session_id, Room.capacity)
+        .outerjoin(Room, SessionModel.room_id == Room.room_id)
+        .where(SessionModel.session_id == session_id)
+    )).first()
+    if row is None:
+        return None
+    chairs = (await session.exec(select(Ticket.chair_number).where(Ticket.session_id == session_id))).all()
+
+    with _lock:
+        # Outra requisição pode ter montado o mapa enquanto consultávamos o banco
+        return _maps.setdefault(session_id, SeatMap(row.capacity, chairs))
+
+
+async def reserve_seat(session: AsyncSession, session_id: Optional[int], chair: int):
+    """Marca a poltrona como ocupada; verificação e marcação acontecem sob o mesmo lock.
+    Deve ser chamado antes do commit e desfeito com release_seat se o commit falhar."""
+    if session_id is None:
+        return
+    seat_map = await get_seat_map(session, session_id)
+    if seat_map is None:
+        # Sessão inexistente: a FK vai rejeitar o ticket no commit
+        return
+    seat_map.check_range(chair)
+    with _lock:
+        if seat_map.is_taken(chair):
+            raise SeatUnavailable(chair)
+        seat_map.bits |= 1 << chair
+
+
+def release_seat(session_id: Optional[int], chair: int):
+    seat_map = _maps.get(session_id)
+    if seat_map is not None:
+        with _lock:
+            seat_map.bits &= ~(1 << chair)
+
+
+def invalidate(session_id: Optional[int] = None):
+    with _lock:
+        if session_id is None:
+            _maps.clear()
+        else:
+            _maps.pop(session_id, None)
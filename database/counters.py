@@ -0,0 +1,121 @@
+import sys
+import time
+import argparse
+
+from sqlalchemy import event, func, text
+from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.models import EntityCounter
+
+# Tabelas cuja quantidade de linhas é mantida em entity_counters
+COUNTED_TABLES = ("movie", "director", "room", "session", "ticket", "paymentdetails")
+
+# Cópia em memória dos contadores (entity_name -> (total, lido_em))
+CACHE_TTL_SECONDS = 5.0
+_cache: dict[str, tuple[int, float]] = {}
+
+
+def counter_triggers_ddl(table: str) -> list[str]:
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert AFTER INSERT ON {table}
+        BEGIN
+            UPDATE entity_counters SET total = total + 1 WHERE entity_name = '{table}';
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE entity_counters SET total = total - 1 WHERE entity_name = '{table}';
+        END""",
+    ]
+
+
+def seed_counter_sql(table: str) -> str:
+    return f"INSERT OR IGNORE INTO entity_counters (entity_name, total) SELECT '{table}', COUNT(*) FROM {table}"
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def install_counters(target, connection, **kw):
+    # Executado pelo create_all: cria os triggers e inicializa os contadores
+    # sem sobrescrever valores já existentes.
+    for table in COUNTED_TABLES:
+        connection.exec_driver_sql(seed_counter_sql(table))
+        for ddl in counter_triggers_ddl(table):
+            connection.exec_driver_sql(ddl)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_counted_writes(session, flush_context):
+    dirty = session.info.setdefault("counters_dirty", set())
+    for obj in list(session.new) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table in COUNTED_TABLES:
+            dirty.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for table in session.info.pop("counters_dirty", ()):
+        _cache.pop(table, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("counters_dirty", None)
+
+
+def invalidate(*tables: str):
+    # Para escritas feitas fora do ORM (ex.: INSERT em lote)
+    for table in tables or COUNTED_TABLES:
+        _cache.pop(table, None)
+
+
+async def get_count(session: AsyncSession, table: str) -> int:
+    cached = _cache.get(table)
+    if cached is not None and time.monotonic() - cached[1] < CACHE_TTL_SECONDS:
+        return cached[0]
+
+    counter = await session.get(EntityCounter, table)
+    if counter is not None:
+        total = counter.total
+    else:
+        # Banco sem os triggers instalados: cai para o COUNT(*)
+        total = (await session.exec(select(func.count()).select_from(text(table)))).one()
+    _cache[table] = (total, time.monotonic())
+    return total
+
+
+def check_counters(session: Session) -> dict[str, dict]:
+    report = {}
+    for table in COUNTED_TABLES:
+        actual = session.exec(select(func.count()).select_from(text(table))).one()
+        counter = session.get(EntityCounter, table)
+        stored = counter.total if counter is not None else None
+        report[table] = {"stored": stored, "actual": actual, "drift": stored != actual}
+    return report
+
+
+def rebuild_counters(session: Session) -> dict[str, dict]:
+    report = check_counters(session)
+    for table, item in report.items():
+        if item["drift"]:
+            session.merge(EntityCounter(entity_name=table, total=item["actual"]))
+    session.commit()
+    invalidate()
+    return report
+
+
+if __name__ == "__main__":
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Verifica (e opcionalmente reconstrói) a tabela entity_counters")
+    parser.add_argument("--rebuild", action="store_true", help="corrige os contadores com divergência")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        report = rebuild_counters(session) if args.rebuild else check_counters(session)
+
+    for table, item in report.items():
+        status = "DRIFT" if item["drift"] else "ok"
+        print(f"{table:<16} stored={item['stored']!s:<10} actual={item['actual']:<10} {status}")
+    if not args.rebuild and any(item["drift"] for item in report.values()):
+        sys.exit(1)
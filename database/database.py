@@ -1,23 +1,169 @@
-from sqlmodel import create_engine, Session, SQLModel
+from sqlmodel import create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
 from dotenv import load_dotenv
+import asyncio
+import logging
 import os
+import time
+from typing import AsyncGenerator
+
+from core.logging import logger
+from core import metrics
 
 load_dotenv(os.path.join(os.path.dirname(__file__), "db.env"))
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, echo=True)
+# Mesmo banco acessado pelo driver aiosqlite (rotas da API)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1))
+
+# Perfis de PRAGMA do SQLite. Cada valor pode ser sobrescrito em db.env
+# com SQLITE_<PRAGMA> (ex.: SQLITE_SYNCHRONOUS=FULL).
+#   durable:    WAL com fsync a cada commit
+#   balanced:   WAL com fsync só no checkpoint (não corrompe o banco, mas
+#               uma queda de energia pode perder os últimos commits)
+#   throughput: sem fsync; para cargas de teste e importações
+SQLITE_PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "mmap_size": 134217728,
+        "temp_store": "MEMORY",
+    },
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "busy_timeout": 10000,
+        "cache_size": -64000,
+        "mmap_size": 536870912,
+        "temp_store": "MEMORY",
+    },
+}
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "balanced").lower()
+if SQLITE_PROFILE not in SQLITE_PROFILES:
+    raise ValueError(f"Unknown SQLITE_PROFILE '{SQLITE_PROFILE}', expected one of {', '.join(SQLITE_PROFILES)}")
+
+SQLITE_PRAGMAS = {
+    name: os.getenv(f"SQLITE_{name.upper()}", value)
+    for name, value in SQLITE_PROFILES[SQLITE_PROFILE].items()
+}
+# Comandos mais lentos que isso vão para o log de slow queries com o plano; 0 desativa
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+slow_query_logger = logging.getLogger("cine_api.slow_sql")
+
+# Intervalo (segundos) entre wal_checkpoint(PASSIVE) + PRAGMA optimize; 0 desativa
+SQLITE_MAINTENANCE_INTERVAL = float(os.getenv("SQLITE_MAINTENANCE_INTERVAL", "300"))
+
+# Engine síncrona: Alembic, comandos de manutenção (python -m database.*) e os
+# snapshots de core/analytics.py, montados numa thread
+engine = create_engine(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+
 
-# Ativa a verificação de foreign keys no SQLite
-from sqlalchemy.engine import Engine
-@event.listens_for(Engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     cursor = dbapi_connection.cursor()
+    # Ativa a verificação de foreign keys no SQLite
     cursor.execute("PRAGMA foreign_keys=ON")
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
     cursor.close()
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-    
-def get_session() -> Session:
-    return Session(engine)
\ No newline at end of file
+
+def apply_sqlite_profile(target_engine):
+    event.listen(target_engine, "connect", set_sqlite_pragma)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    # SELECT no sqlite3 devolve rowcount -1; o cursor do aiosqlite já traz as
+    # linhas carregadas em _rows (exceto em streaming, contado em ndjson_export)
+    rows = cursor.rowcount if cursor.rowcount >= 0 else len(getattr(cursor, "_rows", ()))
+    slow = SQL_SLOW_QUERY_MS > 0 and elapsed * 1000 >= SQL_SLOW_QUERY_MS
+    metrics.record_db_statement(elapsed, rows, statement, slow)
+    if slow:
+        _log_slow_query(conn, statement, parameters, elapsed, executemany)
+
+
+def _log_slow_query(conn, statement, parameters, elapsed, executemany):
+    plan = "n/a"
+    if not executemany and not statement.lstrip().upper().startswith(("PRAGMA", "EXPLAIN")):
+        # Cursor DBAPI direto: não passa pelos eventos da engine, então o
+        # EXPLAIN não dispara este hook de novo
+        try:
+            explain = conn.connection.dbapi_connection.cursor()
+            try:
+                explain.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                plan = "; ".join(str(row[-1]) for row in explain.fetchall())
+            finally:
+                explain.close()
+        except Exception as e:
+            plan = f"unavailable ({e})"
+    slow_query_logger.warning('[slow_sql] %.1f ms: %s | params=%r | plan: %s',
+                              elapsed * 1000, " ".join(statement.split()), parameters, plan)
+
+
+def instrument_engine(target_engine):
+    event.listen(target_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+for _engine in (engine, async_engine.sync_engine):
+    apply_sqlite_profile(_engine)
+    instrument_engine(_engine)
+
+
+async def log_sqlite_settings():
+    # Lê de volta os valores aplicados (ex.: journal_mode não muda em bancos :memory:)
+    async with async_engine.connect() as conn:
+        effective = {}
+        for name in ("foreign_keys", *SQLITE_PRAGMAS):
+            effective[name] = (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+    settings = ", ".join(f"{name}={value}" for name, value in effective.items())
+    logger.info('[sqlite] Profile %s: %s', SQLITE_PROFILE, settings)
+
+
+async def run_sqlite_maintenance():
+    async with async_engine.connect() as conn:
+        busy, log_frames, checkpointed = (await conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")).one()
+        await conn.exec_driver_sql("PRAGMA optimize")
+    logger.info('[sqlite] Checkpoint: %s/%s WAL frames copied (busy=%s); optimize done.', checkpointed, log_frames, busy)
+
+
+async def sqlite_maintenance_loop():
+    if SQLITE_MAINTENANCE_INTERVAL <= 0:
+        return
+    while True:
+        await asyncio.sleep(SQLITE_MAINTENANCE_INTERVAL)
+        try:
+            await run_sqlite_maintenance()
+        except Exception as e:
+            logger.error('[sqlite] Maintenance failed: %s', e)
+
+
+async def create_db_and_tables():
+    # Registra os listeners que instalam triggers e tabelas derivadas no create_all
+    from database import counters, rollups, fts  # noqa: F401
+    async with async_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False: os objetos continuam legíveis após o commit sem
+    # disparar um novo SELECT (lazy load fora do event loop não é permitido)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,92 @@
+import re
+import time
+import argparse
+
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session
+
+# Índices FTS5 de conteúdo externo: guardam só o índice invertido e leem o
+# texto de movie/director. Os triggers mantêm o índice em dia a cada escrita.
+FTS_TABLES = {
+    "movie_fts": {
+        "content": "movie",
+        "rowid": "movie_id",
+        "columns": ("movie_title", "synopsis", "genre"),
+    },
+    "director_fts": {
+        "content": "director",
+        "rowid": "director_id",
+        "columns": ("director_name", "biography", "nationality"),
+    },
+}
+
+# remove_diacritics: "acao" encontra "ação"; prefix: índices auxiliares para termo*
+FTS_OPTIONS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+
+def fts_ddl(name: str) -> list[str]:
+    spec = FTS_TABLES[name]
+    table, rowid = spec["content"], spec["rowid"]
+    columns = ", ".join(spec["columns"])
+    new_values = ", ".join(f"new.{column}" for column in spec["columns"])
+    old_values = ", ".join(f"old.{column}" for column in spec["columns"])
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5(
+            {columns}, content = '{table}', content_rowid = '{rowid}', {FTS_OPTIONS}
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{name}_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {name} (rowid, {columns}) VALUES (new.{rowid}, {new_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{name}_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {name} ({name}, rowid, {columns}) VALUES ('delete', old.{rowid}, {old_values});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{name}_update AFTER UPDATE OF {columns} ON {table}
+        BEGIN
+            INSERT INTO {name} ({name}, rowid, {columns}) VALUES ('delete', old.{rowid}, {old_values});
+            INSERT INTO {name} (rowid, {columns}) VALUES (new.{rowid}, {new_values});
+        END""",
+    ]
+
+
+def rebuild_fts(connection):
+    for name in FTS_TABLES:
+        connection.exec_driver_sql(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def install_fts(target, connection, **kw):
+    # Como em rollups: o índice só é reconstruído quando a tabela FTS é nova
+    existing = {
+        name for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    missing = [name for name in FTS_TABLES if name not in existing]
+    for name in FTS_TABLES:
+        for ddl in fts_ddl(name):
+            connection.exec_driver_sql(ddl)
+    for name in missing:
+        connection.exec_driver_sql(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+
+
+def build_match_query(text: str, prefix: bool = True) -> str:
+    """Converte o texto digitado em uma expressão MATCH segura: cada palavra
+    vira um termo entre aspas (sem operadores do FTS5), todas obrigatórias,
+    e com prefix=True cada uma casa como prefixo ("matr" encontra "matrix")."""
+    terms = re.findall(r"\w+", text)
+    return " ".join(f'"{term}"' + ("*" if prefix else "") for term in terms)
+
+
+if __name__ == "__main__":
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Reconstrói os índices FTS5 de movie/director")
+    parser.parse_args()
+
+    start = time.perf_counter()
+    with Session(engine) as session:
+        rebuild_fts(session.connection())
+        session.commit()
+    print(f"fts indexes rebuilt in {time.perf_counter() - start:.2f}s")
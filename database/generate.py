@@ -0,0 +1,392 @@
+"""Gera dados sintéticos no schema de models/models.py para testes de escala.
+
+    python -m database.generate --db /tmp/big.sqlite3 --sessions 150000 --tickets 10000000
+    python -m database.generate --db /tmp/big.sqlite3 --mode append --sessions 5000 --tickets 200000
+
+A carga usa sqlite3 + executemany em transações grandes, com PRAGMAs relaxados
+e sem os triggers/índices secundários de ticket e paymentdetails; no fim eles
+são recriados e contadores, rollups de receita e índices FTS são reconstruídos.
+Mesma semente + mesmos argumentos + mesmo banco de partida = mesmos dados.
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from bisect import bisect
+from functools import lru_cache
+from itertools import accumulate
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlmodel import SQLModel, Session
+
+import models.models  # noqa: F401  (registra as tabelas no metadata)
+from database import counters, rollups, fts
+
+FIRST_NAMES = ("Ana", "João", "Maria", "Pedro", "Lucas", "Julia", "Rafael", "Beatriz", "Carlos", "Fernanda",
+               "Akira", "Sofia", "Martin", "Chloé", "Hiroshi", "Valentina", "Bong", "Greta", "Pablo", "Agnès")
+LAST_NAMES = ("Silva", "Souza", "Oliveira", "Costa", "Pereira", "Almeida", "Kurosawa", "Varda", "Gerwig",
+              "Almodóvar", "Joon-ho", "Villeneuve", "Meirelles", "Salles", "Coppola", "Nolan", "Lee", "Ferreira")
+NATIONALITIES = (("Brasil", 40), ("EUA", 25), ("França", 8), ("Japão", 6), ("Coreia do Sul", 5),
+                 ("Argentina", 5), ("Espanha", 5), ("Reino Unido", 6))
+TITLE_WORDS = ("noite", "sombra", "último", "céu", "caminho", "segredo", "cidade", "mar", "fogo", "tempo",
+               "amor", "guerra", "silêncio", "estrela", "vento", "casa", "memória", "abismo", "sol", "rio",
+               "lobo", "espelho", "jardim", "fronteira", "sonho", "ilha", "trem", "herdeiro", "chuva", "voo")
+SYNOPSIS_WORDS = TITLE_WORDS + ("uma", "família", "descobre", "viagem", "perigo", "vingança", "amigos",
+                                "mistério", "passado", "futuro", "luta", "verdade", "encontra", "perde", "volta")
+GENRES = (("Drama", 25), ("Ação", 18), ("Comédia", 18), ("Terror", 10), ("Ficção", 10),
+          ("Romance", 9), ("Animação", 7), ("Documentário", 3))
+RATINGS = (("L", 20), ("10", 15), ("12", 25), ("14", 22), ("16", 12), ("18", 6))
+# tipo de tela, peso, preço da inteira, tipo de exibição das sessões da sala
+SCREENS = (("2K Digital", 35, 24.0, "2D"), ("4K Digital", 25, 26.0, "2D"), ("RealD 3D", 25, 30.0, "3D"),
+           ("IMAX", 15, 42.0, "IMAX 2D"))
+CAPACITIES = (60, 80, 120, 150, 200, 250, 300)
+AUDIO_SYSTEMS = ("Dolby Digital 5.1", "Dolby Surround 7.1", "Dolby Atmos 12.1", "DTS:X")
+PAYMENT_METHODS = (("PIX", 45), ("Cartão de Crédito", 35), ("Cartão de Débito", 15), ("Dinheiro", 5))
+TICKET_STATUS = (("Confirmado", 92), ("Pendente", 5), ("Cancelado", 3))
+
+# Intervalo de limpeza entre sessões da mesma sala (min) e último início do dia
+CLEANING_MINUTES = (20, 30)
+LAST_START_HOUR = 22
+# Ocupação relativa por hora de início e por dia da semana (segunda = 0)
+HOUR_DEMAND = {11: 0.4, 12: 0.5, 13: 0.6, 14: 0.7, 15: 0.8, 16: 0.9, 17: 1.0, 18: 1.2,
+               19: 1.4, 20: 1.5, 21: 1.3, 22: 0.9, 23: 0.6}
+WEEKDAY_DEMAND = (0.7, 0.7, 0.8, 0.9, 1.2, 1.5, 1.3)
+# Lotação máxima média pedida; acima disso faltam sessões para os tickets
+MAX_OCCUPANCY = 0.9
+
+# PRAGMAs só desta carga (a conexão é descartada no fim)
+LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": -262144,
+    "temp_store": "MEMORY",
+    "locking_mode": "EXCLUSIVE",
+}
+# Tabelas grandes: índices secundários são removidos durante a carga e recriados depois
+BULK_TABLES = ("ticket", "paymentdetails")
+
+
+@lru_cache(maxsize=None)
+def _cum_weights(options) -> tuple[list, list, float]:
+    cum_weights = list(accumulate(option[1] for option in options))
+    return [option[0] for option in options], cum_weights, cum_weights[-1]
+
+
+def weighted(rng: random.Random, options) -> str:
+    # Mesmo resultado de rng.choices(..., cum_weights=...), sem o custo por chamada
+    values, cum_weights, total = _cum_weights(options)
+    return values[bisect(cum_weights, rng.random() * total)]
+
+
+def allocate(demands: list[float], capacities: list[int], total: int, rng: random.Random) -> list[int]:
+    """Divide total proporcionalmente à demanda sem passar da capacidade: sessões
+    que lotam saem da divisão e o excedente é redistribuído entre as demais."""
+    sold = [0] * len(demands)
+    pending = list(range(len(demands)))
+    remaining = total
+    while pending and remaining > 0:
+        scale = remaining / sum(demands[i] for i in pending)
+        full = [i for i in pending if demands[i] * scale >= capacities[i]]
+        if not full:
+            break
+        for i in full:
+            sold[i] = capacities[i]
+            remaining -= capacities[i]
+        full = set(full)
+        pending = [i for i in pending if i not in full]
+    if pending and remaining > 0:
+        scale = remaining / sum(demands[i] for i in pending)
+        for i in pending:
+            # Arredondamento estocástico mantém a soma perto de total
+            share = demands[i] * scale
+            sold[i] = min(capacities[i], int(share + rng.random()))
+    return sold
+
+
+def max_id(conn, table: str, column: str) -> int:
+    return conn.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}").fetchone()[0]
+
+
+def batched(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Generator:
+    def __init__(self, conn: sqlite3.Connection, args):
+        self.conn = conn
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.timings: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def insert(self, name: str, sql: str, rows):
+        start = time.perf_counter()
+        total = 0
+        for batch in batched(rows, self.args.batch_size):
+            self.conn.executemany(sql, batch)
+            total += len(batch)
+            if self.args.commit_every and total % self.args.commit_every < len(batch):
+                self.conn.commit()
+        self.conn.commit()
+        self.timings[name] = round(time.perf_counter() - start, 2)
+        self.counts[name] = total
+        return total
+
+    def directors(self, first_id: int) -> list[int]:
+        rng = self.rng
+        ids = list(range(first_id + 1, first_id + self.args.directors + 1))
+        self.insert(
+            "director",
+            "INSERT INTO director (director_id, director_name, nationality, birth_date, biography, website) VALUES (?, ?, ?, ?, ?, ?)",
+            ((director_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", weighted(rng, NATIONALITIES),
+              f"{rng.randint(1935, 1995)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+              " ".join(rng.choices(SYNOPSIS_WORDS, k=30)), f"https://directors.example.com/{director_id}")
+             for director_id in ids),
+        )
+        return ids
+
+    def movies(self, first_id: int, director_ids: list[int]) -> tuple[list[int], list[int], list[float]]:
+        rng = self.rng
+        ids = list(range(first_id + 1, first_id + self.args.movies + 1))
+        durations = [max(80, min(180, int(rng.normalvariate(115, 20)))) for _ in ids]
+        self.insert(
+            "movie",
+            "INSERT INTO movie (movie_id, movie_title, genre, duration, rating, synopsis, release_year) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((movie_id, " ".join(rng.choices(TITLE_WORDS, k=rng.randint(1, 4))).capitalize(), weighted(rng, GENRES),
+              duration, weighted(rng, RATINGS), " ".join(rng.choices(SYNOPSIS_WORDS, k=rng.randint(20, 60))),
+              min(2026, int(2026 - rng.expovariate(1 / 8))))
+             for movie_id, duration in zip(ids, durations)),
+        )
+        if director_ids:
+            self.insert(
+                "movie_director_link",
+                "INSERT OR IGNORE INTO movie_director_link (movie_id, director_id) VALUES (?, ?)",
+                ((movie_id, director_id) for movie_id in ids
+                 for director_id in rng.sample(director_ids, min(len(director_ids), 1 if rng.random() < 0.9 else 2))),
+            )
+        # Popularidade com cauda longa: poucos filmes concentram sessões e público
+        popularity = [1 / rank ** 0.8 for rank in range(1, len(ids) + 1)]
+        rng.shuffle(popularity)
+        return ids, durations, popularity
+
+    def rooms(self, first_id: int) -> list[tuple[int, int, float, str]]:
+        rng = self.rng
+        rooms = []
+        for room_id in range(first_id + 1, first_id + self.args.rooms + 1):
+            screen = rng.choices(SCREENS, weights=[screen[1] for screen in SCREENS])[0]
+            rooms.append((room_id, rng.choice(CAPACITIES), screen[0], screen[2], screen[3]))
+        self.insert(
+            "room",
+            "INSERT INTO room (room_id, room_name, capacity, screen_type, audio_system, acessibility) VALUES (?, ?, ?, ?, ?, ?)",
+            ((room_id, f"Sala {room_id}", capacity, screen_type, rng.choice(AUDIO_SYSTEMS), rng.random() < 0.8)
+             for room_id, capacity, screen_type, *_ in rooms),
+        )
+        return [(room_id, capacity, price, exibition) for room_id, capacity, _, price, exibition in rooms]
+
+    def sessions(self, first_id: int, first_day: datetime, rooms, movie_ids, durations, popularity) -> list[tuple]:
+        """Sessões dia a dia, sala a sala, em sequência (início + duração + limpeza),
+        então nunca se sobrepõem. Retorna (session_id, início, sala, capacidade, preço, demanda)."""
+        rng = self.rng
+        movies = list(zip(movie_ids, durations))
+        cum_popularity = list(accumulate(popularity))
+        sessions = []
+        day = first_day
+        while len(sessions) < self.args.sessions:
+            weekend = day.weekday() >= 4
+            for room_id, capacity, price, _ in rooms:
+                start = day + timedelta(hours=11 if weekend else 13, minutes=rng.choice((0, 10, 20, 30)))
+                while start.hour <= LAST_START_HOUR and start.day == day.day and len(sessions) < self.args.sessions:
+                    index = rng.choices(range(len(movies)), cum_weights=cum_popularity)[0]
+                    movie_id, duration = movies[index]
+                    demand = (popularity[index] ** 0.5 * HOUR_DEMAND.get(start.hour, 0.5)
+                              * WEEKDAY_DEMAND[start.weekday()] * rng.uniform(0.6, 1.4))
+                    sessions.append((first_id + len(sessions) + 1, start, room_id, movie_id, capacity, price, demand))
+                    gap = duration + rng.randint(*CLEANING_MINUTES)
+                    start += timedelta(minutes=-(-gap // 10) * 10)
+            day += timedelta(days=1)
+
+        exibitions = {room_id: exibition for room_id, *_, exibition in rooms}
+        self.insert(
+            "session",
+            "INSERT INTO session (session_id, date_time, exibition_type, language_audio, language_subtitles, status_session, room_id, movie_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((session_id, start.isoformat(" ", timespec="microseconds"), exibitions[room_id], "Português" if dubbed else "Inglês",
+              "N/A" if dubbed else "Português", "Cancelada" if rng.random() < 0.02 else "Agendada", room_id, movie_id)
+             for session_id, start, room_id, movie_id, *_ in sessions
+             for dubbed in (rng.random() < 0.6,)),
+        )
+        return sessions
+
+    def sales(self, first_ticket_id: int, first_payment_id: int, sessions) -> None:
+        """Distribui os tickets entre as sessões conforme a demanda (limitado à
+        capacidade), com poltronas distintas por sessão; cada ticket pago gera
+        um pagamento com a mesma data/valor."""
+        rng = self.rng
+        capacities = [session[4] for session in sessions]
+        capacity = sum(capacities)
+        if self.args.tickets > capacity * MAX_OCCUPANCY:
+            sys.exit(f"{self.args.tickets} tickets need more than {MAX_OCCUPANCY:.0%} of the {capacity} seats "
+                     f"in {len(sessions)} sessions; raise --sessions or --rooms")
+        allocation = allocate([session[6] for session in sessions], capacities, self.args.tickets, rng)
+        payment_ratio = self.args.payment_ratio
+        payments = []
+
+        def tickets():
+            ticket_id = first_ticket_id
+            payment_id = first_payment_id
+            random_ = rng.random
+            for (session_id, start, _room, _movie, seats, price, _demand), sold in zip(sessions, allocation):
+                for chair in rng.sample(range(1, seats + 1), sold):
+                    ticket_id += 1
+                    half = random_() < 0.35
+                    ticket_price = price / 2 if half else price
+                    # Maioria compra perto da sessão (média de 2 dias antes)
+                    purchased = start - timedelta(minutes=int(rng.expovariate(1 / 2880)))
+                    status = weighted(rng, TICKET_STATUS)
+                    yield (ticket_id, chair, "Meia-entrada" if half else "Inteira", ticket_price, purchased.isoformat(" ", timespec="microseconds"),
+                           status, session_id)
+                    if status != "Cancelado" and random_() < payment_ratio:
+                        payment_id += 1
+                        payments.append((payment_id, f"TX{payment_id:012d}", weighted(rng, PAYMENT_METHODS), ticket_price,
+                                         rollups.PAID_STATUS if status == "Confirmado" else "Pendente",
+                                         (purchased + timedelta(seconds=5 + int(random_() * 295))).isoformat(" ", timespec="microseconds"), ticket_id))
+                        if len(payments) >= self.args.batch_size:
+                            flush_payments()
+
+        def flush_payments():
+            self.conn.executemany(
+                "INSERT INTO paymentdetails (payment_id, transaction_id, payment_method, final_price, status, payment_date, ticket_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                payments,
+            )
+            self.counts["paymentdetails"] = self.counts.get("paymentdetails", 0) + len(payments)
+            payments.clear()
+
+        # Tickets e pagamentos são gerados juntos; o tempo de "ticket" inclui os pagamentos
+        self.insert(
+            "ticket",
+            "INSERT INTO ticket (ticket_id, chair_number, ticket_type, ticket_price, purchase_date, payment_status, session_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            tickets(),
+        )
+        if payments:
+            flush_payments()
+            self.conn.commit()
+
+
+def drop_derived(conn) -> tuple[list[str], list[str]]:
+    """Remove triggers e índices secundários das tabelas grandes; devolve o DDL para recriá-los."""
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    placeholders = ", ".join("?" for _ in BULK_TABLES)
+    indexes = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+        BULK_TABLES,
+    ).fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX {name}")
+    conn.commit()
+    return [sql for _, sql in triggers], [sql for _, sql in indexes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos (diretores, filmes, salas, sessões, tickets e pagamentos)")
+    parser.add_argument("--db", help="arquivo SQLite (padrão: o DATABASE_URL de database/db.env)")
+    parser.add_argument("--mode", choices=("fresh", "append"), default="fresh",
+                        help="fresh cria o arquivo do zero; append acrescenta depois dos IDs e datas existentes")
+    parser.add_argument("--force", action="store_true", help="com --mode fresh, apaga o arquivo se ele já existir")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--directors", type=int, default=500)
+    parser.add_argument("--movies", type=int, default=5_000)
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--tickets", type=int, default=1_000_000)
+    parser.add_argument("--payment-ratio", type=float, default=0.9, help="fração dos tickets não cancelados com pagamento")
+    parser.add_argument("--start-date", default="2025-01-01", help="primeiro dia de sessões no modo fresh")
+    parser.add_argument("--batch-size", type=int, default=100_000, help="linhas por executemany")
+    parser.add_argument("--commit-every", type=int, default=2_000_000, help="linhas por transação nas tabelas grandes")
+    args = parser.parse_args()
+
+    if args.db:
+        path = args.db
+    else:
+        from database.database import DATABASE_URL
+        path = make_url(DATABASE_URL).database
+    if args.mode == "fresh" and os.path.exists(path):
+        if not args.force:
+            sys.exit(f"{path} already exists; use --force to replace it or --mode append")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    started = time.perf_counter()
+    # Schema e triggers como no startup da API (listeners de after_create)
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    # Arquivo novo não tem o que proteger: sem journal durante a carga
+    conn.execute(f"PRAGMA journal_mode = {'OFF' if args.mode == 'fresh' else 'WAL'}")
+    for name, value in LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+    triggers, indexes = drop_derived(conn)
+    generator = Generator(conn, args)
+    try:
+        if args.mode == "append":
+            last = conn.execute("SELECT MAX(date_time) FROM session").fetchone()[0]
+            first_day = datetime.fromisoformat(last[:10]) + timedelta(days=1) if last else datetime.fromisoformat(args.start_date)
+        else:
+            first_day = datetime.fromisoformat(args.start_date)
+
+        director_ids = generator.directors(max_id(conn, "director", "director_id"))
+        movie_ids, durations, popularity = generator.movies(max_id(conn, "movie", "movie_id"), director_ids)
+        rooms = generator.rooms(max_id(conn, "room", "room_id"))
+        sessions = generator.sessions(max_id(conn, "session", "session_id"), first_day, rooms, movie_ids, durations, popularity)
+        generator.sales(max_id(conn, "ticket", "ticket_id"), max_id(conn, "paymentdetails", "payment_id"), sessions)
+    finally:
+        start = time.perf_counter()
+        for sql in indexes + triggers:
+            conn.execute(sql)
+        conn.commit()
+        generator.timings["indexes_and_triggers"] = round(time.perf_counter() - start, 2)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.close()
+
+    # Tabelas derivadas: os triggers estavam fora durante a carga
+    start = time.perf_counter()
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(engine) as session:
+        rollups.rebuild_rollups(session.connection())
+        fts.rebuild_fts(session.connection())
+        session.commit()
+        counters.rebuild_counters(session)
+        session.connection().exec_driver_sql("ANALYZE")
+        session.commit()
+    engine.dispose()
+    generator.timings["rollups_fts_counters"] = round(time.perf_counter() - start, 2)
+
+    elapsed = time.perf_counter() - started
+    print(f"{path} ({args.mode}, seed {args.seed}) in {elapsed:.1f}s")
+    for table, count in generator.counts.items():
+        timing = generator.timings.get(table)
+        rate = f"  {count / timing:,.0f} rows/s" if timing else ""
+        print(f"  {table:<20} {count:>12,}" + (f"  {timing:>8.2f}s{rate}" if timing is not None else ""))
+    for phase in ("indexes_and_triggers", "rollups_fts_counters"):
+        print(f"  {phase:<20} {generator.timings[phase]:>21.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import os
+import sys
+import time
+from typing import AsyncIterator, Callable, Optional
+
+from sqlalchemy import select, update
+
+from core import idempotency
+from core.logging import logger
+from database.database import async_engine
+from models.models import PaymentDetails
+
+# Conciliação noturna: o arquivo do gateway (CSV com cabeçalho ou NDJSON, com
+# transaction_id e status) é lido em pedaços e aplicado em lotes de
+# UPDATE ... WHERE transaction_id IN (...), com commit a cada commit_every linhas.
+# Memória constante: só o lote atual e uma linha incompleta ficam guardados.
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "500"))  # abaixo do limite de variáveis do SQLite
+RECONCILE_COMMIT_EVERY = int(os.getenv("RECONCILE_COMMIT_EVERY", "10000"))
+MAX_RECORD_BYTES = 64 * 1024
+SAMPLE_SIZE = 20
+READ_CHUNK_BYTES = 64 * 1024
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+class ReconcileError(Exception):
+    """Arquivo que não dá para continuar lendo (cabeçalho sem as colunas, encoding, linha enorme)."""
+
+    committed_rows = 0
+
+    def __str__(self):
+        message = super().__str__()
+        if self.committed_rows:
+            message += f" ({self.committed_rows} rows before it were already committed)"
+        return message
+
+
+class RecordParser:
+    """Transforma pedaços de bytes em registros (linha, transaction_id, status).
+    Registros inválidos saem com transaction_id/status None para serem contados."""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pending = ""  # registro CSV com campo entre aspas quebrado em várias linhas
+        self.columns = None
+        self.line = 0
+        self.record_line = 0
+        self.offset = 0  # bytes já decodificados, para apontar onde está um erro de encoding
+
+    def feed(self, chunk: bytes) -> list:
+        try:
+            text = self.buffer + self.decoder.decode(chunk)
+        except UnicodeDecodeError as e:
+            raise ReconcileError(f"Invalid UTF-8 at byte {self.offset + max(e.start, 0)}: {e.reason}")
+        self.offset += len(chunk)
+        lines = text.split("\n")
+        self.buffer = lines.pop()
+        if len(self.buffer) > MAX_RECORD_BYTES:
+            raise ReconcileError(f"Line {self.line + 1} is longer than {MAX_RECORD_BYTES} bytes")
+        return self._parse_lines(lines)
+
+    def close(self) -> list:
+        try:
+            text = self.buffer + self.decoder.decode(b"", final=True)
+        except UnicodeDecodeError as e:
+            raise ReconcileError(f"Invalid UTF-8 at the end of the file: {e.reason}")
+        self.buffer = ""
+        records = self._parse_lines([text] if text else [])
+        if self.pending:
+            raise ReconcileError(f"Unterminated quoted field starting at line {self.record_line}")
+        return records
+
+    def _parse_lines(self, lines: list) -> list:
+        records = []
+        for line in lines:
+            self.line += 1
+            if self.fmt == "ndjson":
+                if line.strip():
+                    records.append(self._parse_json(line))
+                continue
+            if not self.pending:
+                self.record_line = self.line
+            self.pending += line + "\n"
+            if self.pending.count('"') % 2:
+                if len(self.pending) > MAX_RECORD_BYTES:
+                    raise ReconcileError(f"Record at line {self.record_line} is longer than {MAX_RECORD_BYTES} bytes")
+                continue
+            record, self.pending = self.pending, ""
+            if record.strip():
+                parsed = self._parse_csv(record.rstrip("\r\n"))
+                if parsed is not None:
+                    records.append(parsed)
+        return records
+
+    def _parse_json(self, line: str) -> tuple:
+        try:
+            item = json.loads(line)
+        except ValueError:
+            return self.line, None, None
+        if not isinstance(item, dict):
+            return self.line, None, None
+        return self.line, _text(item.get("transaction_id")), _text(item.get("status"))
+
+    def _parse_csv(self, record: str) -> Optional[tuple]:
+        fields = next(csv.reader([record]))
+        if self.columns is None:
+            names = [name.strip().lower() for name in fields]
+            missing = [name for name in ("transaction_id", "status") if name not in names]
+            if missing:
+                raise ReconcileError(f"CSV header is missing column(s): {', '.join(missing)}")
+            self.columns = names.index("transaction_id"), names.index("status")
+            return None
+        txn_index, status_index = self.columns
+        if len(fields) <= max(txn_index, status_index):
+            return self.record_line, None, None
+        return self.record_line, _text(fields[txn_index]), _text(fields[status_index])
+
+
+def _text(value) -> Optional[str]:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+class Reconciler:
+    """Aplica os registros em lotes. Cada transação cobre até commit_every linhas,
+    então uma falha no meio do arquivo mantém o que já foi commitado (veja committed_rows)."""
+
+    def __init__(self, batch_size: int = RECONCILE_BATCH_SIZE, commit_every: int = RECONCILE_COMMIT_EVERY,
+                 dry_run: bool = False, progress: Optional[Callable[[dict], None]] = None):
+        self.batch_size = batch_size
+        self.commit_every = max(commit_every, batch_size)
+        self.dry_run = dry_run
+        self.progress = progress
+        self.batch: dict[str, str] = {}
+        self.connection = None
+        self.rows_in_transaction = 0
+        self.changed_ids: list[int] = []  # para limpar as respostas guardadas depois do commit
+        self.started = time.perf_counter()
+        self.stats = {
+            "rows": 0,
+            "matched": 0,
+            "unmatched": 0,
+            "changed": 0,
+            "invalid": 0,
+            "duplicates": 0,
+            "transactions": 0,
+            "committed_rows": 0,
+            "dry_run": dry_run,
+            "elapsed_ms": 0.0,
+            "unmatched_sample": [],
+            "invalid_lines": [],
+        }
+
+    async def __aenter__(self):
+        self.connection = await async_engine.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.connection.in_transaction():
+            await self.connection.rollback()
+        await self.connection.close()
+
+    async def add(self, records: list):
+        stats = self.stats
+        for line, transaction_id, status in records:
+            stats["rows"] += 1
+            if transaction_id is None or status is None:
+                stats["invalid"] += 1
+                if len(stats["invalid_lines"]) < SAMPLE_SIZE:
+                    stats["invalid_lines"].append(line)
+                continue
+            if transaction_id in self.batch:
+                # A última linha do lote vence
+                stats["duplicates"] += 1
+            self.batch[transaction_id] = status
+            if len(self.batch) >= self.batch_size:
+                await self._flush_batch()
+
+    async def finish(self) -> dict:
+        await self._flush_batch()
+        await self._end_transaction()
+        self.stats["elapsed_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return self.stats
+
+    async def _flush_batch(self):
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, {}
+        if not self.connection.in_transaction():
+            await self.connection.begin()
+
+        # UPDATEs primeiro: a transação já começa com o lock de escrita, sem o
+        # risco de um SELECT anterior ter lido um snapshot que outro writer invalidou
+        by_status: dict[str, list[str]] = {}
+        for transaction_id, status in batch.items():
+            by_status.setdefault(status, []).append(transaction_id)
+        for status, transaction_ids in by_status.items():
+            changed = (await self.connection.execute(
+                update(PaymentDetails)
+                .where(PaymentDetails.transaction_id.in_(transaction_ids), PaymentDetails.status != status)
+                .values(status=status)
+                .returning(PaymentDetails.payment_id)
+            )).scalars().all()
+            self.stats["changed"] += len(changed)
+            self.changed_ids.extend(changed)
+
+        found = set((await self.connection.execute(
+            select(PaymentDetails.transaction_id).where(PaymentDetails.transaction_id.in_(list(batch)))
+        )).scalars())
+        self.stats["matched"] += len(found)
+        self.stats["unmatched"] += len(batch) - len(found)
+        sample = self.stats["unmatched_sample"]
+        if len(found) < len(batch) and len(sample) < SAMPLE_SIZE:
+            sample.extend([transaction_id for transaction_id in batch if transaction_id not in found][:SAMPLE_SIZE - len(sample)])
+
+        self.rows_in_transaction += len(batch)
+        if self.rows_in_transaction >= self.commit_every:
+            await self._end_transaction()
+
+    async def _end_transaction(self):
+        if not self.connection.in_transaction():
+            return
+        if self.dry_run:
+            await self.connection.rollback()
+        else:
+            await self.connection.commit()
+            for payment_id in self.changed_ids:
+                idempotency.payments.forget(payment_id)
+            self.stats["committed_rows"] += self.rows_in_transaction
+        self.stats["transactions"] += 1
+        self.changed_ids = []
+        self.rows_in_transaction = 0
+        if self.progress is not None:
+            self.stats["elapsed_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+            self.progress(self.stats)
+
+
+async def reconcile_stream(chunks: AsyncIterator[bytes], fmt: str, **options) -> dict:
+    parser = RecordParser(fmt)
+    async with Reconciler(**options) as reconciler:
+        try:
+            async for chunk in chunks:
+                await reconciler.add(parser.feed(chunk))
+            await reconciler.add(parser.close())
+        except ReconcileError as e:
+            e.committed_rows = reconciler.stats["committed_rows"]
+            raise
+        return await reconciler.finish()
+
+
+def detect_format(content_type: Optional[str], filename: Optional[str] = None) -> Optional[str]:
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in (".csv", ".ndjson", ".jsonl"):
+            return "csv" if extension == ".csv" else "ndjson"
+    if content_type:
+        return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return None
+
+
+def log_progress(stats: dict):
+    logger.info('[reconcile] %s rows (%s matched, %s changed, %s unmatched) in %.1f s',
+                stats["rows"], stats["matched"], stats["changed"], stats["unmatched"], stats["elapsed_ms"] / 1000)
+
+
+async def _read_file(file) -> AsyncIterator[bytes]:
+    while chunk := file.read(READ_CHUNK_BYTES):
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concilia PaymentDetails.status com um arquivo do gateway (CSV ou NDJSON)")
+    parser.add_argument("file", help="arquivo com transaction_id e status ('-' lê da entrada padrão)")
+    parser.add_argument("--format", choices=FORMATS, help="padrão: pela extensão do arquivo")
+    parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH_SIZE, help="transaction_ids por UPDATE")
+    parser.add_argument("--commit-every", type=int, default=RECONCILE_COMMIT_EVERY, help="linhas por transação")
+    parser.add_argument("--dry-run", action="store_true", help="conta o que mudaria e desfaz cada transação")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(None, args.file)
+    if fmt is None:
+        sys.exit("Could not tell the format from the file name; use --format csv|ndjson")
+
+    def show_progress(stats):
+        rate = stats["rows"] / max(stats["elapsed_ms"] / 1000, 1e-9)
+        print(f"\r{stats['rows']:>12,} rows  {stats['matched']:>12,} matched  {stats['changed']:>10,} changed  "
+              f"{stats['unmatched']:>10,} unmatched  {rate:>10,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+    async def run():
+        file = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+        try:
+            return await reconcile_stream(_read_file(file), fmt, batch_size=args.batch_size,
+                                          commit_every=args.commit_every, dry_run=args.dry_run,
+                                          progress=show_progress)
+        finally:
+            if file is not sys.stdin.buffer:
+                file.close()
+            await async_engine.dispose()
+
+    try:
+        stats = asyncio.run(run())
+    except ReconcileError as e:
+        print(file=sys.stderr)
+        sys.exit(f"reconcile failed: {e}")
+    print(file=sys.stderr)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
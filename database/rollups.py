@@ -0,0 +1,255 @@
+import time
+import argparse
+from typing import Optional
+
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session
+
+# Triggers que mantêm movie_revenue_rollup e session_revenue_rollup
+# atualizadas a cada escrita em ticket (e mudança de filme da sessão).
+REVENUE_TRIGGERS = {
+    "trg_ticket_revenue_insert": """
+        CREATE TRIGGER trg_ticket_revenue_insert AFTER INSERT ON ticket
+        BEGIN
+            INSERT INTO session_revenue_rollup (session_id, tickets_sold, revenue)
+            SELECT NEW.session_id, 1, NEW.ticket_price WHERE NEW.session_id IS NOT NULL
+            ON CONFLICT(session_id) DO UPDATE SET
+                tickets_sold = tickets_sold + 1,
+                revenue = revenue + excluded.revenue;
+            INSERT INTO movie_revenue_rollup (movie_id, tickets_sold, total_revenue)
+            SELECT movie_id, 1, NEW.ticket_price FROM session
+            WHERE session_id = NEW.session_id AND movie_id IS NOT NULL
+            ON CONFLICT(movie_id) DO UPDATE SET
+                tickets_sold = tickets_sold + 1,
+                total_revenue = total_revenue + excluded.total_revenue;
+        END""",
+    "trg_ticket_revenue_delete": """
+        CREATE TRIGGER trg_ticket_revenue_delete AFTER DELETE ON ticket
+        BEGIN
+            UPDATE session_revenue_rollup
+            SET tickets_sold = tickets_sold - 1, revenue = revenue - OLD.ticket_price
+            WHERE session_id = OLD.session_id;
+            UPDATE movie_revenue_rollup
+            SET tickets_sold = tickets_sold - 1, total_revenue = total_revenue - OLD.ticket_price
+            WHERE movie_id = (SELECT movie_id FROM session WHERE session_id = OLD.session_id);
+        END""",
+    "trg_ticket_revenue_update": """
+        CREATE TRIGGER trg_ticket_revenue_update AFTER UPDATE OF session_id, ticket_price ON ticket
+        BEGIN
+            UPDATE session_revenue_rollup
+            SET tickets_sold = tickets_sold - 1, revenue = revenue - OLD.ticket_price
+            WHERE session_id = OLD.session_id;
+            UPDATE movie_revenue_rollup
+            SET tickets_sold = tickets_sold - 1, total_revenue = total_revenue - OLD.ticket_price
+            WHERE movie_id = (SELECT movie_id FROM session WHERE session_id = OLD.session_id);
+            INSERT INTO session_revenue_rollup (session_id, tickets_sold, revenue)
+            SELECT NEW.session_id, 1, NEW.ticket_price WHERE NEW.session_id IS NOT NULL
+            ON CONFLICT(session_id) DO UPDATE SET
+                tickets_sold = tickets_sold + 1,
+                revenue = revenue + excluded.revenue;
+            INSERT INTO movie_revenue_rollup (movie_id, tickets_sold, total_revenue)
+            SELECT movie_id, 1, NEW.ticket_price FROM session
+            WHERE session_id = NEW.session_id AND movie_id IS NOT NULL
+            ON CONFLICT(movie_id) DO UPDATE SET
+                tickets_sold = tickets_sold + 1,
+                total_revenue = total_revenue + excluded.total_revenue;
+        END""",
+    "trg_session_revenue_movie_update": """
+        CREATE TRIGGER trg_session_revenue_movie_update AFTER UPDATE OF movie_id ON session
+        WHEN OLD.movie_id IS NOT NEW.movie_id
+        BEGIN
+            UPDATE movie_revenue_rollup
+            SET tickets_sold = tickets_sold - (SELECT tickets_sold FROM session_revenue_rollup WHERE session_id = NEW.session_id),
+                total_revenue = total_revenue - (SELECT revenue FROM session_revenue_rollup WHERE session_id = NEW.session_id)
+            WHERE movie_id = OLD.movie_id
+              AND EXISTS (SELECT 1 FROM session_revenue_rollup WHERE session_id = NEW.session_id);
+            INSERT INTO movie_revenue_rollup (movie_id, tickets_sold, total_revenue)
+            SELECT NEW.movie_id, tickets_sold, revenue FROM session_revenue_rollup
+            WHERE session_id = NEW.session_id AND NEW.movie_id IS NOT NULL
+            ON CONFLICT(movie_id) DO UPDATE SET
+                tickets_sold = tickets_sold + excluded.tickets_sold,
+                total_revenue = total_revenue + excluded.total_revenue;
+        END""",
+    "trg_session_revenue_delete": """
+        CREATE TRIGGER trg_session_revenue_delete AFTER DELETE ON session
+        BEGIN
+            DELETE FROM session_revenue_rollup WHERE session_id = OLD.session_id;
+        END""",
+    "trg_movie_revenue_delete": """
+        CREATE TRIGGER trg_movie_revenue_delete AFTER DELETE ON movie
+        BEGIN
+            DELETE FROM movie_revenue_rollup WHERE movie_id = OLD.movie_id;
+        END""",
+}
+
+# sales_hourly_rollup: vendas (pela purchase_date do ticket) e pagamentos
+# aprovados (pela payment_date) por hora, filme e sala. Cada escrita soma ou
+# subtrai a sua parte com um upsert; movie_id/room_id 0 = sem sessão/filme/sala.
+# Além da linha (filme, sala), a hora também tem as linhas (filme, todas),
+# (todas, sala) e (todas, todas), com ALL_ROWS no lugar do id: qualquer filtro
+# do relatório lê uma linha por hora, em vez de uma por filme x sala.
+SALES_HOUR = "strftime('%Y-%m-%d %H:00:00.000000', {})"  # mesmo formato do DateTime do SQLAlchemy
+PAID_STATUS = "Aprovado"  # PaymentDetails.status de um pagamento confirmado pelo gateway
+ALL_ROWS = -1
+
+
+def _session_column(column: str, session_id: str) -> str:
+    return f"coalesce((SELECT {column} FROM session WHERE session_id = {session_id}), 0)"
+
+
+def _ticket_session(ticket_id: str) -> str:
+    return f"(SELECT session_id FROM ticket WHERE ticket_id = {ticket_id})"
+
+
+def _sales_delta(when: str, movie: str, room: str, tickets: str = "0", revenue: str = "0",
+                 payments: str = "0", paid: str = "0", source: str = "") -> str:
+    combinations = ((movie, room), (movie, ALL_ROWS), (ALL_ROWS, room), (ALL_ROWS, ALL_ROWS))
+    return "".join(f"""
+            INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+            SELECT {SALES_HOUR.format(when)}, {movie_id}, {room_id}, {tickets}, {revenue}, {payments}, {paid}
+            {source}
+            ON CONFLICT(bucket_start, movie_id, room_id) DO UPDATE SET
+                tickets_sold = tickets_sold + excluded.tickets_sold,
+                revenue = revenue + excluded.revenue,
+                payments = payments + excluded.payments,
+                paid_revenue = paid_revenue + excluded.paid_revenue;""" for movie_id, room_id in combinations)
+
+
+def _ticket_delta(row: str, sign: str) -> str:
+    return _sales_delta(f"{row}.purchase_date", _session_column("movie_id", f"{row}.session_id"),
+                        _session_column("room_id", f"{row}.session_id"), f"{sign}1", f"{sign}{row}.ticket_price")
+
+
+def _payment_delta(row: str, sign: str) -> str:
+    session_id = _ticket_session(f"{row}.ticket_id")
+    return _sales_delta(f"{row}.payment_date", _session_column("movie_id", session_id),
+                        _session_column("room_id", session_id), payments=f"{sign}1", paid=f"{sign}{row}.final_price",
+                        source=f"WHERE {row}.status = '{PAID_STATUS}'")
+
+
+def _ticket_payments(row: str, sign: str) -> str:
+    # Pagamentos do ticket acompanham a troca de sessão
+    return _sales_delta("p.payment_date", _session_column("movie_id", f"{row}.session_id"),
+                        _session_column("room_id", f"{row}.session_id"), payments=f"{sign}1", paid=f"{sign}p.final_price",
+                        source=f"FROM paymentdetails p WHERE p.ticket_id = NEW.ticket_id AND p.status = '{PAID_STATUS}' "
+                               "AND OLD.session_id IS NOT NEW.session_id")
+
+
+def _session_move(row: str, sign: str) -> str:
+    # Tudo o que a sessão já vendeu/recebeu, agrupado por hora, sai do filme/sala antigo e entra no novo
+    movie, room = f"coalesce({row}.movie_id, 0)", f"coalesce({row}.room_id, 0)"
+    return _sales_delta("t.purchase_date", movie, room, f"{sign}count(*)", f"{sign}sum(t.ticket_price)",
+                        source="FROM ticket t WHERE t.session_id = NEW.session_id GROUP BY 1") + \
+        _sales_delta("p.payment_date", movie, room, payments=f"{sign}count(*)", paid=f"{sign}sum(p.final_price)",
+                     source="FROM paymentdetails p JOIN ticket t ON t.ticket_id = p.ticket_id "
+                            f"WHERE t.session_id = NEW.session_id AND p.status = '{PAID_STATUS}' GROUP BY 1")
+
+
+SALES_TRIGGERS = {
+    "trg_ticket_sales_insert": f"""
+        CREATE TRIGGER trg_ticket_sales_insert AFTER INSERT ON ticket
+        BEGIN{_ticket_delta("NEW", "")}
+        END""",
+    "trg_ticket_sales_delete": f"""
+        CREATE TRIGGER trg_ticket_sales_delete AFTER DELETE ON ticket
+        BEGIN{_ticket_delta("OLD", "-")}
+        END""",
+    "trg_ticket_sales_update": f"""
+        CREATE TRIGGER trg_ticket_sales_update AFTER UPDATE OF session_id, ticket_price, purchase_date ON ticket
+        BEGIN{_ticket_delta("OLD", "-")}{_ticket_delta("NEW", "")}{_ticket_payments("OLD", "-")}{_ticket_payments("NEW", "")}
+        END""",
+    "trg_payment_sales_insert": f"""
+        CREATE TRIGGER trg_payment_sales_insert AFTER INSERT ON paymentdetails
+        WHEN NEW.status = '{PAID_STATUS}'
+        BEGIN{_payment_delta("NEW", "")}
+        END""",
+    "trg_payment_sales_delete": f"""
+        CREATE TRIGGER trg_payment_sales_delete AFTER DELETE ON paymentdetails
+        WHEN OLD.status = '{PAID_STATUS}'
+        BEGIN{_payment_delta("OLD", "-")}
+        END""",
+    "trg_payment_sales_update": f"""
+        CREATE TRIGGER trg_payment_sales_update AFTER UPDATE OF status, final_price, payment_date, ticket_id ON paymentdetails
+        WHEN OLD.status = '{PAID_STATUS}' OR NEW.status = '{PAID_STATUS}'
+        BEGIN{_payment_delta("OLD", "-")}{_payment_delta("NEW", "")}
+        END""",
+    "trg_session_sales_move": f"""
+        CREATE TRIGGER trg_session_sales_move AFTER UPDATE OF movie_id, room_id ON session
+        WHEN OLD.movie_id IS NOT NEW.movie_id OR OLD.room_id IS NOT NEW.room_id
+        BEGIN{_session_move("OLD", "-")}{_session_move("NEW", "")}
+        END""",
+}
+
+REBUILD_SQL = [
+    "DELETE FROM session_revenue_rollup",
+    "DELETE FROM movie_revenue_rollup",
+    """INSERT INTO session_revenue_rollup (session_id, tickets_sold, revenue)
+       SELECT session_id, COUNT(*), SUM(ticket_price) FROM ticket
+       WHERE session_id IS NOT NULL GROUP BY session_id""",
+    """INSERT INTO movie_revenue_rollup (movie_id, tickets_sold, total_revenue)
+       SELECT s.movie_id, SUM(r.tickets_sold), SUM(r.revenue)
+       FROM session_revenue_rollup r JOIN session s ON s.session_id = r.session_id
+       WHERE s.movie_id IS NOT NULL GROUP BY s.movie_id""",
+    "DELETE FROM sales_hourly_rollup",
+    f"""INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+       SELECT bucket_start, movie_id, room_id, SUM(tickets_sold), SUM(revenue), SUM(payments), SUM(paid_revenue)
+       FROM (
+           SELECT {SALES_HOUR.format("t.purchase_date")} AS bucket_start, coalesce(s.movie_id, 0) AS movie_id,
+                  coalesce(s.room_id, 0) AS room_id, 1 AS tickets_sold, t.ticket_price AS revenue,
+                  0 AS payments, 0.0 AS paid_revenue
+           FROM ticket t LEFT JOIN session s ON s.session_id = t.session_id
+           UNION ALL
+           SELECT {SALES_HOUR.format("p.payment_date")}, coalesce(s.movie_id, 0), coalesce(s.room_id, 0),
+                  0, 0.0, 1, p.final_price
+           FROM paymentdetails p
+           LEFT JOIN ticket t ON t.ticket_id = p.ticket_id
+           LEFT JOIN session s ON s.session_id = t.session_id
+           WHERE p.status = '{PAID_STATUS}'
+       )
+       GROUP BY bucket_start, movie_id, room_id""",
+    *(f"""INSERT INTO sales_hourly_rollup (bucket_start, movie_id, room_id, tickets_sold, revenue, payments, paid_revenue)
+       SELECT bucket_start, {movie}, {room}, SUM(tickets_sold), SUM(revenue), SUM(payments), SUM(paid_revenue)
+       FROM sales_hourly_rollup WHERE movie_id != {ALL_ROWS} AND room_id != {ALL_ROWS}
+       GROUP BY bucket_start{by}"""
+      for movie, room, by in (("movie_id", ALL_ROWS, ", movie_id"), (ALL_ROWS, "room_id", ", room_id"), (ALL_ROWS, ALL_ROWS, ""))),
+]
+
+
+def rebuild_rollups(connection):
+    for sql in REBUILD_SQL:
+        connection.exec_driver_sql(sql)
+
+
+def _normalized(sql: Optional[str]) -> Optional[str]:
+    return " ".join(sql.split()) if sql else None
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def install_rollups(target, connection, **kw):
+    # Os totais só são recalculados quando algum trigger não existe ou tem outra
+    # definição (ex.: PAID_STATUS mudou); depois disso eles se mantêm sozinhos.
+    existing = {
+        name: _normalized(sql) for name, sql in connection.exec_driver_sql(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+        )
+    }
+    triggers = {**REVENUE_TRIGGERS, **SALES_TRIGGERS}
+    stale = [name for name, ddl in triggers.items() if existing.get(name) != _normalized(ddl)]
+    for name in stale:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        connection.exec_driver_sql(triggers[name])
+    if stale:
+        rebuild_rollups(connection)
+
+
+if __name__ == "__main__":
+    from database.database import engine
+
+    parser = argparse.ArgumentParser(description="Reconstrói as tabelas de receita e de vendas por hora a partir de ticket/session/paymentdetails")
+    parser.parse_args()
+
+    start = time.perf_counter()
+    with Session(engine) as session:
+        rebuild_rollups(session.connection())
+        session.commit()
+    print(f"revenue rollups rebuilt in {time.perf_counter() - start:.2f}s")
@@ -1,14 +1,33 @@
+import asyncio
 import core.logging
 
 from fastapi import FastAPI
-from database.database import create_db_and_tables
-from routers import director_router, movie_router, room_router, session_router, payment_router, ticket_router, complex_router
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from core import analytics, autocomplete
+from core.metrics import MetricsMiddleware
+from database.database import async_engine, create_db_and_tables, log_sqlite_settings, sqlite_maintenance_loop
+from routers.common import FAST_JSON, orjson
+from routers import admin_router, analytics_router, metrics_router, director_router, movie_router, room_router, session_router, payment_router, ticket_router, complex_router
 
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    await create_db_and_tables()
+    await log_sqlite_settings()
+    async with AsyncSession(async_engine) as session:
+        await autocomplete.load_indexes(session)
+    maintenance = asyncio.create_task(sqlite_maintenance_loop())
+    analytics_refresh = asyncio.create_task(analytics.refresh_loop())
     yield
+    maintenance.cancel()
+    analytics_refresh.cancel()
 
-app = FastAPI(lifespan=lifespan)
+# Com FAST_JSON e orjson instalado, as rotas que ainda passam pelo response_model
+# também trocam o json.dumps pelo orjson
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if FAST_JSON and orjson is not None else JSONResponse,
+)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(director_router.router)
 app.include_router(movie_router.router)
@@ -16,4 +35,7 @@ app.include_router(room_router.router)
 app.include_router(session_router.router)
 app.include_router(payment_router.router)
 app.include_router(ticket_router.router)
-app.include_router(complex_router.router)
\ No newline at end of file
+app.include_router(complex_router.router)
+app.include_router(analytics_router.router)
+app.include_router(admin_router.router)
+app.include_router(metrics_router.router)
\ No newline at end of file
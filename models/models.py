@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime
 
@@ -7,6 +8,10 @@ class MovieDirectorLink(SQLModel, table=True):
     movie_id: Optional[int] = Field(default=None, foreign_key="movie.movie_id", primary_key=True)
     director_id: Optional[int] = Field(default=None, foreign_key="director.director_id", primary_key=True)
 
+    __table_args__ = (
+        Index("ix_movie_director_link_director_id", "director_id"),
+    )
+
 class Movie(SQLModel, table = True):
     movie_id: Optional[int] = Field(default=None, primary_key=True)
     movie_title: str
@@ -35,16 +40,20 @@ class Director(SQLModel, table=True):
 
 class PaymentDetails(SQLModel, table=True):
     payment_id: Optional[int] = Field(default=None, primary_key=True)
-    transaction_id: str
+    transaction_id: str = Field(unique=True, index=True)
     payment_method: str
     final_price: float
     status: str
     payment_date: datetime
 
     # Tickets 1:1 PaymentDetails
-    ticket_id: Optional[int] = Field(default=None, foreign_key="ticket.ticket_id")
+    ticket_id: Optional[int] = Field(default=None, foreign_key="ticket.ticket_id", index=True)
     ticket: Optional["Ticket"] = Relationship(back_populates="payment_details")
 
+    __table_args__ = (
+        Index("ix_paymentdetails_status_payment_method", "status", "payment_method"),
+    )
+
 class Room(SQLModel, table=True):
     room_id: Optional[int] = Field(default=None, primary_key=True)
     room_name: str
@@ -58,11 +67,11 @@ class Room(SQLModel, table=True):
 
 class Session(SQLModel, table=True):
     session_id: Optional[int] = Field(default=None, primary_key=True)
-    date_time: datetime
+    date_time: datetime = Field(index=True)
     exibition_type: str
     language_audio: str
     language_subtitles: str
-    status_session: str
+    status_session: str = Field(index=True)
 
     #Salas 1:N Sessões
     room_id: Optional[int] = Field(default=None, foreign_key="room.room_id")
@@ -75,17 +84,64 @@ class Session(SQLModel, table=True):
     # Sessão 1:N Tickets
     tickets: list["Ticket"] = Relationship(back_populates="session") 
 
+    # Índices compostos para os filtros por filme/sala + período
+    __table_args__ = (
+        Index("ix_session_movie_id_date_time", "movie_id", "date_time"),
+        Index("ix_session_room_id_date_time", "room_id", "date_time"),
+    )
+
 class Ticket(SQLModel, table=True):
     ticket_id: Optional[int] = Field(default=None, primary_key=True)
     chair_number: int
     ticket_type: str
     ticket_price: float
-    purchase_date: datetime
-    payment_status: str
+    purchase_date: datetime = Field(index=True)
+    payment_status: str = Field(index=True)
 
     # tickets 1:1 PaymentDetails
     payment_details: Optional["PaymentDetails"] = Relationship(back_populates="ticket") 
 
     # ticket 1:N sessao
-    session_id: Optional[int] = Field(default=None, foreign_key="session.session_id")
-    session: Optional["Session"] = Relationship(back_populates="tickets")  
\ No newline at end of file
+    session_id: Optional[int] = Field(default=None, foreign_key="session.session_id", index=True)
+    session: Optional["Session"] = Relationship(back_populates="tickets")  
+
+    # Uma poltrona por sessão também no banco: o seat map em memória é por processo
+    __table_args__ = (
+        Index("ix_ticket_session_id_chair_number", "session_id", "chair_number", unique=True),
+    )
+
+class EntityCounter(SQLModel, table=True):
+    __tablename__ = "entity_counters"
+    # Contagem por tabela mantida por triggers (ver database/counters.py)
+    entity_name: str = Field(primary_key=True)
+    total: int = Field(default=0)
+
+class MovieRevenueRollup(SQLModel, table=True):
+    __tablename__ = "movie_revenue_rollup"
+    # Totais por filme mantidos por triggers (ver database/rollups.py)
+    movie_id: int = Field(primary_key=True)
+    tickets_sold: int = Field(default=0)
+    total_revenue: float = Field(default=0.0)
+
+class SessionRevenueRollup(SQLModel, table=True):
+    __tablename__ = "session_revenue_rollup"
+    session_id: int = Field(primary_key=True)
+    tickets_sold: int = Field(default=0)
+    revenue: float = Field(default=0.0)
+
+class SalesHourlyRollup(SQLModel, table=True):
+    __tablename__ = "sales_hourly_rollup"
+    # Vendas e pagamentos aprovados por hora/filme/sala, mantidos por triggers
+    # (ver database/rollups.py); movie_id/room_id 0 = ticket sem sessão e
+    # -1 = todos (totais da hora por filme, por sala e geral)
+    bucket_start: datetime = Field(primary_key=True)
+    movie_id: int = Field(primary_key=True)
+    room_id: int = Field(primary_key=True)
+    tickets_sold: int = Field(default=0)
+    revenue: float = Field(default=0.0)
+    payments: int = Field(default=0)
+    paid_revenue: float = Field(default=0.0)
+
+    __table_args__ = (
+        Index("ix_sales_hourly_rollup_movie_id_room_id_bucket_start", "movie_id", "room_id", "bucket_start"),
+    )
@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+from typing import List
+
+from core import logging as app_logging
+from core import cache, autocomplete, idempotency
+from core.logging import logger
+from routers.common import SqlEchoUpdateDTO, LoggingStatus, CacheStatus, AutocompleteStatus, IdempotencyStatus
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+@router.get("/logging", response_model=LoggingStatus)
+async def get_logging_status():
+    return LoggingStatus(**app_logging.logging_stats())
+
+@router.put("/logging/sql-echo", response_model=LoggingStatus)
+async def set_sql_echo(echoDto: SqlEchoUpdateDTO):
+    app_logging.set_sql_echo(echoDto.enabled)
+    logger.info('[set_sql_echo] SQL echo %s.', "enabled" if echoDto.enabled else "disabled")
+    return LoggingStatus(**app_logging.logging_stats())
+
+@router.get("/cache", response_model=CacheStatus)
+async def get_cache_status():
+    return CacheStatus(**cache.cache_stats())
+
+@router.delete("/cache", response_model=CacheStatus)
+async def clear_cache():
+    await cache.backend.clear()
+    logger.info('[clear_cache] Cache cleared.')
+    return CacheStatus(**cache.cache_stats())
+
+@router.get("/autocomplete", response_model=List[AutocompleteStatus])
+async def get_autocomplete_status():
+    return [AutocompleteStatus(**index.stats()) for index in autocomplete.indexes]
+
+@router.get("/idempotency", response_model=IdempotencyStatus)
+async def get_idempotency_status():
+    return IdempotencyStatus(**idempotency.payments.stats())
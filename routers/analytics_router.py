@@ -0,0 +1,82 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from typing import Literal, Optional
+
+from core import analytics
+from core.logging import logger
+from routers.common import AnalyticsGroup, AnalyticsReport, AnalyticsSnapshotStatus
+
+router = APIRouter(prefix="/reports/analytics", tags=["Analytics"])
+
+HOURS = [f"{hour:02d}" for hour in range(24)]
+
+
+class TicketFilter:
+    """Filtros comuns a todos os relatórios, aplicados como máscara sobre o snapshot."""
+
+    def __init__(
+        self,
+        start: Optional[datetime] = Query(None, alias="from", description="Compras a partir desta data/hora"),
+        end: Optional[datetime] = Query(None, alias="to", description="Compras até esta data/hora"),
+        movie_id: Optional[int] = Query(None),
+        room_id: Optional[int] = Query(None),
+        payment_status: Optional[str] = Query(None, description="Ex.: Confirmado, Pendente")
+    ):
+        self.options = dict(start=start, end=end, movie_id=movie_id, room_id=room_id, payment_status=payment_status)
+
+
+async def _report(column: str, filters: TicketFilter, labels=None, keep_empty: bool = False) -> AnalyticsReport:
+    snapshot = await analytics.get_snapshot()
+    mask = snapshot.mask(**filters.options)
+    rows = snapshot.group_by(column, mask, labels or snapshot.categories[column].labels)
+    if not keep_empty:
+        rows = sorted((row for row in rows if row[1]), key=lambda row: row[2], reverse=True)
+    tickets = sum(row[1] for row in rows)
+    revenue = sum(row[2] for row in rows)
+    logger.info('[analytics] %s: %s tickets in %s groups.', column, tickets, len(rows))
+    return AnalyticsReport(
+        group_by=column,
+        snapshot_at=snapshot.built_at,
+        tickets=tickets,
+        revenue=round(revenue, 2),
+        groups=[
+            AnalyticsGroup(key=key, tickets=count, revenue=round(total, 2), share=round(total / revenue, 4) if revenue else 0.0)
+            for key, count, total in rows
+        ],
+    )
+
+@router.get("/revenue-by-genre", response_model=AnalyticsReport, summary="Receita e ingressos por gênero do filme")
+async def revenue_by_genre(filters: TicketFilter = Depends()):
+    return await _report("genre", filters)
+
+@router.get("/revenue-by-hour", response_model=AnalyticsReport, summary="Receita e ingressos por hora do dia")
+async def revenue_by_hour(
+    filters: TicketFilter = Depends(),
+    clock: Literal["purchase", "showtime"] = Query("purchase", description="Hora da compra ou do início da sessão")
+):
+    return await _report(f"{clock}_hour", filters, labels=HOURS, keep_empty=True)
+
+@router.get("/revenue-by-ticket-type", response_model=AnalyticsReport, summary="Receita e ingressos por tipo de ingresso")
+async def revenue_by_ticket_type(filters: TicketFilter = Depends()):
+    return await _report("ticket_type", filters)
+
+@router.get("/revenue-by-screen-type", response_model=AnalyticsReport, summary="Receita e ingressos por tipo de tela da sala")
+async def revenue_by_screen_type(filters: TicketFilter = Depends()):
+    return await _report("screen_type", filters)
+
+@router.get("/snapshot", response_model=AnalyticsSnapshotStatus)
+async def get_snapshot_status():
+    snapshot = analytics.current_snapshot()
+    return AnalyticsSnapshotStatus(
+        built_at=snapshot.built_at if snapshot else None,
+        build_ms=round(snapshot.build_ms, 1) if snapshot else None,
+        tickets=snapshot.tickets if snapshot else 0,
+        bytes=snapshot.nbytes() if snapshot else 0,
+        refresh_seconds=analytics.ANALYTICS_REFRESH_SECONDS,
+    )
+
+@router.post("/refresh", response_model=AnalyticsSnapshotStatus)
+async def refresh_snapshot():
+    logger.info('[refresh_snapshot] Rebuilding the analytics snapshot...')
+    await analytics.refresh()
+    return await get_snapshot_status()
@@ -1,16 +1,41 @@
+import os
 import re
-from datetime import datetime
-from pydantic import BaseModel, field_validator
-from typing import Generic, TypeVar, List, Optional
+import json
+import base64
+from datetime import date, datetime
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from functools import lru_cache
+from pydantic import BaseModel, TypeAdapter, field_validator
+from sqlalchemy import column, func, literal_column, table, tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Any, Generic, TypeVar, List, Optional, Literal
+
+from database.database import async_engine
+from core import metrics, etag, cache
+from models.models import Session as SessionModel
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele o caminho rápido usa o serializador do pydantic
+    orjson = None
 
 T = TypeVar('T') # Tipo genérico
 
+# Caminho rápido de JSON para as listagens (FAST_JSON=true): a resposta sai em bytes
+# direto, sem o model_dump + validação + jsonable_encoder + json.dumps que o FastAPI
+# faz com o response_model. Desligado, as rotas devolvem os objetos como sempre.
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() == "true"
+
 class PaginationMeta(BaseModel):
     page: int
     per_page: int
-    total: int
-    total_pages: int
-    remaining: int
+    # total, total_pages e remaining ficam nulos quando include_total=false
+    total: Optional[int] = None
+    total_pages: Optional[int] = None
+    remaining: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class ListResponseMeta(BaseModel, Generic[T]):
     data: List[T]
@@ -135,6 +160,106 @@ class TicketUpdateDTO(BaseModel):
     payment_status: str | None = None
     session_id: Optional[int] = None
 
+# all_or_nothing: qualquer item inválido cancela o lote inteiro
+# best_effort: insere os itens válidos e reporta os inválidos
+BulkMode = Literal["all_or_nothing", "best_effort"]
+
+class TicketBulkCreateDTO(BaseModel):
+    items: List[TicketCreateDTO]
+    mode: BulkMode = "all_or_nothing"
+
+class PaymentBulkCreateDTO(BaseModel):
+    items: List[PaymentCreateDTO]
+    mode: BulkMode = "all_or_nothing"
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: int
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BulkCreateResponse(BaseModel):
+    mode: BulkMode
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+
+class SeatMapResponse(BaseModel):
+    session_id: int
+    capacity: Optional[int]
+    occupied: List[int]
+    available: Optional[int]
+    free_seats: Optional[List[int]]
+
+class SqlEchoUpdateDTO(BaseModel):
+    enabled: bool
+
+class LoggingStatus(BaseModel):
+    format: str
+    sql_echo: bool
+    queue_size: int
+    queue_overflow: int
+    dropped_by_filter: dict[str, int]
+
+class CacheStatus(BaseModel):
+    backend: str
+    size: Optional[int]
+    hits: int
+    misses: int
+    sets: int
+    invalidations: int
+    evictions: int
+
+class AutocompleteItem(BaseModel):
+    id: int
+    label: str
+
+class AutocompleteStatus(BaseModel):
+    name: str
+    items: int
+    entries: int
+    bytes: int
+
+class IdempotencyStatus(BaseModel):
+    size: int
+    max_entries: int
+    hits: int
+    misses: int
+
+class AnalyticsGroup(BaseModel):
+    key: str
+    tickets: int
+    revenue: float
+    share: float  # fração da receita filtrada
+
+class AnalyticsReport(BaseModel):
+    group_by: str
+    snapshot_at: datetime
+    tickets: int
+    revenue: float
+    groups: List[AnalyticsGroup]
+
+class AnalyticsSnapshotStatus(BaseModel):
+    built_at: Optional[datetime]
+    build_ms: Optional[float]
+    tickets: int
+    bytes: int
+    refresh_seconds: float
+
+class ReconcileReport(BaseModel):
+    rows: int
+    matched: int
+    unmatched: int
+    changed: int
+    invalid: int
+    duplicates: int
+    transactions: int
+    committed_rows: int
+    dry_run: bool
+    elapsed_ms: float
+    unmatched_sample: List[str]
+    invalid_lines: List[int]
+
 class SessionSummary(BaseModel):
     session_id: int
     date_time: datetime
@@ -145,12 +270,85 @@ class SessionSummary(BaseModel):
     tickets_sold: int
     revenue: float
 
+class MovieSearchHit(BaseModel):
+    movie_id: int
+    movie_title: str
+    genre: str
+    duration: int
+    rating: str
+    synopsis: str
+    release_year: Optional[int] = None
+    score: float
+    title_highlight: str
+    synopsis_snippet: str
+
+class DirectorSearchHit(BaseModel):
+    director_id: int
+    director_name: str
+    nationality: str
+    birth_date: str
+    biography: str
+    website: str
+    score: float
+    name_highlight: str
+    biography_snippet: str
+
+class ScheduleSession(BaseModel):
+    session_id: int
+    date_time: datetime
+    exibition_type: str
+    language_audio: str
+    language_subtitles: Optional[str]
+    status_session: str
+    movie_id: Optional[int]
+    movie_title: Optional[str]
+    duration: Optional[int]
+    rating: Optional[str]
+    tickets_sold: int
+    seats_remaining: Optional[int]
+
+class RoomSchedule(BaseModel):
+    room_id: Optional[int]
+    room_name: Optional[str]
+    capacity: Optional[int]
+    screen_type: Optional[str]
+    sessions: List[ScheduleSession]
+
+class DaySchedule(BaseModel):
+    day: date
+    rooms: List[RoomSchedule]
+
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
+    minutes: int
+
+class RoomFreeSlots(BaseModel):
+    room_id: int
+    day: date
+    free_slots: List[FreeSlot]
+
 class MovieReport(BaseModel):
     movie_id: int
     movie_title: str
     total_revenue: float
     tickets_sold: int
 
+class SalesBucket(BaseModel):
+    bucket_start: datetime
+    tickets_sold: int
+    revenue: float
+    payments: int  # pagamentos aprovados, pela data do pagamento
+    paid_revenue: float
+
+class SalesTimeseries(BaseModel):
+    bucket: str
+    tickets_sold: int
+    revenue: float
+    payments: int
+    paid_revenue: float
+    points: List[SalesBucket]
+
 
 class DirectorRead(BaseModel):
     director_id: int
@@ -174,4 +372,157 @@ class MovieRead(BaseModel):
     directors: List[DirectorRead] = []
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+@lru_cache(maxsize=None)
+def _adapter(model_type) -> TypeAdapter:
+    return TypeAdapter(model_type)
+
+def dump_json(model_type, obj) -> bytes:
+    """Serializa obj (objetos ORM inclusive) com o schema de model_type, como o response_model faria."""
+    adapter = _adapter(model_type)
+    return adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+
+def cached_json_response(body: bytes, hit: bool, etag_value: Optional[str] = None) -> Response:
+    headers = {"X-Cache": "HIT" if hit else "MISS"}
+    if etag_value:
+        headers["ETag"] = etag_value
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _json_bytes_response(body: bytes, etag_value: Optional[str]) -> Response:
+    # Uma Response devolvida pela rota ignora os headers definidos pelas dependências
+    headers = {"ETag": etag_value} if etag_value else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def json_response(model_type, obj, trusted: bool = True, etag_value: Optional[str] = None):
+    """Com FAST_JSON, serializa obj com o TypeAdapter de model_type (o mesmo response_model
+    da rota). trusted=True quando obj já é feito das classes de model_type (objetos de tabela,
+    DTOs montados na rota): só serializa. Senão valida uma vez com from_attributes."""
+    if not FAST_JSON:
+        return obj
+    adapter = _adapter(model_type)
+    if not trusted:
+        obj = adapter.validate_python(obj, from_attributes=True)
+    return _json_bytes_response(adapter.dump_json(obj), etag_value)
+
+async def table_rows(session: AsyncSession, model) -> list[dict]:
+    """Todas as linhas de uma tabela como dicts, lidas como tuplas de colunas: sem
+    montar objetos ORM nem passar pelo identity map. Colunas na ordem dos campos do modelo."""
+    columns = [model.__table__.c[name] for name in model.model_fields]
+    keys = [column.name for column in columns]
+    rows = (await session.exec(select(*columns))).all()
+    return [dict(zip(keys, row)) for row in rows]
+
+def rows_json_response(rows: list[dict], etag_value: Optional[str] = None) -> Response:
+    if orjson is not None:
+        body = orjson.dumps(rows)
+    else:
+        body = _adapter(List[dict[str, Any]]).dump_json(rows)
+    return _json_bytes_response(body, etag_value)
+
+def etag_guard(*tables: str):
+    """Dependência para GETs de catálogo: responde 304 antes de qualquer consulta
+    quando If-None-Match bate com a versão atual das tabelas, senão define o ETag."""
+    def dependency(request: Request, response: Response) -> str:
+        current = etag.current_etag(*tables)
+        if etag.matches(request.headers.get("if-none-match"), current):
+            raise HTTPException(status_code=304, headers={"ETag": current})
+        response.headers["ETag"] = current
+        return current
+    return dependency
+
+HIGHLIGHT_START, HIGHLIGHT_END = "<mark>", "</mark>"
+
+def fts_search_query(model, fts_name: str, match: str, weights: tuple, highlight_column: int, snippet_column: int):
+    """Monta o SELECT de busca no índice FTS5 fts_name (rowid = PK de model),
+    ordenado por bm25 (menor = mais relevante). Retorna linhas
+    (objeto, bm25, trecho destacado, snippet)."""
+    fts = literal_column(fts_name)
+    fts_table = table(fts_name, column("rowid"))
+    primary_key = model.__table__.primary_key.columns[0]
+    rank = func.bm25(fts, *weights)
+    return (
+        select(
+            model,
+            rank.label("rank"),
+            func.highlight(fts, highlight_column, HIGHLIGHT_START, HIGHLIGHT_END).label("highlight"),
+            func.snippet(fts, snippet_column, HIGHLIGHT_START, HIGHLIGHT_END, "…", 16).label("snippet"),
+        )
+        .join(fts_table, fts_table.c.rowid == primary_key)
+        .where(fts.op("MATCH")(match))
+        .order_by(rank)
+    )
+
+async def invalidate_schedules(session: AsyncSession, session_ids):
+    """Invalida o cache de /sessions/schedule dos dias em que essas sessões acontecem."""
+    session_ids = {session_id for session_id in session_ids if session_id is not None}
+    if not session_ids:
+        return
+    days = (await session.exec(
+        select(SessionModel.date_time).where(SessionModel.session_id.in_(session_ids))
+    )).all()
+    await cache.invalidate(*{cache.schedule_key(day_time.date()) for day_time in days})
+
+async def count_total(session: AsyncSession, query) -> int:
+    return (await session.exec(select(func.count()).select_from(query.subquery()))).one()
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str, sort_columns: tuple) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(sort_columns):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(v) if column.type.python_type is datetime else v
+            for column, v in zip(sort_columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def keyset_page(session: AsyncSession, query, sort_columns: tuple, cursor: str, per_page: int):
+    """Paginação por cursor: ordena por (chave de ordenação, chave primária) e
+    busca somente as linhas após o último item da página anterior.
+    Um cursor vazio inicia a paginação a partir do começo."""
+    if cursor:
+        values = decode_cursor(cursor, sort_columns)
+        query = query.where(tuple_(*sort_columns) > tuple_(*values))
+    query = query.order_by(*sort_columns).limit(per_page + 1)
+    items = (await session.exec(query)).all()
+
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in sort_columns])
+    return items, next_cursor
+
+
+EXPORT_BATCH_SIZE = 1000
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def ndjson_export(model) -> StreamingResponse:
+    """Exporta a tabela inteira como NDJSON, uma linha por registro.
+    As linhas são lidas em lotes (yield_per) e serializadas sem passar pelo
+    ORM nem pelo response_model, então o uso de memória não cresce com a tabela."""
+    table = model.__table__
+    query = select(*table.columns).order_by(*table.primary_key.columns)
+
+    async def generate():
+        # Sessão própria: a do Depends é fechada antes do corpo ser enviado
+        async with AsyncSession(async_engine) as session:
+            result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                metrics.add_db_rows(len(rows))
+                yield ''.join(
+                    json.dumps(dict(row._mapping), default=_json_default, ensure_ascii=False) + '\n'
+                    for row in rows
+                )
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -1,47 +1,43 @@
-from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session, select
-from sqlalchemy import func
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import func, or_
+from typing import List, Literal, Optional
+from datetime import datetime, timedelta
 
 from database.database import get_session
-from models.models import Movie, Ticket
+from database.rollups import ALL_ROWS
+from models.models import Movie, MovieRevenueRollup, SalesHourlyRollup, SessionRevenueRollup
 from models.models import Session as SessionModel
-from routers.common import MovieReport, ListResponseMeta, SessionSummary, PaginationMeta
+from routers.common import MovieReport, ListResponseMeta, SessionSummary, PaginationMeta, SalesBucket, SalesTimeseries, json_response
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
+# Dia e semana (começando na segunda) saem das linhas por hora da sales_hourly_rollup
+SALES_BUCKETS = {
+    "hour": lambda column: func.datetime(column),
+    "day": lambda column: func.datetime(column, "start of day"),
+    "week": lambda column: func.datetime(column, "weekday 0", "-6 days", "start of day"),
+}
+
 @router.get("/movie-revenue", response_model=List[MovieReport], summary="Gera um relatório de receita por filme")
-async def get_movie_revenue_report(order:bool, session: Session = Depends(get_session)):
+async def get_movie_revenue_report(order:bool, session: AsyncSession = Depends(get_session)):
     
-    if order is True:
-        query = (
+    # Totais lidos da movie_revenue_rollup, mantida pelos triggers de ticket
+    order_column = MovieRevenueRollup.total_revenue.desc() if order is True else MovieRevenueRollup.total_revenue.asc()
+    query = (
         select(
             Movie.movie_id,
             Movie.movie_title,
-            func.sum(Ticket.ticket_price).label("total_revenue"),
-            func.count(Ticket.ticket_id).label("tickets_sold")
+            MovieRevenueRollup.total_revenue,
+            MovieRevenueRollup.tickets_sold
         )
-        .join(SessionModel, Movie.movie_id == SessionModel.movie_id)
-        .join(Ticket, SessionModel.session_id == Ticket.session_id)
-        .group_by(Movie.movie_id, Movie.movie_title)
-        .order_by(func.sum(Ticket.ticket_price).desc())
+        .join(MovieRevenueRollup, Movie.movie_id == MovieRevenueRollup.movie_id)
+        .where(MovieRevenueRollup.tickets_sold > 0)
+        .order_by(order_column)
     )
-    else:
-        query = (
-            select(
-                Movie.movie_id,
-                Movie.movie_title,
-                func.sum(Ticket.ticket_price).label("total_revenue"),
-                func.count(Ticket.ticket_id).label("tickets_sold")
-            )
-            .join(SessionModel, Movie.movie_id == SessionModel.movie_id)
-            .join(Ticket, SessionModel.session_id == Ticket.session_id)
-            .group_by(Movie.movie_id, Movie.movie_title)
-            .order_by(func.sum(Ticket.ticket_price).asc())
-        )
     
-    results = session.exec(query).all()
+    results = (await session.exec(query)).all()
     
     report_data = [
         MovieReport(
@@ -53,12 +49,12 @@ async def get_movie_revenue_report(order:bool, session: Session = Depends(get_se
         for row in results
     ]
     
-    return report_data
+    return json_response(List[MovieReport], report_data)
 
 @router.get("/movie/{movie_id}/sessions", response_model=ListResponseMeta[SessionSummary], summary="Lista sessões de um filme com vendas e receita")
-def list_movie_sessions(
+async def list_movie_sessions(
     movie_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     after: Optional[datetime] = Query(None, description="Sessões após esta data/hora"),
@@ -72,19 +68,11 @@ def list_movie_sessions(
             SessionModel.language_audio,
             SessionModel.language_subtitles,
             SessionModel.status_session,
-            func.count(Ticket.ticket_id).label("tickets_sold"),
-            func.coalesce(func.sum(Ticket.ticket_price), 0).label("revenue")
+            func.coalesce(SessionRevenueRollup.tickets_sold, 0).label("tickets_sold"),
+            func.coalesce(SessionRevenueRollup.revenue, 0).label("revenue")
         )
         .where(SessionModel.movie_id == movie_id)
-        .outerjoin(Ticket, SessionModel.session_id == Ticket.session_id)
-        .group_by(
-            SessionModel.session_id,
-            SessionModel.date_time,
-            SessionModel.exibition_type,
-            SessionModel.language_audio,
-            SessionModel.language_subtitles,
-            SessionModel.status_session
-        )
+        .outerjoin(SessionRevenueRollup, SessionModel.session_id == SessionRevenueRollup.session_id)
         .order_by(SessionModel.date_time)
     )
 
@@ -93,12 +81,12 @@ def list_movie_sessions(
     if before:
         query = query.where(SessionModel.date_time <= before)
     
-    total = session.exec(
+    total = (await session.exec(
         select(func.count()).select_from(query.subquery())
-    ).one()
+    )).one()
     total_pages = (total + per_page - 1)
     offset = (page - 1) * per_page
-    results = session.exec(query.offset(offset).limit(per_page)).all()
+    results = (await session.exec(query.offset(offset).limit(per_page))).all()
 
     items = [SessionSummary(
         session_id=row.session_id,
@@ -119,4 +107,65 @@ def list_movie_sessions(
         remaining=max(0, total - offset - len(items))
     )
 
-    return ListResponseMeta(data=items, meta=meta)
\ No newline at end of file
+    return json_response(ListResponseMeta[SessionSummary], ListResponseMeta[SessionSummary](data=items, meta=meta))
+
+@router.get("/sales-timeseries", response_model=SalesTimeseries, summary="Receita e ingressos por hora, dia ou semana")
+async def get_sales_timeseries(
+    bucket: Literal["hour", "day", "week"] = Query("day"),
+    start: Optional[datetime] = Query(None, alias="from", description="A partir desta data/hora (arredondada para a hora cheia)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Até esta data/hora (arredondada para cima, até a hora cheia seguinte; exclusive)"),
+    movie_id: Optional[int] = Query(None),
+    room_id: Optional[int] = Query(None),
+    session: AsyncSession = Depends(get_session)
+):
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    bucket_start = SALES_BUCKETS[bucket](SalesHourlyRollup.bucket_start).label("bucket_start")
+    tickets_sold = func.sum(SalesHourlyRollup.tickets_sold)
+    payments = func.sum(SalesHourlyRollup.payments)
+    query = (
+        select(
+            bucket_start,
+            tickets_sold.label("tickets_sold"),
+            func.sum(SalesHourlyRollup.revenue).label("revenue"),
+            payments.label("payments"),
+            func.sum(SalesHourlyRollup.paid_revenue).label("paid_revenue")
+        )
+        .group_by(bucket_start)
+        .having(or_(tickets_sold != 0, payments != 0))
+        .order_by(bucket_start)
+    )
+
+    if start:
+        query = query.where(SalesHourlyRollup.bucket_start >= start.replace(minute=0, second=0, microsecond=0))
+    if end:
+        # O rollup é por hora cheia: a hora que contém 'to' entra inteira
+        hour = end.replace(minute=0, second=0, microsecond=0)
+        query = query.where(SalesHourlyRollup.bucket_start < (hour if hour == end else hour + timedelta(hours=1)))
+    # Sem filtro, lê as linhas de total (ALL_ROWS) em vez de somar filme x sala
+    query = query.where(
+        SalesHourlyRollup.movie_id == (ALL_ROWS if movie_id is None else movie_id),
+        SalesHourlyRollup.room_id == (ALL_ROWS if room_id is None else room_id)
+    )
+
+    results = (await session.exec(query)).all()
+
+    points = [SalesBucket(
+        bucket_start=datetime.fromisoformat(row.bucket_start),
+        tickets_sold=row.tickets_sold,
+        revenue=round(row.revenue, 2),
+        payments=row.payments,
+        paid_revenue=round(row.paid_revenue, 2)
+    ) for row in results]
+
+    report = SalesTimeseries(
+        bucket=bucket,
+        tickets_sold=sum(point.tickets_sold for point in points),
+        revenue=round(sum(row.revenue for row in results), 2),
+        payments=sum(point.payments for point in points),
+        paid_revenue=round(sum(row.paid_revenue for row in results), 2),
+        points=points
+    )
+
+    return json_response(SalesTimeseries, report)
\ No newline at end of file
@@ -1,56 +1,100 @@
 import math
 from core.logging import logger
+from core import cache, etag, autocomplete
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
-from sqlalchemy import func
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional, List
 
-from models.models import Director
+from models.models import Director, MovieDirectorLink
 from database.database import get_session
+from database import counters
+from database.fts import build_match_query
 from routers.common import (
     PaginationMeta,
     ListResponseMeta,
     CountResponse,
     DeleteResponse,
     DirectorCreateDTO,
-    DirectorUpdateDTO
+    DirectorUpdateDTO,
+    DirectorSearchHit,
+    AutocompleteItem,
+    fts_search_query,
+    count_total,
+    dump_json,
+    cached_json_response,
+    etag_guard,
+    keyset_page,
+    ndjson_export,
+    FAST_JSON,
+    json_response,
+    table_rows,
+    rows_json_response
 )
 
 router = APIRouter(prefix="/directors", tags=["Directors"])
 
+director_etag = etag_guard("director")
+
+async def _invalidate_director(director_id: int, movie_ids: list[int]):
+    # Os filmes do diretor embutem os dados dele em MovieRead
+    etag.bump("director")
+    await cache.invalidate(
+        cache.director_key(director_id),
+        cache.MOVIES_ALL,
+        *(cache.movie_key(movie_id) for movie_id in movie_ids),
+    )
+
+async def _linked_movie_ids(session: AsyncSession, director_id: int) -> list[int]:
+    return list((await session.exec(
+        select(MovieDirectorLink.movie_id).where(MovieDirectorLink.director_id == director_id)
+    )).all())
+
 @router.post("", response_model=Director)
-def create_director(
+async def create_director(
     directorDto: DirectorCreateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[create_director] Creating director {directorDto.director_id}...')
-    if directorDto.director_id is not None and session.get(Director, directorDto.director_id):
-        logger.error(f'[create_director] A director with id {directorDto.director_id} already exists')
+    logger.info('[create_director] Creating director %s...', directorDto.director_id)
+    if directorDto.director_id is not None and await session.get(Director, directorDto.director_id):
+        logger.error('[create_director] A director with id %s already exists', directorDto.director_id)
         raise HTTPException(status_code=409, detail="Director with ID already exists")
     director = Director(**directorDto.model_dump(exclude_none=True))
     session.add(director)
-    session.commit()
-    session.refresh(director)
-    logger.info(f'[create_director] Director created successfully!')
+    await session.commit()
+    await session.refresh(director)
+    etag.bump("director")
+    autocomplete.directors.upsert(director.director_id, director.director_name)
+    logger.info('[create_director] Director created successfully!')
     return director
 
 @router.get("", response_model=List[Director])
-def list_all_directors(session: Session = Depends(get_session)):
-    logger.info(f'[list_all_directors] Listing directors...')
-    directors = session.exec(select(Director)).all()
-    logger.info(f'[list_all_directors] {len(directors)} found.')
-    return directors
+async def list_all_directors(
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(director_etag)
+):
+    logger.info('[list_all_directors] Listing directors...')
+    if FAST_JSON:
+        directors = await table_rows(session, Director)
+    else:
+        directors = (await session.exec(select(Director))).all()
+    logger.info('[list_all_directors] %s found.', len(directors))
+    return rows_json_response(directors, etag_value) if FAST_JSON else directors
 
 @router.get("/filter", response_model=ListResponseMeta[Director])
-def filter_directors(
-    session: Session = Depends(get_session),
+async def filter_directors(
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(director_etag),
     page: int = Query(1, ge=1, description="Page number, starting from 1"),
     per_page: int = Query(10, ge=1, le=100, description="Items per page"),
     name_contains: Optional[str] = Query(None, description="Filter by director name"),
-    nationaly: Optional[str] = Query(None, description="Filter by nationality")
+    nationaly: Optional[str] = Query(None, description="Filter by nationality"),
+    cursor: Optional[str] = Query(None, description="Cursor from meta.next_cursor (send it empty to start cursor pagination)"),
+    include_total: bool = Query(True, description="Compute total, total_pages and remaining")
 ):
-    logger.info(f'[filter_directors] Filtering directors...')
+    logger.info('[filter_directors] Filtering directors...')
     query = select(Director)
 
     if name_contains:
@@ -59,56 +103,111 @@ def filter_directors(
     if nationaly:
         query = query.where(Director.nationality == nationaly)
 
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
-    total_pages = math.ceil(total / per_page) if total > 0 else 1
-    offset = (page - 1) * per_page
-    directors = session.exec(
-        query.offset(offset).limit(per_page)
-    ).all()
-    remaining = max(total - page * per_page, 0)
-
-    meta = PaginationMeta(
-        page=page,
-        per_page=per_page,
-        total=total,
-        total_pages=total_pages,
-        remaining=remaining,
-    )
-
-    logger.info(f'[filter_directors] {len(directors)} directors found with filters applied.')
-    return ListResponseMeta[Director](data=directors, meta=meta)
+    total = await count_total(session, query) if include_total else None
+    total_pages = (math.ceil(total / per_page) if total > 0 else 1) if total is not None else None
+
+    if cursor is not None:
+        directors, next_cursor = await keyset_page(session, query, (Director.director_id,), cursor, per_page)
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+        )
+    else:
+        offset = (page - 1) * per_page
+        directors = (await session.exec(
+            query.offset(offset).limit(per_page)
+        )).all()
+        remaining = max(total - page * per_page, 0) if total is not None else None
+
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            remaining=remaining,
+        )
+
+    logger.info('[filter_directors] %s directors found with filters applied.', len(directors))
+    return json_response(ListResponseMeta[Director], ListResponseMeta[Director](data=directors, meta=meta), etag_value=etag_value)
 
 
 @router.get("/count", response_model=CountResponse)
-def get_director(session: Session = Depends(get_session)):
-    logger.info(f'[get_director] Counting directors...')
-    total = session.exec(select(func.count()).select_from(Director)).one()
-    logger.info(f'[get_director] Total directors: {total}.')
+async def get_director(session: AsyncSession = Depends(get_session)):
+    logger.info('[get_director] Counting directors...')
+    total = await counters.get_count(session, "director")
+    logger.info('[get_director] Total directors: %s.', total)
     return CountResponse(quantidade=total)
 
+@router.get("/export", response_class=StreamingResponse, summary="Exporta todos os registros em NDJSON (streaming)")
+async def export_directors():
+    logger.info('[export_directors] Streaming directors as NDJSON...')
+    return ndjson_export(Director)
+
+@router.get("/search", response_model=List[DirectorSearchHit], summary="Busca textual (FTS5) em nome, biografia e nacionalidade")
+async def search_directors(
+    q: str = Query(..., min_length=1, description="Palavras buscadas; todas precisam aparecer"),
+    prefix: bool = Query(True, description="Casa cada palavra como prefixo"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_session)
+):
+    logger.info('[search_directors] Searching directors for %r...', q)
+    match = build_match_query(q, prefix)
+    if not match:
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word")
+
+    query = fts_search_query(Director, "director_fts", match, (10.0, 1.0, 2.0), 0, 1)
+    rows = (await session.exec(query.limit(limit).offset(offset))).all()
+    logger.info('[search_directors] %s directors found.', len(rows))
+    return [
+        DirectorSearchHit(
+            **director.model_dump(),
+            score=-rank,
+            name_highlight=highlight,
+            biography_snippet=snippet,
+        )
+        for director, rank, highlight, snippet in rows
+    ]
+
+@router.get("/autocomplete", response_model=List[AutocompleteItem], summary="Sugestões de nome por prefixo (índice em memória)")
+async def autocomplete_directors(
+    q: str = Query(..., min_length=1, description="Início do nome ou de uma das palavras do nome"),
+    limit: int = Query(10, ge=1, le=50)
+):
+    return [AutocompleteItem(id=director_id, label=name) for director_id, name in autocomplete.directors.search(q, limit)]
+
 @router.get("/{director_id}", response_model=Director)
-def get_director(
+async def get_director(
     director_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(director_etag)
 ):
-    logger.info(f'[get_director] Retrieving director with id {director_id}...')
-    director = session.get(Director, director_id)
+    logger.info('[get_director] Retrieving director with id %s...', director_id)
+    body = await cache.get(cache.director_key(director_id))
+    if body is not None:
+        return cached_json_response(body, hit=True, etag_value=etag_value)
+    director = await session.get(Director, director_id)
     if not director:
-        logger.error(f'[get_director] Director with id {director_id} not found.')
+        logger.error('[get_director] Director with id %s not found.', director_id)
         raise HTTPException(status_code=404, detail="Director not found")
-    logger.info(f'[get_director] Director with id {director_id} retrieved successfully.')
-    return director
+    logger.info('[get_director] Director with id %s retrieved successfully.', director_id)
+    body = dump_json(Director, director)
+    await cache.put(cache.director_key(director_id), body)
+    return cached_json_response(body, hit=False, etag_value=etag_value)
 
 @router.put("/{director_id}", response_model=Director)
-def update_director(
+async def update_director(
     director_id: int,
     directorDto: DirectorUpdateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[update_director] Updating director with id {director_id}...')
-    existing_director = session.get(Director, director_id)
+    logger.info('[update_director] Updating director with id %s...', director_id)
+    existing_director = await session.get(Director, director_id)
     if not existing_director:
-        logger.error(f'[update_director] Director with id {director_id} not found.')
+        logger.error('[update_director] Director with id %s not found.', director_id)
         raise HTTPException(status_code=404, detail="Director not found")
     
     update_data = directorDto.model_dump(exclude_unset=True)
@@ -117,23 +216,28 @@ def update_director(
         setattr(existing_director, key, value)
     
     session.add(existing_director)
-    session.commit()
-    session.refresh(existing_director)
-    logger.info(f'[update_director] Director with id {director_id} updated successfully.')
+    await session.commit()
+    await session.refresh(existing_director)
+    await _invalidate_director(director_id, await _linked_movie_ids(session, director_id))
+    autocomplete.directors.upsert(director_id, existing_director.director_name)
+    logger.info('[update_director] Director with id %s updated successfully.', director_id)
     return existing_director
 
 @router.delete("/{director_id}", response_model=DeleteResponse)
-def delete_director(
+async def delete_director(
     director_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[delete_director] Deleting director with id {director_id}...')
-    director = session.get(Director, director_id)
+    logger.info('[delete_director] Deleting director with id %s...', director_id)
+    director = await session.get(Director, director_id)
     if not director:
-        logger.error(f'[delete_director] Director with id {director_id} not found.')
+        logger.error('[delete_director] Director with id %s not found.', director_id)
         raise HTTPException(status_code=404, detail="Director not found")
-    
-    session.delete(director)
-    session.commit()
-    logger.info(f'[delete_director] Director with id {director_id} deleted successfully.')
+
+    movie_ids = await _linked_movie_ids(session, director_id)
+    await session.delete(director)
+    await session.commit()
+    await _invalidate_director(director_id, movie_ids)
+    autocomplete.directors.remove(director_id)
+    logger.info('[delete_director] Director with id %s deleted successfully.', director_id)
     return DeleteResponse(message="Director deleted successfully")
\ No newline at end of file
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core import metrics, cache, autocomplete
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse, summary="Métricas por rota no formato do Prometheus")
+async def get_metrics():
+    body = metrics.render_prometheus() + "\n".join(cache.render_prometheus() + autocomplete.render_prometheus()) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,14 +1,19 @@
 import math
 from core.logging import logger
+from core import cache, etag, autocomplete, room_schedule
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
-from sqlalchemy import func
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import selectinload
 from typing import Optional, List
 
 from models.models import Movie, Director
+from models.models import Session as SessionModel
 from database.database import get_session
+from database import counters
+from database.fts import build_match_query
 from routers.common import (
     PaginationMeta, 
     ListResponseMeta, 
@@ -16,24 +21,38 @@ from routers.common import (
     DeleteResponse, 
     MovieCreateDTO, 
     MovieUpdateDTO,
-    MovieRead
+    MovieRead,
+    MovieSearchHit,
+    AutocompleteItem,
+    fts_search_query,
+    count_total,
+    dump_json,
+    cached_json_response,
+    etag_guard,
+    keyset_page,
+    ndjson_export,
+    json_response,
+    invalidate_schedules
 )
 
 router = APIRouter(prefix="/movies", tags=["Movies"])
 
+# MovieRead embute os diretores: o ETag depende das duas tabelas
+movie_etag = etag_guard("movie", "director")
+
 @router.post("", response_model=Movie)
-def create_movie(
+async def create_movie(
     movieDto: MovieCreateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[create_movie] Creating movie {movieDto.movie_title}...')
+    logger.info('[create_movie] Creating movie %s...', movieDto.movie_title)
     
     movie_data = movieDto.model_dump(exclude={'director_ids'})
     director_ids = movieDto.director_ids
 
     directors = []
     if director_ids:
-        directors = session.exec(select(Director).where(Director.director_id.in_(director_ids))).all()
+        directors = (await session.exec(select(Director).where(Director.director_id.in_(director_ids)))).all()
         if len(directors) != len(director_ids):
             raise HTTPException(status_code=404, detail="One or more directors not found")
 
@@ -41,29 +60,43 @@ def create_movie(
     movie.directors = directors 
 
     session.add(movie)
-    session.commit()
-    session.refresh(movie)
-    logger.info(f'[create_movie] Movie created successfully!')
+    await session.commit()
+    await session.refresh(movie)
+    await cache.invalidate(cache.MOVIES_ALL)
+    etag.bump("movie")
+    autocomplete.movies.upsert(movie.movie_id, movie.movie_title)
+    logger.info('[create_movie] Movie created successfully!')
     return movie
 
 @router.get("", response_model=List[MovieRead])
-def list_all_movies(session: Session = Depends(get_session)):
-    logger.info(f'[list_all_movies] Listing movies...')
-    movies = session.exec(
+async def list_all_movies(
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(movie_etag)
+):
+    logger.info('[list_all_movies] Listing movies...')
+    body = await cache.get(cache.MOVIES_ALL)
+    if body is not None:
+        return cached_json_response(body, hit=True, etag_value=etag_value)
+    movies = (await session.exec(
         select(Movie).options(selectinload(Movie.directors))
-    ).all()
-    logger.info(f'[list_all_movies] {len(movies)} found.')
-    return movies
+    )).all()
+    logger.info('[list_all_movies] %s found.', len(movies))
+    body = dump_json(List[MovieRead], movies)
+    await cache.put(cache.MOVIES_ALL, body)
+    return cached_json_response(body, hit=False, etag_value=etag_value)
 
 @router.get("/filter", response_model=ListResponseMeta[MovieRead])
-def filter_movies(
-    session: Session = Depends(get_session),
+async def filter_movies(
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(movie_etag),
     page: int = Query(1, ge=1, description="Page number, starting from 1"),
     per_page: int = Query(10, ge=1, le=100, description="Items per page"),
     title_contains: Optional[str] = Query(None, description="Filter by movie title"),
-    genre: Optional[str] = Query(None, description="Filter by genre")
+    genre: Optional[str] = Query(None, description="Filter by genre"),
+    cursor: Optional[str] = Query(None, description="Cursor from meta.next_cursor (send it empty to start cursor pagination)"),
+    include_total: bool = Query(True, description="Compute total, total_pages and remaining")
 ):
-    logger.info(f'[filter_movies] Filtering movies...')
+    logger.info('[filter_movies] Filtering movies...')
     query = select(Movie).options(selectinload(Movie.directors))
 
     if title_contains:
@@ -72,96 +105,170 @@ def filter_movies(
     if genre:
         query = query.where(Movie.genre == genre)
 
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
-    total_pages = math.ceil(total / per_page) if total > 0 else 1
-    offset = (page - 1) * per_page
-    movies = session.exec(
-        query.offset(offset).limit(per_page)
-    ).all()
-    remaining = total - (page - 1) * per_page
-
-    meta = PaginationMeta(
-        page=page,
-        per_page=per_page,
-        total=total,
-        total_pages=total_pages,
-        remaining=remaining,
-    )
-
-    logger.info(f'[filter_movies] {len(movies)} movies found with filters applied.')
-    return ListResponseMeta[Movie](data=movies, meta=meta)
+    total = await count_total(session, query) if include_total else None
+    total_pages = (math.ceil(total / per_page) if total > 0 else 1) if total is not None else None
+
+    if cursor is not None:
+        movies, next_cursor = await keyset_page(session, query, (Movie.movie_id,), cursor, per_page)
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+        )
+    else:
+        offset = (page - 1) * per_page
+        movies = (await session.exec(
+            query.offset(offset).limit(per_page)
+        )).all()
+        remaining = total - (page - 1) * per_page if total is not None else None
+
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            remaining=remaining,
+        )
+
+    logger.info('[filter_movies] %s movies found with filters applied.', len(movies))
+    return json_response(ListResponseMeta[MovieRead], ListResponseMeta[Movie](data=movies, meta=meta),
+                         trusted=False, etag_value=etag_value)
 
 @router.get("/count", response_model=CountResponse)
-def count_movies(
-    session: Session = Depends(get_session)
+async def count_movies(
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[count_movies] Counting movies...')
-    total = session.exec(select(func.count(Movie.movie_id))).one()
-    logger.info(f'[count_movies] Total movies: {total}.')
+    logger.info('[count_movies] Counting movies...')
+    total = await counters.get_count(session, "movie")
+    logger.info('[count_movies] Total movies: %s.', total)
     return CountResponse(quantidade=total)
 
+@router.get("/export", response_class=StreamingResponse, summary="Exporta todos os registros em NDJSON (streaming)")
+async def export_movies():
+    logger.info('[export_movies] Streaming movies as NDJSON...')
+    return ndjson_export(Movie)
+
+@router.get("/search", response_model=List[MovieSearchHit], summary="Busca textual (FTS5) em título, sinopse e gênero")
+async def search_movies(
+    q: str = Query(..., min_length=1, description="Palavras buscadas; todas precisam aparecer"),
+    prefix: bool = Query(True, description="Casa cada palavra como prefixo (matr -> matrix)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_session)
+):
+    logger.info('[search_movies] Searching movies for %r...', q)
+    match = build_match_query(q, prefix)
+    if not match:
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word")
+
+    # Pesos do bm25 por coluna: título > gênero > sinopse
+    query = fts_search_query(Movie, "movie_fts", match, (10.0, 1.0, 2.0), 0, 1)
+    rows = (await session.exec(query.limit(limit).offset(offset))).all()
+    logger.info('[search_movies] %s movies found.', len(rows))
+    return [
+        MovieSearchHit(
+            **movie.model_dump(),
+            score=-rank,
+            title_highlight=highlight,
+            synopsis_snippet=snippet,
+        )
+        for movie, rank, highlight, snippet in rows
+    ]
+
+@router.get("/autocomplete", response_model=List[AutocompleteItem], summary="Sugestões de título por prefixo (índice em memória)")
+async def autocomplete_movies(
+    q: str = Query(..., min_length=1, description="Início do título ou de uma das palavras do título"),
+    limit: int = Query(10, ge=1, le=50)
+):
+    return [AutocompleteItem(id=movie_id, label=title) for movie_id, title in autocomplete.movies.search(q, limit)]
+
 @router.get("/{movie_id}", response_model=MovieRead)
-def get_movie_by_id(
+async def get_movie_by_id(
     movie_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(movie_etag)
 ):
-    logger.info(f'[get_movie_by_id] Retrieving movie with id {movie_id}...')
-    movie = session.get(Movie, movie_id)
+    logger.info('[get_movie_by_id] Retrieving movie with id %s...', movie_id)
+    body = await cache.get(cache.movie_key(movie_id))
+    if body is not None:
+        return cached_json_response(body, hit=True, etag_value=etag_value)
+    movie = await session.get(Movie, movie_id, options=[selectinload(Movie.directors)])
     if not movie:
-        logger.error(f'[get_movie_by_id] Movie with id {movie_id} not found.')
+        logger.error('[get_movie_by_id] Movie with id %s not found.', movie_id)
         raise HTTPException(status_code=404, detail="Movie not found")
-    logger.info(f'[get_movie_by_id] Movie with id {movie_id} retrieved successfully.')
-    return movie
+    logger.info('[get_movie_by_id] Movie with id %s retrieved successfully.', movie_id)
+    body = dump_json(MovieRead, movie)
+    await cache.put(cache.movie_key(movie_id), body)
+    return cached_json_response(body, hit=False, etag_value=etag_value)
+
+async def _session_ids(session: AsyncSession, movie_id: int) -> list[int]:
+    return (await session.exec(select(SessionModel.session_id).where(SessionModel.movie_id == movie_id))).all()
 
 @router.put("/{movie_id}", response_model=Movie)
-def update_movie(
+async def update_movie(
     movie_id: int,
     movieDto: MovieUpdateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[update_movie] Updating movie with id {movie_id}...')
-    movie = session.get(Movie, movie_id)
+    logger.info('[update_movie] Updating movie with id %s...', movie_id)
+    movie = await session.get(Movie, movie_id)
     if not movie:
-        logger.error(f'[update_movie] Movie with id {movie_id} not found.')
+        logger.error('[update_movie] Movie with id %s not found.', movie_id)
         raise HTTPException(status_code=404, detail="Movie not found")
     
     for key, value in movieDto.model_dump(exclude_none=True).items():
         setattr(movie, key, value)
 
     session.add(movie)
-    session.commit()
-    session.refresh(movie)
-    logger.info(f'[update_movie] Movie with id {movie_id} updated successfully.')
+    # A agenda do dia (/sessions/schedule) mostra dados do filme
+    session_ids = await _session_ids(session, movie_id)
+    await session.commit()
+    await session.refresh(movie)
+    await invalidate_schedules(session, session_ids)
+    await cache.invalidate(cache.movie_key(movie_id), cache.MOVIES_ALL)
+    etag.bump("movie")
+    autocomplete.movies.upsert(movie.movie_id, movie.movie_title)
+    if movieDto.duration is not None:
+        # O fim de cada sessão do filme mudou
+        room_schedule.invalidate()
+    logger.info('[update_movie] Movie with id %s updated successfully.', movie_id)
     return movie
 
 @router.delete("/{movie_id}", response_model=DeleteResponse)
-def delete_movie(
+async def delete_movie(
     movie_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[delete_movie] Deleting movie with id {movie_id}...')
-    movie = session.get(Movie, movie_id)
+    logger.info('[delete_movie] Deleting movie with id %s...', movie_id)
+    movie = await session.get(Movie, movie_id)
     if not movie:
-        logger.error(f'[delete_movie] Movie with id {movie_id} not found.')
+        logger.error('[delete_movie] Movie with id %s not found.', movie_id)
         raise HTTPException(status_code=404, detail="Movie not found")
     
-    session.delete(movie)
-    session.commit()
-    logger.info(f'[delete_movie] Movie with id {movie_id} deleted successfully.')
+    session_ids = await _session_ids(session, movie_id)
+    await session.delete(movie)
+    await session.commit()
+    await invalidate_schedules(session, session_ids)
+    await cache.invalidate(cache.movie_key(movie_id), cache.MOVIES_ALL)
+    etag.bump("movie")
+    autocomplete.movies.remove(movie_id)
+    logger.info('[delete_movie] Movie with id %s deleted successfully.', movie_id)
     return DeleteResponse(message="Movie deleted successfully")
 
 
 @router.post("/{movie_id}/directors/{director_id}", status_code=201, response_model=Movie)
-def add_director_to_movie(
+async def add_director_to_movie(
     movie_id: int,
     director_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    movie = session.get(Movie, movie_id)
+    movie = await session.get(Movie, movie_id, options=[selectinload(Movie.directors)])
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
 
-    director = session.get(Director, director_id)
+    director = await session.get(Director, director_id)
     if not director:
         raise HTTPException(status_code=404, detail="Director not found")
 
@@ -169,7 +276,9 @@ def add_director_to_movie(
     if director not in movie.directors:
         movie.directors.append(director)
         session.add(movie)
-        session.commit()
-        session.refresh(movie)
+        await session.commit()
+        await session.refresh(movie)
+        await cache.invalidate(cache.movie_key(movie_id), cache.MOVIES_ALL)
+        etag.bump("movie")
 
     return movie
\ No newline at end of file
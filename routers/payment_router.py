@@ -1,14 +1,18 @@
 import math
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, List
+from typing import Literal, Optional, List
 
+from core import idempotency
 from core.logging import logger
-from models.models import PaymentDetails
+from models.models import PaymentDetails, Ticket
 from database.database import get_session
+from database import counters, reconcile
 from routers.common import (
     PaginationMeta, 
     ListResponseMeta, 
@@ -16,52 +20,223 @@ from routers.common import (
     DeleteResponse,
     PaymentCreateDTO,
     PaymentUpdateDTO,
+    PaymentBulkCreateDTO,
+    BulkItemResult,
+    BulkCreateResponse,
+    ReconcileReport,
+    count_total,
+    keyset_page,
+    ndjson_export,
+    dump_json,
+    FAST_JSON,
+    json_response,
+    table_rows,
+    rows_json_response,
 )
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
+async def _get_by_transaction(session: AsyncSession, transaction_id: str) -> Optional[PaymentDetails]:
+    # Igualdade exata: usa o índice único ix_paymentdetails_transaction_id
+    return (await session.exec(
+        select(PaymentDetails).where(PaymentDetails.transaction_id == transaction_id)
+    )).first()
+
+# O status muda depois da criação (reconciliação, PUT): não identifica a requisição
+_MUTABLE_FIELDS = {"status"}
+
+def _same_payment(payment: PaymentDetails, paymentDto: PaymentCreateDTO) -> bool:
+    for key, value in paymentDto.model_dump(exclude_none=True, exclude=_MUTABLE_FIELDS).items():
+        if isinstance(value, datetime):
+            value = value.replace(tzinfo=None)  # o SQLite devolve datetimes sem fuso
+        if getattr(payment, key) != value:
+            return False
+    return True
+
+def _replay(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
 @router.post("", response_model=PaymentDetails)
-def create_payment(
+async def create_payment(
     paymentDto: PaymentCreateDTO,
-    session: Session = Depends(get_session)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[create_payment] Creating payment {paymentDto.payment_id}...')
-    if paymentDto.payment_id is not None and session.get(PaymentDetails, paymentDto.payment_id):
-        logger.error(f'[create_payment] A payment with id {paymentDto.payment_id} already exists')
-        raise HTTPException(status_code=409, detail="Payment with ID already exists")
-    data = paymentDto.model_dump(exclude_none=True)
-    new_payment = PaymentDetails(**data)
-    session.add(new_payment)
+    logger.info('[create_payment] Creating payment %s...', paymentDto.payment_id)
+
+    # Sem Idempotency-Key o próprio transaction_id identifica a retentativa do gateway
+    keys = [f"txn:{paymentDto.transaction_id}"]
+    if idempotency_key:
+        keys.insert(0, f"key:{idempotency_key}")
+    request_fingerprint = idempotency.fingerprint(paymentDto.model_dump_json(exclude_none=True, exclude=_MUTABLE_FIELDS).encode())
     try:
-        session.commit()
-    except IntegrityError:
-        session.rollback()
-        logger.error(f'[create_payment] Integrity error: ticket_id does not exist')
-        raise HTTPException(
-            status_code=400,
-            detail="ticket_id does not exist"
-        )
-    session.refresh(new_payment)
-    logger.info(f'[create_payment] Payment created successfully!')
-    return new_payment
+        body = idempotency.payments.get(keys[0], request_fingerprint)
+    except idempotency.KeyReused:
+        if idempotency_key:
+            logger.error('[create_payment] Idempotency-Key %s reused with a different body', idempotency_key)
+            raise HTTPException(status_code=422, detail="Idempotency-Key already used with a different request body")
+        logger.error('[create_payment] Transaction %s already exists', paymentDto.transaction_id)
+        raise HTTPException(status_code=409, detail="Payment with transaction_id already exists")
+    if body is not None:
+        logger.info('[create_payment] Replaying transaction %s from the recent keys.', paymentDto.transaction_id)
+        return _replay(body)
+
+    existing = None
+    if paymentDto.payment_id is not None:
+        existing = await session.get(PaymentDetails, paymentDto.payment_id)
+        if existing and not _same_payment(existing, paymentDto):
+            logger.error('[create_payment] A payment with id %s already exists', paymentDto.payment_id)
+            raise HTTPException(status_code=409, detail="Payment with ID already exists")
+
+    if existing is None:
+        new_payment = PaymentDetails(**paymentDto.model_dump(exclude_none=True))
+        session.add(new_payment)
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            # Índice único em transaction_id: pode ser a retentativa de um pagamento já gravado
+            existing = await _get_by_transaction(session, paymentDto.transaction_id)
+            if existing is None:
+                logger.error('[create_payment] Integrity error: ticket_id does not exist')
+                raise HTTPException(
+                    status_code=400,
+                    detail="ticket_id does not exist"
+                )
+            if not _same_payment(existing, paymentDto):
+                logger.error('[create_payment] Transaction %s already exists', paymentDto.transaction_id)
+                raise HTTPException(status_code=409, detail="Payment with transaction_id already exists")
+
+    if existing is not None:
+        body = dump_json(PaymentDetails, existing)
+        for key in keys:
+            idempotency.payments.put(key, request_fingerprint, existing.payment_id, body)
+        logger.info('[create_payment] Transaction %s already recorded as payment %s, replaying.', paymentDto.transaction_id, existing.payment_id)
+        return _replay(body)
+
+    await session.refresh(new_payment)
+    body = dump_json(PaymentDetails, new_payment)
+    for key in keys:
+        idempotency.payments.put(key, request_fingerprint, new_payment.payment_id, body)
+    logger.info('[create_payment] Payment created successfully!')
+    return Response(content=body, media_type="application/json")
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_payments_bulk(
+    bulkDto: PaymentBulkCreateDTO,
+    response: Response,
+    session: AsyncSession = Depends(get_session)
+):
+    items = bulkDto.items
+    logger.info('[create_payments_bulk] Creating %s payments (%s)...', len(items), bulkDto.mode)
+
+    # Validação de IDs duplicados e FKs com uma consulta IN para o lote inteiro
+    payment_ids = {item.payment_id for item in items if item.payment_id is not None}
+    ticket_ids = {item.ticket_id for item in items if item.ticket_id is not None}
+    transaction_ids = {item.transaction_id for item in items}
+    existing_ids = set((await session.exec(
+        select(PaymentDetails.payment_id).where(PaymentDetails.payment_id.in_(payment_ids))
+    )).all()) if payment_ids else set()
+    existing_transactions = set((await session.exec(
+        select(PaymentDetails.transaction_id).where(PaymentDetails.transaction_id.in_(transaction_ids))
+    )).all()) if transaction_ids else set()
+    valid_ticket_ids = set((await session.exec(
+        select(Ticket.ticket_id).where(Ticket.ticket_id.in_(ticket_ids))
+    )).all()) if ticket_ids else set()
+
+    results = []
+    rows = []
+    accepted_ids = set()
+    accepted_transactions = set()
+    for index, item in enumerate(items):
+        if item.payment_id is not None and (item.payment_id in existing_ids or item.payment_id in accepted_ids):
+            results.append(BulkItemResult(index=index, status=409, detail="Payment with ID already exists"))
+        elif item.transaction_id in existing_transactions or item.transaction_id in accepted_transactions:
+            results.append(BulkItemResult(index=index, status=409, detail="Payment with transaction_id already exists"))
+        elif item.ticket_id is not None and item.ticket_id not in valid_ticket_ids:
+            results.append(BulkItemResult(index=index, status=400, detail="ticket_id does not exist"))
+        else:
+            results.append(BulkItemResult(index=index, status=201))
+            rows.append((index, item.model_dump()))
+            accepted_transactions.add(item.transaction_id)
+            if item.payment_id is not None:
+                accepted_ids.add(item.payment_id)
+
+    failed = len(items) - len(rows)
+    if failed and bulkDto.mode == "all_or_nothing":
+        logger.error('[create_payments_bulk] %s invalid items, batch rejected', failed)
+        for result in results:
+            if result.status == 201:
+                result.status = 424
+                result.detail = "Not created: batch rejected"
+        response.status_code = 400
+        return BulkCreateResponse(mode=bulkDto.mode, created=0, failed=failed, results=results)
+
+    if rows:
+        try:
+            new_ids = (await session.scalars(
+                insert(PaymentDetails).returning(PaymentDetails.payment_id, sort_by_parameter_order=True),
+                [data for _, data in rows]
+            )).all()
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            logger.error('[create_payments_bulk] Integrity error while inserting the batch')
+            raise HTTPException(status_code=400, detail="Integrity error: no payments were created")
+        counters.invalidate("paymentdetails")
+        for (index, _), new_id in zip(rows, new_ids):
+            results[index].id = new_id
+
+    logger.info('[create_payments_bulk] %s payments created, %s failed.', len(rows), failed)
+    return BulkCreateResponse(mode=bulkDto.mode, created=len(rows), failed=failed, results=results)
+
+@router.post("/reconcile", response_model=ReconcileReport)
+async def reconcile_payments(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="csv or ndjson (default: from Content-Type)"),
+    batch_size: int = Query(reconcile.RECONCILE_BATCH_SIZE, ge=1, le=5000, description="transaction_ids per UPDATE"),
+    commit_every: int = Query(reconcile.RECONCILE_COMMIT_EVERY, ge=1, description="Rows per transaction"),
+    dry_run: bool = Query(False, description="Count what would change and roll back")
+):
+    # O corpo é o próprio arquivo (sem multipart), lido em pedaços conforme chega
+    fmt = format or reconcile.detect_format(request.headers.get("content-type"))
+    if fmt is None:
+        logger.error('[reconcile_payments] Unsupported content type %s', request.headers.get("content-type"))
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+    logger.info('[reconcile_payments] Reconciling payments from %s (dry_run=%s)...', fmt, dry_run)
+    try:
+        stats = await reconcile.reconcile_stream(request.stream(), fmt, batch_size=batch_size,
+                                                 commit_every=commit_every, dry_run=dry_run,
+                                                 progress=reconcile.log_progress)
+    except reconcile.ReconcileError as e:
+        logger.error('[reconcile_payments] Reconciliation aborted: %s', e)
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info('[reconcile_payments] %s rows: %s matched, %s changed, %s unmatched, %s invalid.',
+                stats["rows"], stats["matched"], stats["changed"], stats["unmatched"], stats["invalid"])
+    return ReconcileReport(**stats)
 
 @router.get("", response_model=List[PaymentDetails])
-def list_all_payments(session: Session = Depends(get_session)):
-    logger.info(f'[list_all_payments] Listing all payments...')
-    payments = session.exec(select(PaymentDetails)).all()
-    logger.info(f'[list_all_payments] {len(payments)} payments found.')
-    return payments
+async def list_all_payments(session: AsyncSession = Depends(get_session)):
+    logger.info('[list_all_payments] Listing all payments...')
+    if FAST_JSON:
+        payments = await table_rows(session, PaymentDetails)
+    else:
+        payments = (await session.exec(select(PaymentDetails))).all()
+    logger.info('[list_all_payments] %s payments found.', len(payments))
+    return rows_json_response(payments) if FAST_JSON else payments
 
 @router.get("/filter", response_model=ListResponseMeta[PaymentDetails])
-def filter_payments(
-    session: Session = Depends(get_session),
+async def filter_payments(
+    session: AsyncSession = Depends(get_session),
     page: int = Query(1, ge=1, description="Page number, starting from 1"),
     per_page: int = Query(10, ge=1, le=100, description="Items per page"),
     transaction_id_contains: Optional[str] = Query(None, description="Filter by transaction ID"),
     payment_method: Optional[str] = Query(None, description="Filter by payment method"),
-    status: Optional[str] = Query(None, description="Filter by payment status")
+    status: Optional[str] = Query(None, description="Filter by payment status"),
+    cursor: Optional[str] = Query(None, description="Cursor from meta.next_cursor (send it empty to start cursor pagination)"),
+    include_total: bool = Query(True, description="Compute total, total_pages and remaining")
 ):
-    logger.info(f'[filter_payments] Filtering payments...')
+    logger.info('[filter_payments] Filtering payments...')
     query = select(PaymentDetails)
 
     if transaction_id_contains:
@@ -73,56 +248,85 @@ def filter_payments(
     if status:
         query = query.where(PaymentDetails.status == status)
 
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
-    total_pages = math.ceil(total / per_page)
-    offset = (page - 1) * per_page
+    total = await count_total(session, query) if include_total else None
+    total_pages = math.ceil(total / per_page) if total is not None else None
+
+    if cursor is not None:
+        payments, next_cursor = await keyset_page(session, query, (PaymentDetails.payment_id,), cursor, per_page)
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            next_cursor=next_cursor
+        )
+    else:
+        offset = (page - 1) * per_page
 
-    query = query.offset(offset).limit(per_page)
-    payments = session.exec(query).all()
+        query = query.offset(offset).limit(per_page)
+        payments = (await session.exec(query)).all()
 
-    meta = PaginationMeta(
-        page=page,
-        per_page=per_page,
-        total=total,
-        total_pages=total_pages,
-        remaining=max(0, total - offset - len(payments))
-    )
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            remaining=max(0, total - offset - len(payments)) if total is not None else None
+        )
 
-    logger.info(f'[filter_payments] {len(payments)} payments found with filters applied.')
-    return ListResponseMeta[PaymentDetails](data=payments, meta=meta)
+    logger.info('[filter_payments] %s payments found with filters applied.', len(payments))
+    return json_response(ListResponseMeta[PaymentDetails], ListResponseMeta[PaymentDetails](data=payments, meta=meta))
 
 @router.get("/count", response_model=CountResponse)
-def count_payments(
-    session: Session = Depends(get_session)
+async def count_payments(
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[count_payments] Counting payments...')
-    total = session.exec(select(func.count(PaymentDetails.payment_id))).one()
-    logger.info(f'[count_payments] Total payments: {total}.')
+    logger.info('[count_payments] Counting payments...')
+    total = await counters.get_count(session, "paymentdetails")
+    logger.info('[count_payments] Total payments: %s.', total)
     return CountResponse(quantidade=total)
 
+@router.get("/export", response_class=StreamingResponse, summary="Exporta todos os registros em NDJSON (streaming)")
+async def export_payments():
+    logger.info('[export_payments] Streaming payments as NDJSON...')
+    return ndjson_export(PaymentDetails)
+
+@router.get("/by-transaction/{transaction_id}", response_model=PaymentDetails)
+async def get_payment_by_transaction(
+    transaction_id: str,
+    session: AsyncSession = Depends(get_session)
+):
+    logger.info('[get_payment_by_transaction] Retrieving payment with transaction %s...', transaction_id)
+    payment = await _get_by_transaction(session, transaction_id)
+    if not payment:
+        logger.error('[get_payment_by_transaction] Payment with transaction %s not found.', transaction_id)
+        raise HTTPException(status_code=404, detail="Payment not found")
+    logger.info('[get_payment_by_transaction] Payment %s retrieved successfully.', payment.payment_id)
+    return payment
+
 @router.get("/{payment_id}", response_model=PaymentDetails)
-def get_payment(
+async def get_payment(
     payment_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[get_payment] Retrieving payment with id {payment_id}...')
-    payment = session.get(PaymentDetails, payment_id)
+    logger.info('[get_payment] Retrieving payment with id %s...', payment_id)
+    payment = await session.get(PaymentDetails, payment_id)
     if not payment:
-        logger.error(f'[get_payment] Payment with id {payment_id} not found.')
+        logger.error('[get_payment] Payment with id %s not found.', payment_id)
         raise HTTPException(status_code=404, detail="Payment not found")
-    logger.info(f'[get_payment] Payment with id {payment_id} retrieved successfully.')
+    logger.info('[get_payment] Payment with id %s retrieved successfully.', payment_id)
     return payment
 
 @router.put("/{payment_id}", response_model=PaymentDetails)
-def update_payment(
+async def update_payment(
     payment_id: int,
     paymentDto: PaymentUpdateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[update_payment] Updating payment with id {payment_id}...')
-    payment = session.get(PaymentDetails, payment_id)
+    logger.info('[update_payment] Updating payment with id %s...', payment_id)
+    payment = await session.get(PaymentDetails, payment_id)
     if not payment:
-        logger.error(f'[update_payment] Payment with id {payment_id} not found.')
+        logger.error('[update_payment] Payment with id %s not found.', payment_id)
         raise HTTPException(status_code=404, detail="Payment not found")
 
     update_data = paymentDto.model_dump(exclude_none=True)
@@ -130,30 +334,35 @@ def update_payment(
         setattr(payment, key, value)
     session.add(payment)
     try:
-        session.commit()
+        await session.commit()
     except IntegrityError:
-        session.rollback()
-        logger.error(f'[update_payment] Integrity error: ticket_id does not exist')
+        await session.rollback()
+        if paymentDto.transaction_id is not None and await _get_by_transaction(session, paymentDto.transaction_id):
+            logger.error('[update_payment] Transaction %s already exists', paymentDto.transaction_id)
+            raise HTTPException(status_code=409, detail="Payment with transaction_id already exists")
+        logger.error('[update_payment] Integrity error: ticket_id does not exist')
         raise HTTPException(
             status_code=400,
             detail="ticket_id does not exist"
         )
-    session.refresh(payment)
-    logger.info(f'[update_payment] Payment with id {payment_id} updated successfully.')
+    idempotency.payments.forget(payment_id)
+    await session.refresh(payment)
+    logger.info('[update_payment] Payment with id %s updated successfully.', payment_id)
     return payment
 
 @router.delete("/{payment_id}", response_model=DeleteResponse)
-def delete_payment(
+async def delete_payment(
     payment_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[delete_payment] Deleting payment with id {payment_id}...')
-    payment = session.get(PaymentDetails, payment_id)
+    logger.info('[delete_payment] Deleting payment with id %s...', payment_id)
+    payment = await session.get(PaymentDetails, payment_id)
     if not payment:
-        logger.error(f'[delete_payment] Payment with id {payment_id} not found.')
+        logger.error('[delete_payment] Payment with id %s not found.', payment_id)
         raise HTTPException(status_code=404, detail="Payment not found")
 
-    session.delete(payment)
-    session.commit()
-    logger.info(f'[delete_payment] Payment with id {payment_id} deleted successfully.')
+    await session.delete(payment)
+    await session.commit()
+    idempotency.payments.forget(payment_id)
+    logger.info('[delete_payment] Payment with id %s deleted successfully.', payment_id)
     return DeleteResponse(message="Payment deleted successfully")
\ No newline at end of file
@@ -1,59 +1,89 @@
 import math
+from datetime import date, datetime, time, timedelta
 from core.logging import logger
+from core import seat_map, cache, etag, room_schedule
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
-from sqlalchemy import func
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional, List
 
 from models.models import Room
+from models.models import Session as SessionModel
 from database.database import get_session
+from database import counters
 from routers.common import (
     PaginationMeta, 
     ListResponseMeta, 
     CountResponse, 
     DeleteResponse, 
     RoomCreateDTO,
-    RoomUpdateDTO
+    RoomUpdateDTO,
+    FreeSlot,
+    RoomFreeSlots,
+    count_total,
+    dump_json,
+    cached_json_response,
+    etag_guard,
+    keyset_page,
+    ndjson_export,
+    FAST_JSON,
+    json_response,
+    table_rows,
+    rows_json_response,
+    invalidate_schedules
 )
 
 router = APIRouter(prefix="/rooms", tags=["Rooms"])
 
+room_etag = etag_guard("room")
+
 @router.post("", response_model=Room)
-def create_room(
+async def create_room(
     roomDto: RoomCreateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[create_room] Creating room {roomDto.room_id}...')
+    logger.info('[create_room] Creating room %s...', roomDto.room_id)
     if roomDto.room_id is not None:
-        existing = session.get(Room, roomDto.room_id)
+        existing = await session.get(Room, roomDto.room_id)
         if existing:
-            logger.error(f'[create_room] A room with id {roomDto.room_id} already exists')
+            logger.error('[create_room] A room with id %s already exists', roomDto.room_id)
             raise HTTPException(status_code=409, detail="Room with ID already exists")
     room = Room(**roomDto.model_dump(exclude_none=True))
     session.add(room)
-    session.commit()
-    session.refresh(room)
-    logger.info(f'[create_room] Room created successfully!')
+    await session.commit()
+    await session.refresh(room)
+    etag.bump("room")
+    logger.info('[create_room] Room created successfully!')
     return room
 
 @router.get("", response_model=List[Room])
-def list_all_rooms(session: Session = Depends(get_session)):
-    logger.info(f'[list_all_rooms] Listing all rooms...')
-    rooms = session.exec(select(Room)).all()
-    logger.info(f'[list_all_rooms] {len(rooms)} rooms found.')
-    return rooms
+async def list_all_rooms(
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(room_etag)
+):
+    logger.info('[list_all_rooms] Listing all rooms...')
+    if FAST_JSON:
+        rooms = await table_rows(session, Room)
+    else:
+        rooms = (await session.exec(select(Room))).all()
+    logger.info('[list_all_rooms] %s rooms found.', len(rooms))
+    return rows_json_response(rooms, etag_value) if FAST_JSON else rooms
 
 @router.get("/filter", response_model=ListResponseMeta[Room])
-def filter_rooms(
-    session: Session = Depends(get_session),
+async def filter_rooms(
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(room_etag),
     page: int = Query(1, ge=1, description="Page number, starting from 1"),
     per_page: int = Query(10, ge=1, le=100, description="Items per page"),
     room_name_contains: Optional[str] = Query(None, description="Filter by room name"),
     screen_type: Optional[str] = Query(None, description="Filter by screen type"),
-    acessibility: Optional[bool] = Query(None, description="Filter by accessibility")
+    acessibility: Optional[bool] = Query(None, description="Filter by accessibility"),
+    cursor: Optional[str] = Query(None, description="Cursor from meta.next_cursor (send it empty to start cursor pagination)"),
+    include_total: bool = Query(True, description="Compute total, total_pages and remaining")
 ):
-    logger.info(f'[filter_rooms] Filtering rooms...')
+    logger.info('[filter_rooms] Filtering rooms...')
     query = select(Room)
 
     if room_name_contains:
@@ -65,78 +95,133 @@ def filter_rooms(
     if acessibility is not None:
         query = query.where(Room.acessibility == acessibility)
 
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
-    total_pages = math.ceil(total / per_page) if total > 0 else 1
-    offset = (page - 1) * per_page
-    rooms = session.exec(query.offset(offset).limit(per_page)).all()
+    total = await count_total(session, query) if include_total else None
+    total_pages = (math.ceil(total / per_page) if total > 0 else 1) if total is not None else None
 
-    logger.info(f'[filter_rooms] {len(rooms)} rooms found with filters applied.')
-    return ListResponseMeta[Room](
-        data=rooms,
-        meta=PaginationMeta(
+    if cursor is not None:
+        rooms, next_cursor = await keyset_page(session, query, (Room.room_id,), cursor, per_page)
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            next_cursor=next_cursor
+        )
+    else:
+        offset = (page - 1) * per_page
+        rooms = (await session.exec(query.offset(offset).limit(per_page))).all()
+        meta = PaginationMeta(
             page=page,
             per_page=per_page,
             total=total,
             total_pages=total_pages,
-            remaining=max(0, total - offset - len(rooms))
+            remaining=max(0, total - offset - len(rooms)) if total is not None else None
         )
-    )
+
+    logger.info('[filter_rooms] %s rooms found with filters applied.', len(rooms))
+    return json_response(ListResponseMeta[Room], ListResponseMeta[Room](data=rooms, meta=meta), etag_value=etag_value)
 
 @router.get("/count", response_model=CountResponse)
-def count_rooms(
-    session: Session = Depends(get_session)
+async def count_rooms(
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[count_rooms] Counting rooms...')
-    total = session.exec(select(func.count(Room.room_id))).one()
-    logger.info(f'[count_rooms] Total rooms: {total}.')
+    logger.info('[count_rooms] Counting rooms...')
+    total = await counters.get_count(session, "room")
+    logger.info('[count_rooms] Total rooms: %s.', total)
     return CountResponse(quantidade=total)
 
+@router.get("/export", response_class=StreamingResponse, summary="Exporta todos os registros em NDJSON (streaming)")
+async def export_rooms():
+    logger.info('[export_rooms] Streaming rooms as NDJSON...')
+    return ndjson_export(Room)
+
 @router.get("/{room_id}", response_model=Room)
-def get_room(
+async def get_room(
     room_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session),
+    etag_value: str = Depends(room_etag)
 ):
-    logger.info(f'[get_room] Retrieving room with id {room_id}...')
-    room = session.get(Room, room_id)
+    logger.info('[get_room] Retrieving room with id %s...', room_id)
+    body = await cache.get(cache.room_key(room_id))
+    if body is not None:
+        return cached_json_response(body, hit=True, etag_value=etag_value)
+    room = await session.get(Room, room_id)
     if not room:
-        logger.error(f'[get_room] Room with id {room_id} not found.')
+        logger.error('[get_room] Room with id %s not found.', room_id)
         raise HTTPException(status_code=404, detail="Room not found")
-    logger.info(f'[get_room] Room with id {room_id} retrieved successfully.')
-    return room
+    logger.info('[get_room] Room with id %s retrieved successfully.', room_id)
+    body = dump_json(Room, room)
+    await cache.put(cache.room_key(room_id), body)
+    return cached_json_response(body, hit=False, etag_value=etag_value)
+
+@router.get("/{room_id}/free-slots", response_model=RoomFreeSlots, summary="Intervalos livres da sala no dia")
+async def get_room_free_slots(
+    room_id: int,
+    day: date = Query(..., alias="date", description="Dia (YYYY-MM-DD)"),
+    min_minutes: int = Query(0, ge=0, description="Só intervalos com pelo menos essa duração"),
+    session: AsyncSession = Depends(get_session)
+):
+    logger.info('[get_room_free_slots] Retrieving free slots of room %s on %s...', room_id, day)
+    if not await session.get(Room, room_id):
+        logger.error('[get_room_free_slots] Room with id %s not found.', room_id)
+        raise HTTPException(status_code=404, detail="Room not found")
+    schedule = await room_schedule.get_room_schedule(session, room_id)
+    start = datetime.combine(day, time.min)
+    slots = [
+        FreeSlot(start=slot_start, end=slot_end, minutes=int((slot_end - slot_start).total_seconds() // 60))
+        for slot_start, slot_end in room_schedule.free_slots(schedule, start, start + timedelta(days=1))
+    ]
+    return RoomFreeSlots(room_id=room_id, day=day, free_slots=[slot for slot in slots if slot.minutes >= min_minutes])
+
+async def _session_ids(session: AsyncSession, room_id: int) -> list[int]:
+    return (await session.exec(select(SessionModel.session_id).where(SessionModel.room_id == room_id))).all()
 
 @router.put("/{room_id}", response_model=Room)
-def update_room(
+async def update_room(
     room_id: int,
     roomDto: RoomUpdateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[update_room] Updating room with id {room_id}...')
-    room = session.get(Room, room_id)
+    logger.info('[update_room] Updating room with id %s...', room_id)
+    room = await session.get(Room, room_id)
     if not room:
-        logger.error(f'[update_room] Room with id {room_id} not found.')
+        logger.error('[update_room] Room with id %s not found.', room_id)
         raise HTTPException(status_code=404, detail="Room not found")
     
     for key, value in roomDto.model_dump(exclude_none=True).items():
         setattr(room, key, value)
 
     session.add(room)
-    session.commit()
-    session.refresh(room)
-    logger.info(f'[update_room] Room with id {room_id} updated successfully.')
+    # A agenda do dia (/sessions/schedule) mostra dados da sala
+    session_ids = await _session_ids(session, room_id)
+    await session.commit()
+    await session.refresh(room)
+    await invalidate_schedules(session, session_ids)
+    seat_map.invalidate()
+    await cache.invalidate(cache.room_key(room_id))
+    etag.bump("room")
+    logger.info('[update_room] Room with id %s updated successfully.', room_id)
     return room
 
 @router.delete("/{room_id}", response_model=DeleteResponse)
-def delete_room(
+async def delete_room(
     room_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[delete_room] Deleting room with id {room_id}...')
-    room = session.get(Room, room_id)
+    logger.info('[delete_room] Deleting room with id %s...', room_id)
+    room = await session.get(Room, room_id)
     if not room:
-        logger.error(f'[delete_room] Room with id {room_id} not found.')
+        logger.error('[delete_room] Room with id %s not found.', room_id)
         raise HTTPException(status_code=404, detail="Room not found")
     
-    session.delete(room)
-    session.commit()
-    logger.info(f'[delete_room] Room with id {room_id} deleted successfully.')
+    session_ids = await _session_ids(session, room_id)
+    await session.delete(room)
+    await session.commit()
+    await invalidate_schedules(session, session_ids)
+    # As sessões da sala ficaram sem room_id: a capacidade em cache não vale mais
+    seat_map.invalidate()
+    room_schedule.invalidate(room_id)
+    await cache.invalidate(cache.room_key(room_id))
+    etag.bump("room")
+    logger.info('[delete_room] Room with id %s deleted successfully.', room_id)
     return DeleteResponse(message="Room deleted successfully")
\ No newline at end of file
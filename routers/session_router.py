@@ -1,70 +1,112 @@
 import math
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
 from sqlalchemy import func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
 
 from core.logging import logger
+from core import seat_map, cache, room_schedule
+from core.room_schedule import RoomOverlap
 from models.models import Session as SessionModel
-from models.models import Movie, Room
+from models.models import Movie, Room, SessionRevenueRollup
 from database.database import get_session
+from database import counters
 from routers.common import (
     PaginationMeta, 
     ListResponseMeta, 
     CountResponse, 
     DeleteResponse, 
     SessionCreateDTO,
-    SessionUpdateDTO
+    SessionUpdateDTO,
+    SeatMapResponse,
+    DaySchedule,
+    RoomSchedule,
+    ScheduleSession,
+    dump_json,
+    cached_json_response,
+    count_total,
+    keyset_page,
+    ndjson_export,
+    FAST_JSON,
+    json_response,
+    table_rows,
+    rows_json_response
 )
 
 router = APIRouter(prefix="/sessions", tags=["Sessions"])
 
+async def _reserve_room_or_raise(session: AsyncSession, room_id: Optional[int], session_id: Optional[int],
+                                 start: datetime, movie_id: Optional[int], caller: str):
+    movie = await session.get(Movie, movie_id) if movie_id is not None else None
+    end = room_schedule.session_end(start, movie.duration if movie else None)
+    try:
+        return await room_schedule.reserve(session, room_id, session_id, start, end)
+    except RoomOverlap as e:
+        logger.error('[%s] Room %s is already booked between %s and %s (session %s)', caller, room_id, start, end, e.session_id)
+        raise HTTPException(status_code=409, detail=f"Room already booked: overlaps session {e.session_id}")
+
 @router.post("", response_model=SessionModel)
-def create_session(
+async def create_session(
     sessionDto: SessionCreateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[create_session] Creating session {sessionDto.session_id}...')
-    if sessionDto.session_id is not None and session.get(SessionModel, sessionDto.session_id):
-        logger.error(f'[create_session] A session with id {sessionDto.session_id} already exists')
+    logger.info('[create_session] Creating session %s...', sessionDto.session_id)
+    if sessionDto.session_id is not None and await session.get(SessionModel, sessionDto.session_id):
+        logger.error('[create_session] A session with id %s already exists', sessionDto.session_id)
         raise HTTPException(status_code=409, detail="Session with ID already exists")
     data = sessionDto.model_dump(exclude_none=True)
+    booking = await _reserve_room_or_raise(
+        session, sessionDto.room_id, None, sessionDto.date_time, sessionDto.movie_id, 'create_session'
+    )
     new_session = SessionModel(**data)
     session.add(new_session)
     try:
-        session.commit()
-        session.refresh(new_session)
-        logger.info(f'[create_session] Session created successfully!')
-    except IntegrityError:
-        session.rollback()
-        logger.error(f'[create_session] Integrity error: room_id or movie_id do not exist')
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        room_schedule.release(sessionDto.room_id, booking)
+        if not isinstance(e, IntegrityError):
+            raise
+        logger.error('[create_session] Integrity error: room_id or movie_id do not exist')
         raise HTTPException(
             status_code=400,
             detail="room_id ou movie_id não existem"
         )
+    await session.refresh(new_session)
+    if booking:
+        booking.session_id = new_session.session_id
+    await cache.invalidate(cache.schedule_key(new_session.date_time.date()))
+    logger.info('[create_session] Session created successfully!')
     return new_session
 
 @router.get("", response_model=List[SessionModel])
-def list_all_sessions(session: Session = Depends(get_session)):
-    logger.info(f'[list_all_sessions] Listing all sessions...')
-    sessions = session.exec(select(SessionModel)).all()
-    logger.info(f'[list_all_sessions] {len(sessions)} sessions found.')
-    return sessions
+async def list_all_sessions(session: AsyncSession = Depends(get_session)):
+    logger.info('[list_all_sessions] Listing all sessions...')
+    if FAST_JSON:
+        sessions = await table_rows(session, SessionModel)
+    else:
+        sessions = (await session.exec(select(SessionModel))).all()
+    logger.info('[list_all_sessions] %s sessions found.', len(sessions))
+    return rows_json_response(sessions) if FAST_JSON else sessions
 
 @router.get("/filter", response_model=ListResponseMeta[SessionModel])
-def filter_sessions(
-    session: Session = Depends(get_session),
+async def filter_sessions(
+    session: AsyncSession = Depends(get_session),
     page: int = Query(1, ge=1, description="Page number, starting from 1"),
     per_page: int = Query(10, ge=1, le=100, description="Items per page"),
     after: Optional[datetime] = Query(None, description="Sessions from"),
     before: Optional[datetime] = Query(None, description="Sessions until"),
     status_session: Optional[str] = Query(None, description="Filter by session status"),
     room_id: Optional[int] = Query(None, description="Filter by room ID"),
-    movie_id: Optional[int] = Query(None, description="Filter by movie ID")
+    movie_id: Optional[int] = Query(None, description="Filter by movie ID"),
+    cursor: Optional[str] = Query(None, description="Cursor from meta.next_cursor (send it empty to start cursor pagination)"),
+    include_total: bool = Query(True, description="Compute total, total_pages and remaining")
 ):
-    logger.info(f'[filter_sessions] Filtering sessions...')
+    logger.info('[filter_sessions] Filtering sessions...')
     query = select(SessionModel)
 
     if after:
@@ -81,87 +123,204 @@ def filter_sessions(
     if movie_id is not None:
         query = query.where(SessionModel.movie_id == movie_id)
 
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
-    total_pages = math.ceil(total / per_page) if total > 0 else 1
-    offset = (page - 1) * per_page
-    sessions = session.exec(query.offset(offset).limit(per_page)).all()
-    meta = PaginationMeta(
-        page=page,
-        per_page=per_page,
-        total=total,
-        total_pages=total_pages,
-        remaining= max(0, total - offset - len(sessions))
-    )
+    total = await count_total(session, query) if include_total else None
+    total_pages = (math.ceil(total / per_page) if total > 0 else 1) if total is not None else None
 
-    logger.info(f'[filter_sessions] {len(sessions)} sessions found with filters applied.')
-    return ListResponseMeta[SessionModel](
-        data=sessions, meta=meta)
+    if cursor is not None:
+        sessions, next_cursor = await keyset_page(
+            session, query, (SessionModel.date_time, SessionModel.session_id), cursor, per_page
+        )
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            next_cursor=next_cursor
+        )
+    else:
+        offset = (page - 1) * per_page
+        sessions = (await session.exec(query.offset(offset).limit(per_page))).all()
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            remaining= max(0, total - offset - len(sessions)) if total is not None else None
+        )
+
+    logger.info('[filter_sessions] %s sessions found with filters applied.', len(sessions))
+    return json_response(ListResponseMeta[SessionModel], ListResponseMeta[SessionModel](
+        data=sessions, meta=meta))
 
 @router.get("/count", response_model=CountResponse)
-def count_sessions(
-    session: Session = Depends(get_session)
+async def count_sessions(
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[count_sessions] Counting sessions...')
-    total = session.exec(select(func.count(SessionModel.session_id))).one()
-    logger.info(f'[count_sessions] Total sessions: {total}.')
+    logger.info('[count_sessions] Counting sessions...')
+    total = await counters.get_count(session, "session")
+    logger.info('[count_sessions] Total sessions: %s.', total)
     return CountResponse(quantidade=total)
 
+@router.get("/export", response_class=StreamingResponse, summary="Exporta todos os registros em NDJSON (streaming)")
+async def export_sessions():
+    logger.info('[export_sessions] Streaming sessions as NDJSON...')
+    return ndjson_export(SessionModel)
+
+@router.get("/schedule", response_model=DaySchedule, summary="Programação do dia agrupada por sala")
+async def get_day_schedule(
+    day: date = Query(..., alias="date", description="Dia da programação (YYYY-MM-DD)"),
+    session: AsyncSession = Depends(get_session)
+):
+    logger.info('[get_day_schedule] Building schedule for %s...', day)
+    key = cache.schedule_key(day)
+    body = await cache.get(key)
+    if body is not None:
+        return cached_json_response(body, hit=True)
+
+    # Uma consulta só: faixa em session.date_time (ix_session_date_time) + sala,
+    # filme e vendas da session_revenue_rollup
+    start = datetime.combine(day, time.min)
+    tickets_sold = func.coalesce(SessionRevenueRollup.tickets_sold, 0)
+    rows = (await session.exec(
+        select(
+            SessionModel.session_id,
+            SessionModel.date_time,
+            SessionModel.exibition_type,
+            SessionModel.language_audio,
+            SessionModel.language_subtitles,
+            SessionModel.status_session,
+            SessionModel.room_id,
+            Room.room_name,
+            Room.capacity,
+            Room.screen_type,
+            SessionModel.movie_id,
+            Movie.movie_title,
+            Movie.duration,
+            Movie.rating,
+            tickets_sold.label("tickets_sold"),
+            (Room.capacity - tickets_sold).label("seats_remaining")
+        )
+        .outerjoin(Room, SessionModel.room_id == Room.room_id)
+        .outerjoin(Movie, SessionModel.movie_id == Movie.movie_id)
+        .outerjoin(SessionRevenueRollup, SessionModel.session_id == SessionRevenueRollup.session_id)
+        .where(SessionModel.date_time >= start, SessionModel.date_time < start + timedelta(days=1))
+        .order_by(SessionModel.room_id, SessionModel.date_time)
+    )).all()
+
+    rooms: dict[Optional[int], RoomSchedule] = {}
+    for row in rows:
+        room = rooms.get(row.room_id)
+        if room is None:
+            room = rooms[row.room_id] = RoomSchedule(
+                room_id=row.room_id,
+                room_name=row.room_name,
+                capacity=row.capacity,
+                screen_type=row.screen_type,
+                sessions=[]
+            )
+        room.sessions.append(ScheduleSession.model_validate(row, from_attributes=True))
+
+    logger.info('[get_day_schedule] %s sessions in %s rooms on %s.', len(rows), len(rooms), day)
+    body = dump_json(DaySchedule, DaySchedule(day=day, rooms=list(rooms.values())))
+    await cache.put(key, body)
+    return cached_json_response(body, hit=False)
+
 @router.get("/{session_id}", response_model=SessionModel)
-def get_session_by_id(
+async def get_session_by_id(
     session_id: int,
-    session_session: Session = Depends(get_session)
+    session_session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[get_session_by_id] Retrieving session with id {session_id}...')
-    session_data = session_session.get(SessionModel, session_id)
+    logger.info('[get_session_by_id] Retrieving session with id %s...', session_id)
+    session_data = await session_session.get(SessionModel, session_id)
     if not session_data:
-        logger.error(f'[get_session_by_id] Session with id {session_id} not found.')
+        logger.error('[get_session_by_id] Session with id %s not found.', session_id)
         raise HTTPException(status_code=404, detail="Session not found")
-    logger.info(f'[get_session_by_id] Session with id {session_id} retrieved successfully.')
+    logger.info('[get_session_by_id] Session with id %s retrieved successfully.', session_id)
     return session_data
 
+@router.get("/{session_id}/seats", response_model=SeatMapResponse)
+async def get_session_seats(
+    session_id: int,
+    session: AsyncSession = Depends(get_session)
+):
+    logger.info('[get_session_seats] Retrieving seat map for session %s...', session_id)
+    seats = await seat_map.get_seat_map(session, session_id)
+    if seats is None:
+        logger.error('[get_session_seats] Session with id %s not found.', session_id)
+        raise HTTPException(status_code=404, detail="Session not found")
+    return SeatMapResponse(
+        session_id=session_id,
+        capacity=seats.capacity,
+        occupied=seats.occupied(),
+        available=seats.available(),
+        free_seats=seats.free()
+    )
+
 @router.put("/{session_id}", response_model=SessionModel)
-def update_session(
+async def update_session(
     session_id: int,
     sessionDto: SessionUpdateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[update_session] Updating session with id {session_id}...')
-    existing_session = session.get(SessionModel, session_id)
+    logger.info('[update_session] Updating session with id %s...', session_id)
+    existing_session = await session.get(SessionModel, session_id)
     if not existing_session:
-        logger.error(f'[update_session] Session with id {session_id} not found.')
+        logger.error('[update_session] Session with id %s not found.', session_id)
         raise HTTPException(status_code=404, detail="Session not found")
     
     update_data = sessionDto.model_dump(exclude_none=True)
+    old_day = existing_session.date_time.date()
+
+    # Reserva antes do setattr: a consulta da agenda faria autoflush da sessão alterada
+    old_slot = (existing_session.room_id, existing_session.date_time, existing_session.movie_id)
+    new_slot = tuple(update_data.get(key, value) for key, value in zip(('room_id', 'date_time', 'movie_id'), old_slot))
+    booking = old_booking = None
+    if new_slot != old_slot:
+        booking = await _reserve_room_or_raise(session, new_slot[0], session_id, new_slot[1], new_slot[2], 'update_session')
+        old_booking = room_schedule.find(old_slot[0], session_id, old_slot[1])
 
     for key, value in update_data.items():
         setattr(existing_session, key, value)
 
     session.add(existing_session)
     try:
-        session.commit()
-        logger.info(f'[update_session] Session with id {session_id} updated successfully.')
-    except IntegrityError:
-        session.rollback()
-        logger.error(f'[update_session] Integrity error: room_id or movie_id do not exist')
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        room_schedule.release(new_slot[0], booking)
+        if not isinstance(e, IntegrityError):
+            raise
+        logger.error('[update_session] Integrity error: room_id or movie_id do not exist')
         raise HTTPException(
             status_code=400,
             detail="room_id ou movie_id não existem"
         )
-    session.refresh(existing_session)
+    if 'room_id' in update_data:
+        # A capacidade vem da sala: o mapa é remontado no próximo acesso
+        seat_map.invalidate(session_id)
+    room_schedule.release(old_slot[0], old_booking)
+    await session.refresh(existing_session)
+    await cache.invalidate(cache.schedule_key(old_day), cache.schedule_key(existing_session.date_time.date()))
+    logger.info('[update_session] Session with id %s updated successfully.', session_id)
     return existing_session
 
 @router.delete("/{session_id}", response_model=DeleteResponse)
-def delete_session(
+async def delete_session(
     session_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[delete_session] Deleting session with id {session_id}...')
-    existing_session = session.get(SessionModel, session_id)
+    logger.info('[delete_session] Deleting session with id %s...', session_id)
+    existing_session = await session.get(SessionModel, session_id)
     if not existing_session:
-        logger.error(f'[delete_session] Session with id {session_id} not found.')
+        logger.error('[delete_session] Session with id %s not found.', session_id)
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session.delete(existing_session)
-    session.commit()
-    logger.info(f'[delete_session] Session with id {session_id} deleted successfully.')
+    day = existing_session.date_time.date()
+    room_id, start = existing_session.room_id, existing_session.date_time
+    await session.delete(existing_session)
+    await session.commit()
+    seat_map.invalidate(session_id)
+    room_schedule.release(room_id, room_schedule.find(room_id, session_id, start))
+    await cache.invalidate(cache.schedule_key(day))
+    logger.info('[delete_session] Session with id %s deleted successfully.', session_id)
     return DeleteResponse(message="Session deleted successfully")
\ No newline at end of file
@@ -1,67 +1,191 @@
 import math
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert
 from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
 
 from core.logging import logger
+from core import seat_map
+from core.seat_map import SeatUnavailable, SeatOutOfRange
 from models.models import Ticket
+from models.models import Session as SessionModel
 from database.database import get_session
+from database import counters
 from routers.common import (
     PaginationMeta, 
     ListResponseMeta, 
     CountResponse, 
     DeleteResponse,
     TicketCreateDTO,
-    TicketUpdateDTO
+    TicketUpdateDTO,
+    TicketBulkCreateDTO,
+    BulkItemResult,
+    BulkCreateResponse,
+    invalidate_schedules,
+    count_total,
+    keyset_page,
+    ndjson_export,
+    FAST_JSON,
+    json_response,
+    table_rows,
+    rows_json_response
 )
 
 router = APIRouter(prefix="/tickets", tags=["Tickets"])
 
+async def _reserve_seat_or_raise(session: AsyncSession, session_id: Optional[int], chair_number: int, caller: str):
+    try:
+        await seat_map.reserve_seat(session, session_id, chair_number)
+    except SeatUnavailable:
+        logger.error('[%s] Chair %s is already taken in session %s', caller, chair_number, session_id)
+        raise HTTPException(status_code=409, detail="Chair already taken for this session")
+    except SeatOutOfRange:
+        logger.error('[%s] Chair %s is out of range for session %s', caller, chair_number, session_id)
+        raise HTTPException(status_code=400, detail="chair_number out of range for the room")
+
+def _seat_taken(error: IntegrityError) -> bool:
+    # Índice único (session_id, chair_number): outro processo vendeu a poltrona
+    # ou o seat map foi invalidado com a reserva em andamento
+    return "ticket.session_id, ticket.chair_number" in str(error.orig)
+
 @router.post("", response_model=Ticket)
-def create_ticket(
+async def create_ticket(
     ticketDto: TicketCreateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[create_ticket] Creating ticket {ticketDto.ticket_id}...')
-    if ticketDto.ticket_id is not None and session.get(Ticket, ticketDto.ticket_id):
-        logger.error(f'[create_ticket] A ticket with id {ticketDto.ticket_id} already exists')
+    logger.info('[create_ticket] Creating ticket %s...', ticketDto.ticket_id)
+    if ticketDto.ticket_id is not None and await session.get(Ticket, ticketDto.ticket_id):
+        logger.error('[create_ticket] A ticket with id %s already exists', ticketDto.ticket_id)
         raise HTTPException(status_code=409, detail="Ticket with ID already exists")
+    await _reserve_seat_or_raise(session, ticketDto.session_id, ticketDto.chair_number, 'create_ticket')
     new_ticket = Ticket(**ticketDto.model_dump(exclude_none=True))
     session.add(new_ticket)
     try:
-        session.commit()
-        session.refresh(new_ticket)
-        logger.info(f'[create_ticket] Ticket created successfully!')
-    except IntegrityError:
-        session.rollback()
-        logger.error(f'[create_ticket] Integrity error: session_id does not exist')
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        seat_map.release_seat(ticketDto.session_id, ticketDto.chair_number)
+        if not isinstance(e, IntegrityError):
+            raise
+        if _seat_taken(e):
+            logger.error('[create_ticket] Chair %s is already taken in session %s', ticketDto.chair_number, ticketDto.session_id)
+            raise HTTPException(status_code=409, detail="Chair already taken for this session")
+        logger.error('[create_ticket] Integrity error: session_id does not exist')
         raise HTTPException(
             status_code=400,
             detail="session_id does not exist"
         )
+    await session.refresh(new_ticket)
+    await invalidate_schedules(session, [new_ticket.session_id])
+    logger.info('[create_ticket] Ticket created successfully!')
     return new_ticket
-    
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_tickets_bulk(
+    bulkDto: TicketBulkCreateDTO,
+    response: Response,
+    session: AsyncSession = Depends(get_session)
+):
+    items = bulkDto.items
+    logger.info('[create_tickets_bulk] Creating %s tickets (%s)...', len(items), bulkDto.mode)
+
+    # Validação de IDs duplicados e FKs com uma consulta IN para o lote inteiro
+    ticket_ids = {item.ticket_id for item in items if item.ticket_id is not None}
+    session_ids = {item.session_id for item in items if item.session_id is not None}
+    existing_ids = set((await session.exec(
+        select(Ticket.ticket_id).where(Ticket.ticket_id.in_(ticket_ids))
+    )).all()) if ticket_ids else set()
+    valid_session_ids = set((await session.exec(
+        select(SessionModel.session_id).where(SessionModel.session_id.in_(session_ids))
+    )).all()) if session_ids else set()
+
+    results = []
+    rows = []
+    accepted_ids = set()
+    for index, item in enumerate(items):
+        if item.ticket_id is not None and (item.ticket_id in existing_ids or item.ticket_id in accepted_ids):
+            results.append(BulkItemResult(index=index, status=409, detail="Ticket with ID already exists"))
+        elif item.session_id is not None and item.session_id not in valid_session_ids:
+            results.append(BulkItemResult(index=index, status=400, detail="session_id does not exist"))
+        else:
+            try:
+                await seat_map.reserve_seat(session, item.session_id, item.chair_number)
+            except SeatUnavailable:
+                results.append(BulkItemResult(index=index, status=409, detail="Chair already taken for this session"))
+                continue
+            except SeatOutOfRange:
+                results.append(BulkItemResult(index=index, status=400, detail="chair_number out of range for the room"))
+                continue
+            results.append(BulkItemResult(index=index, status=201))
+            rows.append((index, item.model_dump()))
+            if item.ticket_id is not None:
+                accepted_ids.add(item.ticket_id)
+
+    failed = len(items) - len(rows)
+    if failed and bulkDto.mode == "all_or_nothing":
+        logger.error('[create_tickets_bulk] %s invalid items, batch rejected', failed)
+        for _, data in rows:
+            seat_map.release_seat(data['session_id'], data['chair_number'])
+        for result in results:
+            if result.status == 201:
+                result.status = 424
+                result.detail = "Not created: batch rejected"
+        response.status_code = 400
+        return BulkCreateResponse(mode=bulkDto.mode, created=0, failed=failed, results=results)
+
+    if rows:
+        try:
+            new_ids = (await session.scalars(
+                insert(Ticket).returning(Ticket.ticket_id, sort_by_parameter_order=True),
+                [data for _, data in rows]
+            )).all()
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            for _, data in rows:
+                seat_map.release_seat(data['session_id'], data['chair_number'])
+            if not isinstance(e, IntegrityError):
+                raise
+            if _seat_taken(e):
+                logger.error('[create_tickets_bulk] A chair in the batch is already taken')
+                raise HTTPException(status_code=409, detail="Chair already taken: no tickets were created")
+            logger.error('[create_tickets_bulk] Integrity error while inserting the batch')
+            raise HTTPException(status_code=400, detail="Integrity error: no tickets were created")
+        counters.invalidate("ticket")
+        await invalidate_schedules(session, {data['session_id'] for _, data in rows})
+        for (index, _), new_id in zip(rows, new_ids):
+            results[index].id = new_id
+
+    logger.info('[create_tickets_bulk] %s tickets created, %s failed.', len(rows), failed)
+    return BulkCreateResponse(mode=bulkDto.mode, created=len(rows), failed=failed, results=results)
+
 @router.get("", response_model=List[Ticket])
-def list_all_tickets(session: Session = Depends(get_session)):
-    logger.info(f'[list_all_tickets] Listing all tickets...')
-    tickets = session.exec(select(Ticket)).all()
-    logger.info(f'[list_all_tickets] {len(tickets)} tickets found.')
-    return tickets
+async def list_all_tickets(session: AsyncSession = Depends(get_session)):
+    logger.info('[list_all_tickets] Listing all tickets...')
+    if FAST_JSON:
+        tickets = await table_rows(session, Ticket)
+    else:
+        tickets = (await session.exec(select(Ticket))).all()
+    logger.info('[list_all_tickets] %s tickets found.', len(tickets))
+    return rows_json_response(tickets) if FAST_JSON else tickets
 
 @router.get("/filter", response_model=ListResponseMeta[Ticket])
-def filter_tickets(
-    session: Session = Depends(get_session),
+async def filter_tickets(
+    session: AsyncSession = Depends(get_session),
     page: int = Query(1, ge=1, description="Page number, starting from 1"),
     per_page: int = Query(10, ge=1, le=100, description="Items per page"),
     chair_number: Optional[str] = Query(None, description="Filter by chair number"),
     ticket_type: Optional[str] = Query(None, description="Filter by ticket type"),
     purchase_date: Optional[str] = Query(None, description="Filter by purchase date"),
-    payment_status: Optional[str] = Query(None, description="Filter by payment status")
+    payment_status: Optional[str] = Query(None, description="Filter by payment status"),
+    cursor: Optional[str] = Query(None, description="Cursor from meta.next_cursor (send it empty to start cursor pagination)"),
+    include_total: bool = Query(True, description="Compute total, total_pages and remaining")
 ):
-    logger.info(f'[filter_tickets] Filtering tickets...')
+    logger.info('[filter_tickets] Filtering tickets...')
     query = select(Ticket)
 
     if chair_number:
@@ -76,89 +200,126 @@ def filter_tickets(
     if payment_status:
         query = query.where(Ticket.payment_status == payment_status)
     
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
-    total_pages = math.ceil(total / per_page)
-    offset = (page - 1) * per_page
-
-    query = query.offset(offset).limit(per_page)
-    tickets = session.exec(query).all()
-
-    meta = PaginationMeta(
-        page=page,
-        per_page=per_page,
-        total=total,
-        total_pages=total_pages,
-        remaining=max(0, total - offset - len(tickets))
-    )
-
-    logger.info(f'[filter_tickets] {len(tickets)} tickets found with filters applied.')
-    return ListResponseMeta[Ticket](data=tickets, meta=meta)
+    total = await count_total(session, query) if include_total else None
+    total_pages = math.ceil(total / per_page) if total is not None else None
+
+    if cursor is not None:
+        tickets, next_cursor = await keyset_page(
+            session, query, (Ticket.purchase_date, Ticket.ticket_id), cursor, per_page
+        )
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            next_cursor=next_cursor
+        )
+    else:
+        offset = (page - 1) * per_page
+
+        query = query.offset(offset).limit(per_page)
+        tickets = (await session.exec(query)).all()
+
+        meta = PaginationMeta(
+            page=page,
+            per_page=per_page,
+            total=total,
+            total_pages=total_pages,
+            remaining=max(0, total - offset - len(tickets)) if total is not None else None
+        )
+
+    logger.info('[filter_tickets] %s tickets found with filters applied.', len(tickets))
+    return json_response(ListResponseMeta[Ticket], ListResponseMeta[Ticket](data=tickets, meta=meta))
     
 
 @router.get("/count", response_model=CountResponse)
-def count_tickets(
-    session: Session = Depends(get_session)
+async def count_tickets(
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[count_tickets] Counting tickets...')
-    total = session.exec(select(func.count(Ticket.ticket_id))).one()
-    logger.info(f'[count_tickets] Total tickets: {total}.')
+    logger.info('[count_tickets] Counting tickets...')
+    total = await counters.get_count(session, "ticket")
+    logger.info('[count_tickets] Total tickets: %s.', total)
     return CountResponse(quantidade=total)
 
+@router.get("/export", response_class=StreamingResponse, summary="Exporta todos os registros em NDJSON (streaming)")
+async def export_tickets():
+    logger.info('[export_tickets] Streaming tickets as NDJSON...')
+    return ndjson_export(Ticket)
+
 @router.get("/{ticket_id}", response_model=Ticket)
-def get_ticket_by_id(
+async def get_ticket_by_id(
     ticket_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[get_ticket_by_id] Retrieving ticket with id {ticket_id}...')
-    ticket = session.get(Ticket, ticket_id)
+    logger.info('[get_ticket_by_id] Retrieving ticket with id %s...', ticket_id)
+    ticket = await session.get(Ticket, ticket_id)
     if not ticket:
-        logger.error(f'[get_ticket_by_id] Ticket with id {ticket_id} not found.')
+        logger.error('[get_ticket_by_id] Ticket with id %s not found.', ticket_id)
         raise HTTPException(status_code=404, detail="Ticket not found")
-    logger.info(f'[get_ticket_by_id] Ticket with id {ticket_id} retrieved successfully.')
+    logger.info('[get_ticket_by_id] Ticket with id %s retrieved successfully.', ticket_id)
     return ticket
 
 @router.put("/{ticket_id}", response_model=Ticket)
-def update_ticket(
+async def update_ticket(
     ticket_id: int,
     tickeDto: TicketUpdateDTO,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[update_ticket] Updating ticket with id {ticket_id}...')
-    ticket = session.get(Ticket, ticket_id)
+    logger.info('[update_ticket] Updating ticket with id %s...', ticket_id)
+    ticket = await session.get(Ticket, ticket_id)
     if not ticket:
-        logger.error(f'[update_ticket] Ticket with id {ticket_id} not found.')
+        logger.error('[update_ticket] Ticket with id %s not found.', ticket_id)
         raise HTTPException(status_code=404, detail="Ticket not found")
     
     update_data = tickeDto.model_dump(exclude_none=True)
 
+    old_seat = (ticket.session_id, ticket.chair_number)
+    new_seat = (update_data.get('session_id', ticket.session_id), update_data.get('chair_number', ticket.chair_number))
+    seat_changed = new_seat != old_seat
+    if seat_changed:
+        await _reserve_seat_or_raise(session, *new_seat, 'update_ticket')
+
     for key, value in update_data.items():
         setattr(ticket, key, value)
     session.add(ticket)
     try:
-        session.commit()
-        session.refresh(ticket)
-        logger.info(f'[update_ticket] Ticket with id {ticket_id} updated successfully.')
-    except IntegrityError:
-        session.rollback()
-        logger.error(f'[update_ticket] Integrity error: session_id does not exist')
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        if seat_changed:
+            seat_map.release_seat(*new_seat)
+        if not isinstance(e, IntegrityError):
+            raise
+        if _seat_taken(e):
+            logger.error('[update_ticket] Chair %s is already taken in session %s', new_seat[1], new_seat[0])
+            raise HTTPException(status_code=409, detail="Chair already taken for this session")
+        logger.error('[update_ticket] Integrity error: session_id does not exist')
         raise HTTPException(
             status_code=400,
             detail="Session_id does not exist"
         )
+    if seat_changed:
+        seat_map.release_seat(*old_seat)
+    await session.refresh(ticket)
+    await invalidate_schedules(session, {old_seat[0], ticket.session_id})
+    logger.info('[update_ticket] Ticket with id %s updated successfully.', ticket_id)
     return ticket
 
 @router.delete("/{ticket_id}", response_model=DeleteResponse)
-def delete_ticket(
+async def delete_ticket(
     ticket_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
-    logger.info(f'[delete_ticket] Deleting ticket with id {ticket_id}...')
-    ticket = session.get(Ticket, ticket_id)
+    logger.info('[delete_ticket] Deleting ticket with id %s...', ticket_id)
+    ticket = await session.get(Ticket, ticket_id)
     if not ticket:
-        logger.error(f'[delete_ticket] Ticket with id {ticket_id} not found.')
+        logger.error('[delete_ticket] Ticket with id %s not found.', ticket_id)
         raise HTTPException(status_code=404, detail="Ticket not found")
     
-    session.delete(ticket)
-    session.commit()
-    logger.info(f'[delete_ticket] Ticket with id {ticket_id} deleted successfully.')
+    seat = (ticket.session_id, ticket.chair_number)
+    await session.delete(ticket)
+    await session.commit()
+    seat_map.release_seat(*seat)
+    await invalidate_schedules(session, [seat[0]])
+    logger.info('[delete_ticket] Ticket with id %s deleted successfully.', ticket_id)
     return DeleteResponse(message="Ticket deleted successfully")
\ No newline at end of file